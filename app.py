@@ -1,53 +1,162 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file
-from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
-import re
 import time
+_startup_started = time.perf_counter()  # Taken before the other imports so they are timed too
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context
+from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import json
-import csv
-import io
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
 import logging
 import threading
-from queue import Queue
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
 import os
+import uuid
 from functools import wraps
+from job_store import MemoryJobStore, SQLiteJobStore, TERMINAL_STATUSES
+from company_cache import canonical_company_url
+import exports
+import metrics
+import readiness
+import scraping
+import tracing
+from scheduler import JobScheduler, QueueFullError
+from rate_limiter import WaitTally, tally_waits
+# The scraper and its settings live in scraping.py, which the batch command line uses without Flask
+from scraping import TRUSTPILOT_BASE_URL, TrustpilotScraper, discover_companies, stage
 # Default values for configuration
 FLASK_HOST = '0.0.0.0'
 FLASK_PORT = int(os.environ.get('PORT', 5000))  # Railway will provide PORT environment variable
 FLASK_DEBUG = False  # Set to False for production
 DEFAULT_MAX_COMPANIES = 10
-DEFAULT_DELAY_BETWEEN_REQUESTS = 0.5
-DEFAULT_PAGE_LOAD_TIMEOUT = 15
-DEFAULT_ELEMENT_TIMEOUT = 5
-CHROME_HEADLESS = True
-CHROME_NO_SANDBOX = True
-CHROME_DISABLE_DEV_SHM = True
-CHROME_DISABLE_GPU = True
-CHROME_WINDOW_SIZE = "1920,1080"
-TRUSTPILOT_BASE_URL = "https://www.trustpilot.com"
-TRUSTPILOT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+DRIVER_POOL_PREWARM = os.environ.get('DRIVER_POOL_PREWARM', '1') == '1'
+DEFAULT_JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))  # Companies scraped in parallel per search
+MAX_JOB_WORKERS = 16
+JOB_STORE_BACKEND = os.environ.get('JOB_STORE_BACKEND', 'sqlite')  # 'sqlite' (shared by all workers) or 'memory'
+JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', os.path.join('.cache', 'jobs.sqlite3'))
+JOB_STORE_FLUSH_INTERVAL = 0.5  # seconds between batched progress writes
+JOB_RESULT_BUFFER = int(os.environ.get('JOB_RESULT_BUFFER', 1000))  # Results per job held in memory before spilling to disk
+JOB_SPILL_DIR = os.path.join('.cache', 'results')  # Result segments for the memory backend
+TRACE_DIR = os.path.join('.cache', 'traces')  # Finished traces of searches started with trace: true
+MAX_RUNNING_JOBS = int(os.environ.get('MAX_RUNNING_JOBS', 2))  # Searches running at once per web worker
+MAX_QUEUED_JOBS = int(os.environ.get('MAX_QUEUED_JOBS', 20))  # Searches waiting for a slot before /api/search returns 429
+MAX_QUEUED_JOBS_PER_CLIENT = int(os.environ.get('MAX_QUEUED_JOBS_PER_CLIENT', 5))
+MAX_SEARCH_TERMS = 20  # Terms one batch search may combine
+MAX_SEARCH_PRIORITY = 2  # Client-supplied priorities are clamped to -2..2, so no client can jump far ahead
+QUEUE_FULL_RETRY_AFTER = 30  # seconds suggested to clients turned away with 429
+JOB_LEASE_SECONDS = 120  # A queued or running job whose worker hasn't renewed its lease for this long is abandoned
+JOB_LEASE_RENEW_INTERVAL = 30  # seconds between lease renewals for this worker's jobs
+RESULTS_PAGE_SIZE = 100  # Default page size for /api/results
+MAX_RESULTS_PAGE_SIZE = 1000
+PROGRESS_STREAM_INTERVAL = 0.5  # seconds between job store checks for an open progress stream
+PROGRESS_STREAM_HEARTBEAT = 15  # seconds of silence before a keep-alive comment is sent
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))  # Proxies in front of the app that append X-Forwarded-For (Railway's edge is one)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # If set, /api/metrics requires 'Authorization: Bearer <token>'
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', '0') == '1'  # Serve /api/metrics without a token; otherwise it is off until one is set
+
+# Sectors offered in the UI; /api/search runs all of a sector's terms as one job
+SECTORS = {
+    'real_estate': {
+        'name': 'Real Estate',
+        'search_terms': ['real estate', 'property', 'realtor', 'estate agent', 'property management'],
+        'description': 'Real estate agencies, property management, realtors, and property services'
+    },
+    'finance': {
+        'name': 'Finance & Banking',
+        'search_terms': ['finance', 'banking', 'investment', 'insurance', 'mortgage'],
+        'description': 'Banks, investment firms, insurance companies, and financial services'
+    },
+    'healthcare': {
+        'name': 'Healthcare',
+        'search_terms': ['healthcare', 'medical', 'hospital', 'clinic', 'pharmacy'],
+        'description': 'Hospitals, clinics, medical practices, and healthcare services'
+    },
+    'technology': {
+        'name': 'Technology',
+        'search_terms': ['technology', 'software', 'IT', 'digital', 'tech'],
+        'description': 'Software companies, IT services, and technology firms'
+    },
+    'retail': {
+        'name': 'Retail & E-commerce',
+        'search_terms': ['retail', 'ecommerce', 'online store', 'shopping', 'marketplace'],
+        'description': 'Online stores, retail chains, and e-commerce platforms'
+    },
+    'custom': {
+        'name': 'Custom Search',
+        'search_terms': [],
+        'description': 'Enter your own search terms for any industry or company type'
+    }
+}
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here-change-in-production'  # Change this in production
 CORS(app)
+if TRUSTED_PROXY_HOPS:
+    # Only the hops our own proxies append are trusted; anything earlier was sent by the client
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global variables for progress tracking
+# Seconds each startup phase took, logged as it ends and reported by /api/health
+STARTUP_PHASES = {}
+_startup_mark = _startup_started
+
+def startup_phase(name):
+    """Record and log the startup phase that just ended"""
+    global _startup_mark
+    now = time.perf_counter()
+    STARTUP_PHASES[name] = round(now - _startup_mark, 4)
+    _startup_mark = now
+    logger.info(f"Startup: {name} took {STARTUP_PHASES[name] * 1000:.0f} ms")
+
+startup_phase('imports')
+
+# Global variables for progress tracking. Job state lives in the job store so every
+# web worker can serve it; scraping_progress only holds jobs running in this process.
 scraping_progress = {}
-scraping_queue = Queue()
+
+if JOB_STORE_BACKEND == 'memory':
+    job_store = MemoryJobStore(spill_dir=JOB_SPILL_DIR, buffer_size=JOB_RESULT_BUFFER)
+else:
+    job_store = SQLiteJobStore(
+        JOB_STORE_PATH, flush_interval=JOB_STORE_FLUSH_INTERVAL, max_buffered_results=JOB_RESULT_BUFFER
+    )
+
+# Owner of the leases on jobs queued or running in this process
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+def renew_job_leases():
+    """Keep this worker's jobs leased while they wait or run, however rarely they write progress"""
+    while True:
+        time.sleep(JOB_LEASE_RENEW_INTERVAL)
+        try:
+            job_store.renew_leases(list(scraping_progress), WORKER_ID, JOB_LEASE_SECONDS)
+        except Exception as e:
+            logger.error(f"Failed to renew job leases: {e}")
+
+threading.Thread(target=renew_job_leases, name='job-leases', daemon=True).start()
+
+def release_job(search_id):
+    """Stop tracking a job in this process and let another worker resume it"""
+    scraping_progress.pop(search_id, None)
+    job_store.release_lease(search_id, WORKER_ID)
+
+startup_phase('job_store')
+
+company_cache = scraping.create_company_cache()
+startup_phase('company_cache')
+
+# Served by /api/metrics; the gauges further down read the scheduler and driver pool
+COMPANIES_SCRAPED = metrics.Counter('trustpilot_companies_scraped_total', 'Companies scraped, by source (http, browser, cache)', ['source'])
+COMPANIES_SKIPPED = metrics.Counter('trustpilot_companies_skipped_total', 'Companies left out of the results, by reason', ['reason'])
+EMAILS_FOUND = metrics.Counter('trustpilot_emails_found_total', 'Company emails added to job results')
+
+# Traces of searches running in this process; finished ones are read from TRACE_DIR
+job_traces = {}
+
+def trace_path(search_id):
+    return os.path.join(TRACE_DIR, f"{search_id}.json")
 
 def login_required(view_function):
     """Simple session-based login required decorator"""
@@ -61,372 +170,322 @@ def login_required(view_function):
         return view_function(*args, **kwargs)
     return wrapped_view
 
-class TrustpilotScraper:
-    def __init__(self):
-        self.base_url = TRUSTPILOT_BASE_URL
-        self.headers = {
-            'User-Agent': TRUSTPILOT_USER_AGENT
-        }
-        self.driver = None
+rate_limiter = scraping.create_rate_limiter()
+
+scraper = TrustpilotScraper(limiter=rate_limiter)
+startup_phase('scraper')
+
+driver_pool = scraping.create_driver_pool(scraper)
+
+if DRIVER_POOL_PREWARM:
+    # Launch Chrome in the background so the first search doesn't pay the cold start
+    threading.Thread(target=driver_pool.warm, daemon=True).start()
+startup_phase('driver_pool')
+
+def is_cancelled(search_id):
+    """Check whether a job has been cancelled, through this worker or any other"""
+    progress = scraping_progress.get(search_id)
+    if progress is not None and progress['status'] == 'cancelled':
+        return True
+    if job_store.get_status(search_id) == 'cancelled':
+        if progress is not None:
+            progress['status'] = 'cancelled'
+        return True
+    return False
+
+def scrape_one_company(search_id, index, company, search_term, scrape_all_emails, force_refresh=False, tally=None, trace=None):
+    """Scrape a single company for a job; returns (result or None, source), or None if the job was cancelled"""
+    if is_cancelled(search_id):
+        return None
     
-    def setup_driver(self):
-        """Setup Chrome driver with options"""
-        if self.driver:
-            try:
-                self.driver.quit()
-            except:
-                pass
-        
-        chrome_options = Options()
-        if CHROME_HEADLESS:
-            chrome_options.add_argument("--headless")
-        if CHROME_NO_SANDBOX:
-            chrome_options.add_argument("--no-sandbox")
-        if CHROME_DISABLE_DEV_SHM:
-            chrome_options.add_argument("--disable-dev-shm-usage")
-        if CHROME_DISABLE_GPU:
-            chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument(f"--window-size={CHROME_WINDOW_SIZE}")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument(f"user-agent={self.headers['User-Agent']}")
-        
-        try:
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            return self.driver
-        except Exception as e:
-            logger.error(f"Failed to setup Chrome driver: {e}")
-            return None
+    # Rate limiter waits and trace spans in this worker thread count towards the job
+    with tally_waits(tally), tracing.attach(trace), stage('company_total', index=index, company=company['name']):
+        logger.info(f"Processing company {index + 1} for {search_id}: {company['name']}")
+        return scraping.scrape_one_company(
+            scraper, company, search_term, scrape_all_emails, force_refresh, pool=driver_pool, cache=company_cache
+        )
+
+class ResultCollector:
+    """Applies finished company outcomes to a job's progress dict and the job store in search order"""
     
-    def cleanup_driver(self):
-        """Clean up the driver"""
-        if self.driver:
-            try:
-                self.driver.quit()
-                self.driver = None
-            except:
-                pass
+    def __init__(self, search_id, progress, tally=None, matched_terms=None, done=None):
+        self.search_id = search_id
+        self.progress = progress
+        self.tally = tally
+        # Canonical company URL -> search terms that found it
+        self.matched_terms = matched_terms if matched_terms is not None else {}
+        # Indices already finished by an earlier run of a resumed job
+        self.done = done or set()
+        self.handled = 0
+        self.finished = {}
+        self.next_index = 0
     
-    def clean_company_name(self, raw_name):
-        """Clean up company name by removing extra text"""
-        if not raw_name:
-            return ""
-        
-        # Remove review counts, ratings, and URLs
-        clean_name = re.sub(r'www\.[^\s]+', '', raw_name)
-        clean_name = re.sub(r'[0-9]+\.[0-9]+', '', clean_name)
-        clean_name = re.sub(r'[0-9,]+\s*reviews?', '', clean_name)
-        clean_name = re.sub(r'[0-9,]+\s*ratings?', '', clean_name)
-        
-        # Remove location patterns (e.g., "27 Union Square West, New York, United States")
-        clean_name = re.sub(r'\d+\s+[A-Za-z\s]+,?\s*[A-Za-z\s]+,?\s*[A-Za-z\s]+$', '', clean_name)
-        
-        # Remove remaining numbers and special characters
-        clean_name = re.sub(r'[0-9,]+', '', clean_name)
-        clean_name = re.sub(r'[^\w\s\-&]', '', clean_name)  # Keep only alphanumeric, spaces, hyphens, and ampersands
+    def add(self, index, outcome):
+        """Record the outcome of company `index`; None means it was skipped after a cancel"""
+        self.handled += 1
+        if outcome is None:
+            COMPANIES_SKIPPED.inc(reason='cancelled')
+            return
         
-        # Additional cleaning for common patterns
-        clean_name = re.sub(r'\s+', ' ', clean_name)  # Normalize whitespace
-        clean_name = re.sub(r'^[^\w]*', '', clean_name)  # Remove leading non-word chars
-        clean_name = re.sub(r'[^\w]*$', '', clean_name)  # Remove trailing non-word chars
+        result, source = outcome
+        if source == 'failed':
+            COMPANIES_SKIPPED.inc(reason='failed')
+        else:
+            COMPANIES_SCRAPED.inc(source=source)
+            if not result:
+                COMPANIES_SKIPPED.inc(reason='no_emails')
+        progress = self.progress
+        progress['companies_processed'] += 1
+        progress['progress'] = int(progress['companies_processed'] / max(progress['total_companies'], 1) * 100)
+        if source == 'failed':
+            progress['failed_companies'] += 1
+        elif source == 'cache':
+            progress['companies_from_cache'] += 1
+        elif source == 'http':
+            progress['fast_path_companies'] += 1
+        else:
+            progress['slow_path_companies'] += 1
         
-        return clean_name.strip()
+        # Append results as soon as the next one in line is done
+        self.finished[index] = (result, source)
+        self._append_ready()
+        if self.tally:
+            progress.update(self.tally.as_dict())
+        job_store.save_job(self.search_id, progress)
     
-    def search_companies(self, search_term, max_companies=10):
-        """Search for companies on Trustpilot with improved sector targeting"""
-        try:
-            # Enhanced search terms for better sector targeting
-            enhanced_search_terms = self.get_enhanced_search_terms(search_term)
-            companies = []
-            
-            for search_term_variant in enhanced_search_terms:
-                if len(companies) >= max_companies:
-                    break
-                    
-                search_url = f"{self.base_url}/search?query={search_term_variant}"
-                response = requests.get(search_url, headers=self.headers, timeout=DEFAULT_PAGE_LOAD_TIMEOUT)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Look for company links in search results
-                company_links = soup.find_all('a', href=re.compile(r'/review/'))
-                
-                for link in company_links:
-                    if len(companies) >= max_companies:
-                        break
-                        
-                    company_name = link.get_text(strip=True)
-                    company_url = self.base_url + link['href'] if link['href'].startswith('/') else link['href']
-                    
-                    # Clean up company name
-                    clean_name = self.clean_company_name(company_name)
-                    if clean_name and len(clean_name) > 2:  # Only add if name is meaningful
-                        # Check if company is already in the list
-                        if not any(c['name'] == clean_name for c in companies):
-                            companies.append({
-                                'name': clean_name,
-                                'url': company_url,
-                                'raw_name': company_name,  # Keep original for debugging
-                                'search_term_used': search_term_variant
-                            })
-            
-            logger.info(f"Found {len(companies)} companies for search term: {search_term}")
-            return companies
-            
-        except Exception as e:
-            logger.error(f"Error searching companies: {e}")
-            return []
+    def _append_ready(self):
+        while self.next_index in self.done or self.next_index in self.finished:
+            if self.next_index in self.finished:
+                self._append(self.next_index, *self.finished.pop(self.next_index))
+            self.next_index += 1
     
-    def get_enhanced_search_terms(self, base_term):
-        """Generate enhanced search terms for better sector targeting"""
-        # Real estate specific enhancements
-        real_estate_terms = [
-            f"{base_term} real estate",
-            f"{base_term} property",
-            f"{base_term} realtor",
-            f"{base_term} estate agent",
-            f"{base_term} property management",
-            f"{base_term} real estate agency",
-            f"{base_term} property investment",
-            f"{base_term} real estate broker",
-            f"{base_term} property developer",
-            f"{base_term} real estate consultant"
-        ]
-        
-        # General business enhancements
-        general_terms = [
-            base_term,
-            f"{base_term} company",
-            f"{base_term} business",
-            f"{base_term} services",
-            f"{base_term} ltd",
-            f"{base_term} inc",
-            f"{base_term} corp"
-        ]
+    def flush_all(self):
+        """Append results that finished out of order (e.g. before a cancellation)"""
+        for index in sorted(self.finished):
+            self._append(index, *self.finished[index])
+        self.finished = {}
+    
+    def update_matched_terms(self, search_terms):
+        """Add terms that matched a company after its result was appended to the stored result
         
-        # Combine and return unique terms
-        all_terms = real_estate_terms + general_terms
-        return list(dict.fromkeys(all_terms))  # Remove duplicates while preserving order
+        Runs once every term has been searched. Terms stored by an earlier run of a resumed
+        job are kept, in search order.
+        """
+        updates = {}
+        for position, result in enumerate(job_store.iter_results(self.search_id)):
+            found = self.matched_terms.get(canonical_company_url(result['url'], TRUSTPILOT_BASE_URL), [])
+            stored = result.get('matched_terms', [])
+            terms = [term for term in search_terms if term in stored or term in found]
+            if terms != stored:
+                updates[position] = dict(result, matched_terms=terms)
+        if updates:
+            job_store.update_results(self.search_id, updates)
     
-    def safe_find_elements(self, driver, by, value, timeout=DEFAULT_ELEMENT_TIMEOUT):
-        """Safely find elements with timeout and retry logic"""
-        try:
-            wait = WebDriverWait(driver, timeout)
-            elements = wait.until(EC.presence_of_all_elements_located((by, value)))
-            return elements
-        except (TimeoutException, WebDriverException) as e:
-            logger.warning(f"Timeout finding elements {by}={value}: {e}")
-            return []
+    def _append(self, index, result, source):
+        if result:
+            # Terms known so far; later terms are added by update_matched_terms()
+            result['matched_terms'] = list(self.matched_terms.get(canonical_company_url(result['url'], TRUSTPILOT_BASE_URL), []))
+            self.progress['emails_found'] += result['total_emails']
+            self.progress['results_count'] += 1
+            EMAILS_FOUND.inc(result['total_emails'])
+            job_store.append_result(self.search_id, result)
+        if source == 'failed':
+            return  # Not checkpointed, so a resumed job tries it again
+        # Checkpoint: a resumed job skips this company from now on
+        job_store.mark_company_done(self.search_id, index, source, result['total_emails'] if result else 0)
+
+def new_job_progress(search_term, workers, status='running', search_terms=None, params=None):
+    """Initial progress dict for a search; `params` are the arguments needed to resume it"""
+    return {
+        'status': status,
+        'queue_position': 0,
+        'progress': 0,
+        'total_companies': 0,
+        'companies_processed': 0,
+        
+        'companies_found': 0,
+        'emails_found': 0,
+        'fast_path_companies': 0,
+        'slow_path_companies': 0,
+        'companies_from_cache': 0,
+        'failed_companies': 0,  # Companies whose scrape raised; not checkpointed, so a resume retries them
+        'workers': workers,
+        'results_count': 0,  # The results themselves live only in the job store
+        'search_term': search_term,
+        'search_terms': search_terms or [search_term],
+        'params': params or {}
+    }
+
+def restore_counters(progress, checkpoint):
+    """Recompute a resumed job's counters from its checkpoint, dropping work that was never finished"""
+    done = [row for row in checkpoint if row['done']]
+    sources = [row['source'] for row in done]
+    progress.update({
+        'total_companies': len(checkpoint),
+        'companies_found': len(checkpoint),
+        'companies_processed': len(done),
+        'companies_from_cache': sources.count('cache'),
+        'fast_path_companies': sources.count('http'),
+        'slow_path_companies': sources.count('browser'),
+        'failed_companies': 0,
+        'emails_found': sum(row['emails'] for row in done),
+        'results_count': sum(1 for row in done if row['emails']),
+    })
+
+def update_queue_positions(positions):
+    """Scheduler callback: publish the new queue position of every waiting search"""
+    for search_id, position in positions.items():
+        progress = scraping_progress.get(search_id)
+        if progress and progress['status'] == 'queued' and progress['queue_position'] != position:
+            progress['queue_position'] = position
+            job_store.save_job(search_id, progress)
+
+job_scheduler = JobScheduler(
+    max_running=MAX_RUNNING_JOBS,
+    max_queued=MAX_QUEUED_JOBS,
+    max_queued_per_client=MAX_QUEUED_JOBS_PER_CLIENT,
+    on_queue_change=update_queue_positions
+)
+
+def background_scraping_task(search_id, search_term, max_companies, scrape_all_emails=False, workers=DEFAULT_JOB_WORKERS, force_refresh=False, search_terms=None, resume=False, trace=False):
+    """Background task for scraping
     
-    def scrape_company_page(self, company_url):
-        """Scrape company page for company contact information (emails only)"""
-        try:
-            if not self.driver:
-                self.setup_driver()
-            
-            if not self.driver:
-                return []
-            
-            self.driver.get(company_url)
-            time.sleep(1)  # Reduced wait time for faster scraping
-            
-            # Look for company emails only
-            company_emails = []
-            
-            try:
-                # Look for contact section with better error handling
-                contact_sections = self.safe_find_elements(
-                    self.driver, 
-                    By.XPATH, 
-                    "//*[contains(text(), 'Contact') or contains(text(), 'contact') or contains(text(), 'Email') or contains(text(), 'email')]"
-                )
-                
-                for section in contact_sections:
-                    try:
-                        # Get parent element safely
-                        parent = section.find_element(By.XPATH, "./..")
-                        text = parent.text
-                        
-                        # Extract emails using regex - focus on company emails only
-                        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-                        
-                        # Filter out common personal email domains and only keep company emails
-                        valid_company_emails = [email for email in emails if not self.is_personal_email(email)]
-                        company_emails.extend(valid_company_emails)
-                        
-                    except StaleElementReferenceException:
-                        continue  # Skip stale elements
-                    except Exception as e:
-                        logger.debug(f"Error processing contact section: {e}")
-                        continue
-                
-                # Look for contact forms and additional contact info
-                contact_forms = self.safe_find_elements(
-                    self.driver, 
-                    By.XPATH, 
-                    "//*[contains(@class, 'contact') or contains(@class, 'email') or contains(@placeholder, 'email')]"
-                )
-                
-                for form in contact_forms:
-                    try:
-                        text = form.text
-                        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-                        valid_company_emails = [email for email in emails if not self.is_personal_email(email)]
-                        company_emails.extend(valid_company_emails)
-                    except Exception as e:
-                        logger.debug(f"Error processing contact form: {e}")
-                        continue
-                
-            except Exception as e:
-                logger.error(f"Error extracting contact info: {e}")
-            
-            # Remove duplicates - no limit on emails per company
-            unique_emails = list(set(company_emails))
-            return unique_emails
-            
-        except Exception as e:
-            logger.error(f"Error scraping company page: {e}")
-            return []
+    With several search_terms, all of them run as one job sharing its workers, and every
+    company is scraped once however many terms find it. search_term is the job's label.
+    Every discovered company and every finished one is checkpointed; with resume=True the
+    job continues from its checkpoint instead of starting over. With trace=True the job's
+    spans are recorded and saved for /api/trace/<search_id>.
+    """
+    search_terms = search_terms or [search_term]
+    progress = scraping_progress.get(search_id)
+    if progress is None:
+        progress = new_job_progress(search_term, workers, search_terms=search_terms)
+        scraping_progress[search_id] = progress
+        job_store.create_job(search_id, progress)
+        job_store.acquire_lease(search_id, WORKER_ID, JOB_LEASE_SECONDS)
+    elif is_cancelled(search_id):
+        # Cancelled while waiting in the queue
+        release_job(search_id)
+        return
+    else:
+        progress['status'] = 'running'
+        progress['queue_position'] = 0
+        job_store.save_job(search_id, progress)
     
-    def is_personal_email(self, email):
-        """Check if email is likely personal rather than company email"""
-        personal_domains = [
-            'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 
-            'aol.com', 'icloud.com', 'protonmail.com', 'mail.com'
-        ]
-        domain = email.split('@')[-1].lower()
-        return domain in personal_domains
+    job_trace = None
+    if trace:
+        job_trace = job_traces[search_id] = tracing.Trace(search_id)
+    job_started = time.perf_counter()
     
-    def scrape_reviews_for_emails(self, company_url, max_reviews=50):
-        """Scrape reviews for potential email addresses"""
-        try:
-            if not self.driver:
-                self.setup_driver()
-            
-            if not self.driver:
-                return []
-            
-            # Go to reviews page
-            reviews_url = company_url.replace('/review/', '/reviews/')
-            self.driver.get(reviews_url)
-            time.sleep(3)
-            
-            emails = []
-            
-            # Scroll through reviews to load more content
-            for _ in range(3):
-                try:
-                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
-                except:
-                    break
-            
-            # Extract all text content
-            page_text = self.driver.page_source
-            soup = BeautifulSoup(page_text, 'html.parser')
-            
-            # Find all review text with better pattern matching
-            review_elements = soup.find_all(['p', 'div', 'span'], class_=re.compile(r'review|comment|text|content'))
-            
-            for element in review_elements:
-                text = element.get_text()
-                # Extract emails from review text
-                found_emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-                emails.extend(found_emails)
-                
-                # Limit the number of reviews processed
-                if len(emails) >= max_reviews:
-                    break
-            
-            return list(set(emails))  # Remove duplicates
-            
-        except Exception as e:
-            logger.error(f"Error scraping reviews: {e}")
-            return []
-
-scraper = TrustpilotScraper()
-
-def background_scraping_task(search_id, search_term, max_companies, scrape_all_emails=False):
-    """Background task for scraping"""
     try:
-        scraping_progress[search_id] = {
-            'status': 'running',
-            'progress': 0,
-            'total_companies': 0,
-            'companies_processed': 0,
-            
-            'companies_found': 0,
-            'emails_found': 0,
-            'results': [],
-            'search_term': search_term
-        }
+        # Search and scrape as a pipeline: each company is handed to a worker as soon as
+        # its search page is parsed. Workers only scrape; this thread owns every update
+        # to the job dict, so counters stay exact and results keep search order.
+        tally = WaitTally()
+        checkpoint = job_store.get_checkpoint(search_id) if resume else []
+        done = {row['index'] for row in checkpoint if row['done']}
+        if resume:
+            restore_counters(progress, checkpoint)
+            logger.info(f"Resuming search {search_id}: {len(done)} of {len(checkpoint)} companies already done")
+        # Known companies get their matching terms recorded again as the terms are re-searched
+        matched_terms = {canonical_company_url(row['company']['url'], TRUSTPILOT_BASE_URL): [] for row in checkpoint}
+        collector = ResultCollector(search_id, progress, tally, matched_terms, done=done)
+        done_queue = Queue()
+        submitted = 0
         
-        # Search for companies
-        companies = scraper.search_companies(search_term, max_companies)
-        scraping_progress[search_id]['total_companies'] = len(companies)
-        scraping_progress[search_id]['companies_found'] = len(companies)
+        def outcome(index, future):
+            """A worker's outcome, or a failed company with no emails if scraping it raised"""
+            error = future.exception()
+            if error is None:
+                return future.result()
+            logger.error(f"Scraping company {index + 1} of {search_id} failed: {error}")
+            return None, 'failed'
         
-        if not companies:
-            scraping_progress[search_id]['status'] = 'completed'
-            scraping_progress[search_id]['progress'] = 100
-            return
+        def drain(block):
+            while collector.handled < submitted and not is_cancelled(search_id):
+                try:
+                    index, future = done_queue.get(block=block)
+                except Empty:
+                    return
+                collector.add(index, outcome(index, future))
         
-        # Process each company
-        for i, company in enumerate(companies):
-            if scraping_progress[search_id]['status'] == 'cancelled':
-                break
-                
-            scraping_progress[search_id]['companies_processed'] = i + 1
-            scraping_progress[search_id]['progress'] = int((i + 1) / len(companies) * 100)
-            
-            logger.info(f"Processing company {i+1}/{len(companies)}: {company['name']}")
-            
-            # Get company contact info (emails only)
-            if scrape_all_emails:
-                # Scrape all available emails
-                company_emails = scraper.scrape_company_page(company['url'])
-            else:
-                # Limit to first 10 emails per company
-                company_emails = scraper.scrape_company_page(company['url'])[:10]
-            
-            # Only include companies that have at least one email
-            if company_emails:
-                # Update email count
-                scraping_progress[search_id]['emails_found'] += len(company_emails)
-                
-                result = {
-                    'name': company['name'],
-                    'url': company['url'],
-                    'raw_name': company.get('raw_name', ''),
-                    'company_emails': company_emails,
-                    'total_emails': len(company_emails),
-                    'sector': search_term,
-                    'scraped_at': datetime.now().isoformat()
-                }
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{search_id}-worker")
+        
+        def submit(index, company):
+            nonlocal submitted
+            future = executor.submit(
+                scrape_one_company, search_id, index, company, search_term, scrape_all_emails, force_refresh, tally, job_trace
+            )
+            future.add_done_callback(lambda f, index=index: done_queue.put((index, f)))
+            submitted += 1
+            drain(block=False)
+        
+        try:
+            with tally_waits(tally), tracing.attach(job_trace), tracing.span('discovery', terms=search_terms):
+                # Companies found before an interruption but never finished go first
+                for row in checkpoint:
+                    if is_cancelled(search_id):
+                        break
+                    if not row['done']:
+                        submit(row['index'], row['company'])
                 
-                scraping_progress[search_id]['results'].append(result)
-            else:
-                logger.info(f"Skipping company {company['name']} - no emails found")
+                companies = discover_companies(scraper, search_terms, max_companies, matched_terms, already_found=len(checkpoint))
+                for index, company in enumerate(companies, start=len(checkpoint)):
+                    if is_cancelled(search_id):
+                        break
+                    progress['total_companies'] = index + 1
+                    progress['companies_found'] = index + 1
+                    job_store.checkpoint_company(search_id, index, company)
+                    submit(index, company)
             
-            # Reduced delay for faster scraping
-            time.sleep(0.5)
+            drain(block=True)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        # Keep companies that finished before a cancellation was noticed, so a resume doesn't redo them
+        while True:
+            try:
+                index, future = done_queue.get_nowait()
+            except Empty:
+                break
+            if not future.cancelled():
+                collector.add(index, outcome(index, future))
+        
+        # Flush whatever finished out of order before a cancellation
+        collector.flush_all()
         
-        scraping_progress[search_id]['status'] = 'completed'
-        scraping_progress[search_id]['progress'] = 100
+        # Later terms can match companies whose results were already written
+        if len(search_terms) > 1:
+            collector.update_matched_terms(search_terms)
         
-        # Clean up driver after completion
-        scraper.cleanup_driver()
+        if not is_cancelled(search_id):
+            progress['status'] = 'completed'
+            progress['progress'] = 100
+        
+        fast = progress['fast_path_companies']
+        slow = progress['slow_path_companies']
+        progress['fast_path_ratio'] = round(fast / (fast + slow), 3) if fast + slow else 0.0
+        progress.update(tally.as_dict())
+        logger.info(
+            f"Search {search_id} {progress['status']}: {fast} companies via HTTP fast path, {slow} via browser, "
+            f"{progress['companies_from_cache']} from cache"
+        )
         
     except Exception as e:
         logger.error(f"Error in background scraping: {e}")
-        scraping_progress[search_id]['status'] = 'error'
-        scraping_progress[search_id]['error'] = str(e)
-        # Clean up driver on error
-        scraper.cleanup_driver()
+        progress['status'] = 'error'
+        progress['error'] = str(e)
+    finally:
+        job_store.save_job(search_id, progress)
+        job_store.flush()
+        release_job(search_id)
+        if job_trace:
+            job_trace.add('job', job_started, time.perf_counter(), {'status': progress['status'], 'resume': resume})
+            try:
+                job_trace.save(trace_path(search_id))
+            except OSError as e:
+                logger.error(f"Failed to save trace for {search_id}: {e}")
+            job_traces.pop(search_id, None)
 
 @app.route('/')
 @login_required
@@ -446,190 +505,413 @@ def logout():
     session.pop('logged_in', None)
     return redirect(url_for('login'))
 
+def new_search_id():
+    """A search ID no other job (in any worker) has used"""
+    while True:
+        search_id = f"search_{int(time.time())}_{uuid.uuid4().hex[:12]}"
+        if job_store.get_status(search_id) is None:
+            return search_id
+
+def resolve_search_terms(data):
+    """Terms a search request asks for: `search_terms`, else the `sector`'s terms, else `search_term`
+    
+    Blank and repeated (case-insensitive) terms are dropped, keeping the first MAX_SEARCH_TERMS.
+    """
+    terms = data.get('search_terms')
+    if not terms and data.get('sector') in SECTORS:
+        terms = SECTORS[data['sector']]['search_terms']
+    if not terms:
+        terms = [data.get('search_term', '')]
+    if isinstance(terms, str):
+        terms = [terms]
+    
+    unique = []
+    seen = set()
+    for term in terms:
+        term = str(term).strip()
+        if term and term.lower() not in seen:
+            seen.add(term.lower())
+            unique.append(term)
+    return unique[:MAX_SEARCH_TERMS]
+
+def client_id():
+    """Who is asking, for per-client fair share
+    
+    Behind TRUSTED_PROXY_HOPS proxies this is the address the outermost trusted proxy saw
+    (set by ProxyFix), so a client can't pick a new identity per request with its own
+    X-Forwarded-For header.
+    """
+    return request.remote_addr
+
 @app.route('/api/search', methods=['POST'])
 @login_required
 def start_search():
     try:
         data = request.get_json()
-        search_term = data.get('search_term', '').strip()
+        search_terms = resolve_search_terms(data)
+        # The job's label; a sector or term list alone is enough
+        search_term = data.get('search_term', '').strip() or SECTORS.get(data.get('sector'), {}).get('name') or (search_terms[0] if search_terms else '')
         max_companies = data.get('max_companies', DEFAULT_MAX_COMPANIES)
         scrape_all_emails = data.get('scrape_all_emails', False)
+        workers = max(1, min(int(data.get('workers', DEFAULT_JOB_WORKERS)), MAX_JOB_WORKERS))
+        force_refresh = bool(data.get('force_refresh', False))
+        trace = bool(data.get('trace', False))  # Record a timeline for /api/trace/<search_id>
+        # Higher runs first when searches are queued
+        priority = max(-MAX_SEARCH_PRIORITY, min(int(data.get('priority', 0)), MAX_SEARCH_PRIORITY))
         
-        if not search_term:
+        if not search_terms:
             return jsonify({'error': 'Search term is required'}), 400
         
-        # Generate unique search ID
-        search_id = f"search_{int(time.time())}"
+        search_id = new_search_id()
         
-        logger.info(f"Starting search: {search_term} (max companies: {max_companies}, scrape all emails: {scrape_all_emails})")
+        logger.info(f"Queueing search {search_id}: {search_term} (terms: {search_terms}, max companies: {max_companies}, scrape all emails: {scrape_all_emails}, workers: {workers})")
         
-        # Start background scraping task
-        thread = threading.Thread(
-            target=background_scraping_task,
-            args=(search_id, search_term, max_companies, scrape_all_emails)
-        )
-        thread.daemon = True
-        thread.start()
+        # Register the job before the scheduler can start it, so it can be polled and cancelled while queued
+        params = {
+            'max_companies': max_companies,
+            'scrape_all_emails': scrape_all_emails,
+            'workers': workers,
+            'force_refresh': force_refresh,
+            'priority': priority,
+            'trace': trace
+        }
+        progress = new_job_progress(search_term, workers, status='queued', search_terms=search_terms, params=params)
+        scraping_progress[search_id] = progress
+        job_store.create_job(search_id, progress)
+        job_store.acquire_lease(search_id, WORKER_ID, JOB_LEASE_SECONDS)
+        try:
+            position = job_scheduler.submit(
+                search_id,
+                background_scraping_task,
+                args=(search_id, search_term, max_companies, scrape_all_emails, workers, force_refresh, search_terms, False, trace),
+                client=client_id(),
+                priority=priority
+            )
+        except QueueFullError as e:
+            release_job(search_id)
+            job_store.delete_job(search_id)
+            logger.warning(f"Rejected search {search_term}: {e}")
+            return jsonify({'error': str(e)}), 429, {'Retry-After': str(QUEUE_FULL_RETRY_AFTER)}
         
         return jsonify({
             'search_id': search_id,
-            'message': 'Search started successfully',
-            'search_term': search_term
+            'message': 'Search queued' if position else 'Search started successfully',
+            'search_term': search_term,
+            'search_terms': search_terms,
+            'queue_position': position
         })
         
     except Exception as e:
         logger.error(f"Error starting search: {e}")
         return jsonify({'error': str(e)}), 500
 
+def progress_delta(search_id, since, include_results=True):
+    """The job's counters plus only the results appended after position `since`, or None if unknown"""
+    progress = job_store.get_job(search_id, include_results=False)
+    if progress is None:
+        return None
+    results = job_store.get_results(search_id, since) if include_results else []
+    progress['results'] = results
+    progress['cursor'] = since + len(results)
+    return progress
+
+def parse_cursor(value):
+    """A non-negative results cursor from a query arg or Last-Event-ID header, or None if absent/invalid"""
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
 @app.route('/api/progress/<search_id>')
 @login_required
 def get_progress(search_id):
-    """Get progress of a specific search"""
-    if search_id not in scraping_progress:
+    """Get progress of a specific search
+    
+    With ?since=<cursor> only the results appended after that cursor are returned;
+    pass back the returned `cursor` on the next poll.
+    """
+    since = parse_cursor(request.args.get('since'))
+    if since is None:
+        progress = job_store.get_job(search_id)
+        if progress is not None:
+            progress['cursor'] = len(progress['results'])
+    else:
+        progress = progress_delta(search_id, since)
+    if progress is None:
         return jsonify({'error': 'Search ID not found'}), 404
     
-    return jsonify(scraping_progress[search_id])
+    return jsonify(progress)
+
+@app.route('/api/progress/<search_id>/stream')
+@login_required
+def stream_progress(search_id):
+    """Server-Sent Events stream of a search's progress
+    
+    Each `progress` event carries the counters and only the newly appended results, with the
+    results cursor as the event id, so a reconnecting EventSource resumes where it left off.
+    The stream ends with a `done` event once the search reaches a terminal status.
+    Send ?results=0 to get only the counters.
+    """
+    since = parse_cursor(request.headers.get('Last-Event-ID'))
+    if since is None:
+        since = parse_cursor(request.args.get('since')) or 0
+    include_results = request.args.get('results') != '0'
+    if job_store.get_status(search_id) is None:
+        return jsonify({'error': 'Search ID not found'}), 404
+    
+    def events():
+        cursor = since
+        last_counters = None
+        last_sent = time.monotonic()
+        while True:
+            delta = progress_delta(search_id, cursor, include_results)
+            if delta is None:
+                return
+            finished = delta['status'] in TERMINAL_STATUSES
+            counters = {key: value for key, value in delta.items() if key not in ('results', 'cursor')}
+            if delta['results'] or counters != last_counters or finished:
+                cursor = delta['cursor']
+                last_counters = counters
+                last_sent = time.monotonic()
+                event = 'done' if finished else 'progress'
+                yield f"id: {cursor}\nevent: {event}\ndata: {json.dumps(delta)}\n\n"
+                if finished:
+                    return
+            elif time.monotonic() - last_sent >= PROGRESS_STREAM_HEARTBEAT:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            time.sleep(PROGRESS_STREAM_INTERVAL)
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/results/<search_id>')
 @login_required
 def get_results(search_id):
-    """Get results of a completed search"""
-    if search_id not in scraping_progress:
+    """Get one page of results of a completed (or cancelled) search
+    
+    Takes ?limit= (default 100) and ?cursor= (position to start from); keep passing back
+    `next_cursor` until it is null.
+    """
+    progress = job_store.get_job(search_id, include_results=False)
+    if progress is None:
         return jsonify({'error': 'Search ID not found'}), 404
     
-    progress = scraping_progress[search_id]
-    if progress['status'] != 'completed':
+    if progress['status'] not in ('completed', 'cancelled'):
         return jsonify({'error': 'Search not completed yet'}), 400
     
+    cursor = parse_cursor(request.args.get('cursor')) or 0
+    limit = parse_cursor(request.args.get('limit'))
+    limit = min(limit or RESULTS_PAGE_SIZE, MAX_RESULTS_PAGE_SIZE)
+    # Fetch one extra row to know whether another page follows
+    results = job_store.get_results(search_id, cursor, limit + 1)
+    
     return jsonify({
         'search_term': progress.get('search_term', ''),
         'companies_found': progress['companies_found'],
         'emails_found': progress['emails_found'],
-        'results': progress['results']
+        'results_count': progress.get('results_count'),
+        'results': results[:limit],
+        'cursor': cursor,
+        'next_cursor': cursor + limit if len(results) > limit else None
     })
 
-@app.route('/api/cancel/<search_id>')
+@app.route('/api/cancel/<search_id>', methods=['GET', 'POST'])
 @login_required
 def cancel_search(search_id):
     """Cancel a running search"""
-    if search_id not in scraping_progress:
+    if not job_store.request_cancel(search_id):
         return jsonify({'error': 'Search ID not found'}), 404
     
-    scraping_progress[search_id]['status'] = 'cancelled'
+    # The worker running the job sees the cancellation through the job store
+    if search_id in scraping_progress:
+        scraping_progress[search_id]['status'] = 'cancelled'
+    if job_scheduler.cancel(search_id):
+        release_job(search_id)
     return jsonify({'message': 'Search cancelled successfully'})
 
-@app.route('/api/export/csv/<search_id>')
+@app.route('/api/resume/<search_id>', methods=['POST'])
 @login_required
-def export_csv(search_id):
-    """Export results to CSV"""
-    if search_id not in scraping_progress:
-        return jsonify({'error': 'Search ID not found'}), 404
+def resume_search(search_id):
+    """Resume a cancelled, failed or abandoned search from its checkpoint, skipping finished companies
     
-    progress = scraping_progress[search_id]
-    if progress['status'] != 'completed':
-        return jsonify({'error': 'Search not completed yet'}), 400
+    A job is abandoned once the worker that queued or ran it stops renewing its lease. Taking
+    the lease over is atomic, so a live job is never run twice by two workers.
+    """
+    progress = job_store.get_job(search_id, include_results=False)
+    if progress is None:
+        return jsonify({'error': 'Search ID not found'}), 404
     
-    # Create CSV in memory
-    output = io.StringIO()
-    writer = csv.writer(output)
+    status = progress['status']
+    if status == 'completed':
+        return jsonify({'error': 'Search already completed'}), 400
+    params = progress.get('params')
+    if not params:
+        return jsonify({'error': 'Search was started before checkpointing and cannot be resumed'}), 400
+    # The worker queueing or running the job renews its lease until the job stops
+    if search_id in scraping_progress or not job_store.acquire_lease(search_id, WORKER_ID, JOB_LEASE_SECONDS):
+        return jsonify({'error': 'Search is still running'}), 409
     
-    # Write header
-    writer.writerow([
-        'Company Name', 'Company URL', 'Company Contact Info', 
-        'Total Emails', 'Sector', 'Scraped At'
-    ])
+    companies_done = sum(1 for row in job_store.get_checkpoint(search_id) if row['done'])
+    progress.pop('error', None)
+    progress.pop('updated_at', None)
+    progress['status'] = 'queued'
+    progress['queue_position'] = 0
+    scraping_progress[search_id] = progress
+    job_store.reopen_job(search_id, progress)
+    try:
+        position = job_scheduler.submit(
+            search_id,
+            background_scraping_task,
+            args=(search_id, progress['search_term'], params['max_companies'], params['scrape_all_emails'],
+                  params['workers'], params['force_refresh'], progress['search_terms'], True, params.get('trace', False)),
+            client=client_id(),
+            priority=params.get('priority', 0)
+        )
+    except QueueFullError as e:
+        release_job(search_id)
+        job_store.reopen_job(search_id, dict(progress, status=status))
+        return jsonify({'error': str(e)}), 429, {'Retry-After': str(QUEUE_FULL_RETRY_AFTER)}
     
-    # Write data
-    for company in progress['results']:
-        writer.writerow([
-            company['name'],
-            company['url'],
-            '; '.join(company['company_emails']),
-            company['total_emails'],
-            company.get('sector', ''),
-            company.get('scraped_at', '')
-        ])
+    logger.info(f"Resuming search {search_id} ({status} before)")
+    return jsonify({
+        'search_id': search_id,
+        'message': 'Search queued to resume' if position else 'Search resumed',
+        'search_term': progress['search_term'],
+        'companies_done': companies_done,
+        'queue_position': position
+    })
+
+def export_response(search_id, extension, mimetype, render):
+    """Stream an export of a search's results, gzip-encoded when the client accepts it
     
-    output.seek(0)
+    Works on running searches too, exporting whatever results exist so far.
+    `render(job, results)` turns the job dict and a lazy results iterator into text pieces.
+    Send ?gzip=0 to turn compression off.
+    """
+    job = job_store.get_job(search_id, include_results=False)
+    if job is None:
+        return jsonify({'error': 'Search ID not found'}), 404
     
-    # Generate filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"trustpilot_emails_{search_id}_{timestamp}.csv"
+    chunks = exports.encode_chunks(render(job, job_store.iter_results(search_id)))
+    headers = {
+        'Content-Disposition': f"attachment; filename=trustpilot_emails_{search_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+        'X-Search-Status': job['status'],
+        'Vary': 'Accept-Encoding',
+    }
+    if request.args.get('gzip') != '0' and 'gzip' in request.accept_encodings:
+        chunks = exports.gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
     
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
-    )
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+@app.route('/api/export/csv/<search_id>')
+@login_required
+def export_csv(search_id):
+    """Export results to CSV"""
+    return export_response(search_id, 'csv', 'text/csv', lambda job, results: exports.iter_csv(results))
 
 @app.route('/api/export/json/<search_id>')
 @login_required
 def export_json(search_id):
     """Export results to JSON"""
-    if search_id not in scraping_progress:
-        return jsonify({'error': 'Search ID not found'}), 404
-    
-    progress = scraping_progress[search_id]
-    if progress['status'] != 'completed':
-        return jsonify({'error': 'Search not completed yet'}), 400
-    
-    # Generate filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"trustpilot_emails_{search_id}_{timestamp}.json"
-    
-    return send_file(
-        io.BytesIO(json.dumps(progress, indent=2).encode('utf-8')),
-        mimetype='application/json',
-        as_attachment=True,
-        download_name=filename
-    )
+    return export_response(search_id, 'json', 'application/json', exports.iter_json)
+
+@app.route('/api/export/ndjson/<search_id>')
+@login_required
+def export_ndjson(search_id):
+    """Export results as newline-delimited JSON, one company per line"""
+    return export_response(search_id, 'ndjson', 'application/x-ndjson', lambda job, results: exports.iter_ndjson(results))
+
+@app.route('/api/trace/<search_id>')
+@login_required
+def get_trace(search_id):
+    """Chrome trace / Perfetto JSON timeline of a search started with trace: true"""
+    trace = job_traces.get(search_id)
+    if trace is not None:
+        # Still running in this worker: the spans recorded so far
+        return jsonify(trace.to_chrome_trace())
+    if job_store.get_status(search_id) is None:
+        return jsonify({'error': 'Search not found'}), 404
+    path = trace_path(search_id)
+    if not os.path.exists(path):
+        return jsonify({'error': 'No trace for this search; start it with "trace": true'}), 404
+    with open(path) as f:
+        return Response(f.read(), mimetype='application/json')
 
 @app.route('/api/sectors')
 @login_required
 def get_sectors():
     """Get available sectors for search suggestions"""
-    sectors = {
-        'real_estate': {
-            'name': 'Real Estate',
-            'search_terms': ['real estate', 'property', 'realtor', 'estate agent', 'property management'],
-            'description': 'Real estate agencies, property management, realtors, and property services'
-        },
-        'finance': {
-            'name': 'Finance & Banking',
-            'search_terms': ['finance', 'banking', 'investment', 'insurance', 'mortgage'],
-            'description': 'Banks, investment firms, insurance companies, and financial services'
-        },
-        'healthcare': {
-            'name': 'Healthcare',
-            'search_terms': ['healthcare', 'medical', 'hospital', 'clinic', 'pharmacy'],
-            'description': 'Hospitals, clinics, medical practices, and healthcare services'
-        },
-        'technology': {
-            'name': 'Technology',
-            'search_terms': ['technology', 'software', 'IT', 'digital', 'tech'],
-            'description': 'Software companies, IT services, and technology firms'
-        },
-        'retail': {
-            'name': 'Retail & E-commerce',
-            'search_terms': ['retail', 'ecommerce', 'online store', 'shopping', 'marketplace'],
-            'description': 'Online stores, retail chains, and e-commerce platforms'
-        },
-        'custom': {
-            'name': 'Custom Search',
-            'search_terms': [],
-            'description': 'Enter your own search terms for any industry or company type'
-        }
-    }
-    return jsonify(sectors)
+    return jsonify(SECTORS)
+
+@app.route('/api/pool')
+@login_required
+def get_pool_stats():
+    """Get Chrome driver pool occupancy and wait-time statistics"""
+    return jsonify(driver_pool.stats())
+
+@app.route('/api/cache')
+@login_required
+def get_cache_stats():
+    """Get HTTP response cache and company cache statistics"""
+    stats = {'http': {'enabled': False}, 'companies': {'enabled': False}}
+    if scraper.http_cache:
+        stats['http'] = dict(scraper.http_cache.stats(), enabled=True)
+    if company_cache:
+        stats['companies'] = dict(company_cache.stats(), enabled=True)
+    return jsonify(stats)
+
+@app.route('/api/waits')
+@login_required
+def get_wait_stats():
+    """Get how long each page readiness wait actually took, to tune the upper bounds"""
+    return jsonify(readiness.recorder.stats())
+
+@app.route('/api/queue')
+@login_required
+def get_queue_stats():
+    """Get how many searches are running and waiting in this worker's scheduler"""
+    return jsonify(job_scheduler.stats())
+
+@app.route('/api/rate_limit')
+@login_required
+def get_rate_limit_stats():
+    """Get the shared rate limiter's current per-host rates, pauses and wait totals"""
+    return jsonify(rate_limiter.stats())
+
+metrics.Gauge('trustpilot_jobs_running', 'Searches running in this worker', lambda: job_scheduler.stats()['running'])
+metrics.Gauge('trustpilot_jobs_queued', 'Searches waiting for a slot in this worker', lambda: job_scheduler.stats()['queued'])
+metrics.Gauge('trustpilot_chrome_processes', 'Live Chrome drivers in the pool (idle, leased or launching)', lambda: driver_pool.stats()['live'])
+metrics.Gauge('trustpilot_scraping_progress_jobs', 'Entries in this worker\'s scraping_progress dict', lambda: len(scraping_progress))
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Prometheus scrape endpoint; protected by METRICS_TOKEN instead of the login session, or public if METRICS_PUBLIC"""
+    if METRICS_TOKEN:
+        if request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            return jsonify({'error': 'Authentication required'}), 401
+    elif not METRICS_PUBLIC:
+        return jsonify({'error': 'Metrics are disabled; set METRICS_TOKEN'}), 404
+    return Response(metrics.REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/health')
 def health_check():
-    return jsonify({'status': 'healthy', 'message': 'Trustpilot Email Scraper is running'})
+    return jsonify({
+        'status': 'healthy',
+        'message': 'Trustpilot Email Scraper is running',
+        'startup_seconds': round(sum(STARTUP_PHASES.values()), 4)
+    })
 
 @app.route('/health')
 def health_check_root():
     return 'ok', 200
 
+startup_phase('routes')
+logger.info(f"Startup finished in {sum(STARTUP_PHASES.values()) * 1000:.0f} ms: {STARTUP_PHASES}")
+
 if __name__ == '__main__':
     app.run(debug=FLASK_DEBUG, host=FLASK_HOST, port=FLASK_PORT)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: extraction module vs. the original inline regex code
+
+Usage: python bench_extraction.py [--names N] [--blocks N] [--repeat N]
+"""
+
+import argparse
+import random
+import re
+import string
+import time
+
+import extraction
+
+
+def legacy_clean_company_name(raw_name):
+    """The original TrustpilotScraper.clean_company_name, kept as the reference implementation"""
+    if not raw_name:
+        return ""
+    clean_name = re.sub(r'www\.[^\s]+', '', raw_name)
+    clean_name = re.sub(r'[0-9]+\.[0-9]+', '', clean_name)
+    clean_name = re.sub(r'[0-9,]+\s*reviews?', '', clean_name)
+    clean_name = re.sub(r'[0-9,]+\s*ratings?', '', clean_name)
+    clean_name = re.sub(r'\d+\s+[A-Za-z\s]+,?\s*[A-Za-z\s]+,?\s*[A-Za-z\s]+$', '', clean_name)
+    clean_name = re.sub(r'[0-9,]+', '', clean_name)
+    clean_name = re.sub(r'[^\w\s\-&]', '', clean_name)
+    clean_name = re.sub(r'\s+', ' ', clean_name)
+    clean_name = re.sub(r'^[^\w]*', '', clean_name)
+    clean_name = re.sub(r'[^\w]*$', '', clean_name)
+    return clean_name.strip()
+
+
+def legacy_is_personal_email(email):
+    personal_domains = [
+        'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
+        'aol.com', 'icloud.com', 'protonmail.com', 'mail.com'
+    ]
+    domain = email.split('@')[-1].lower()
+    return domain in personal_domains
+
+
+def legacy_company_emails(texts):
+    company_emails = []
+    for text in texts:
+        emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+        company_emails.extend(email for email in emails if not legacy_is_personal_email(email))
+    return company_emails
+
+
+def make_raw_names(count, rng):
+    """Raw search-result anchor texts shaped like Trustpilot's (name + domain + rating + reviews + location)"""
+    names = []
+    for _ in range(count):
+        word = ''.join(rng.choice(string.ascii_letters) for _ in range(rng.randint(3, 12)))
+        names.append(
+            f"{word.title()} Ltd{'www.' if rng.random() < 0.5 else ''}{word.lower()}.com"
+            f"{rng.randint(1, 4)}.{rng.randint(0, 9)}{rng.randint(1, 99)},{rng.randint(100, 999)}reviews"
+            f"{rng.randint(1, 300)} High Street, London, United Kingdom"
+        )
+    return names
+
+
+def make_text_blocks(count, rng):
+    """Contact-section sized text blocks with a mix of company and personal emails"""
+    domains = ['acme.co.uk', 'gmail.com', 'example.org', 'hotmail.com', 'shop.dk']
+    blocks = []
+    for i in range(count):
+        filler = ' '.join(rng.choice(['Contact', 'us', 'at', 'our', 'office', 'Email', 'phone', '0123']) for _ in range(60))
+        blocks.append(f"{filler} info{i}@{rng.choice(domains)} {filler} sales@{rng.choice(domains)}")
+    return blocks
+
+
+def timed(func, *args, repeat=1):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--names', type=int, default=20000)
+    parser.add_argument('--blocks', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    # Search variants return overlapping results, so repeat a share of the inputs
+    names = make_raw_names(args.names // 2, rng) * 2
+    blocks = make_text_blocks(args.blocks // 2, rng) * 2
+
+    legacy_time, legacy_names = timed(lambda: [legacy_clean_company_name(n) for n in names], repeat=args.repeat)
+    extraction._clean_company_name.cache_clear()
+    new_time, new_names = timed(lambda: extraction.clean_company_names(names), repeat=1)
+    assert legacy_names == new_names, "clean_company_name output differs from the reference"
+    print(f"clean_company_name: {len(names)} names")
+    print(f"  legacy      {legacy_time * 1000:8.1f} ms  {len(names) / legacy_time:12,.0f} names/s")
+    print(f"  extraction  {new_time * 1000:8.1f} ms  {len(names) / new_time:12,.0f} names/s  ({legacy_time / new_time:.1f}x)")
+
+    size_mb = sum(len(b) for b in blocks) / 1024 / 1024
+    legacy_time, legacy_emails = timed(legacy_company_emails, blocks, repeat=args.repeat)
+    extraction._company_emails.cache_clear()
+    new_time, new_emails = timed(extraction.find_company_emails_batch, blocks, repeat=1)
+    assert legacy_emails == new_emails, "company email extraction output differs from the reference"
+    print(f"company emails: {len(blocks)} blocks, {size_mb:.1f} MB")
+    print(f"  legacy      {legacy_time * 1000:8.1f} ms  {size_mb / legacy_time:8.1f} MB/s")
+    print(f"  extraction  {new_time * 1000:8.1f} ms  {size_mb / new_time:8.1f} MB/s  ({legacy_time / new_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
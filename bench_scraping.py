@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+End-to-end scraping benchmark against the local fixture server
+
+Starts fixture_server.py in a subprocess, points the scraper at it through
+TRUSTPILOT_BASE_URL and times search_companies, the HTTP and browser company
+scrapers and a full background_scraping_task. For each benchmark it reports
+companies/minute, p50/p95 per-company latency, peak RSS (this process plus
+Chrome) and WebDriver call counts, and saves the report as JSON so runs of
+different versions can be compared with --compare.
+
+Usage: python bench_scraping.py [--companies N] [--workers N] [--latency S] [--error-rate R] [--out PATH] [--compare PATH]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from driver_pool import CountingDriver, process_tree_rss_mb
+
+RSS_SAMPLE_INTERVAL = 0.05  # seconds
+# Metrics compared by --compare, and whether higher is better
+COMPARED_METRICS = [
+    ('companies_per_minute', True),
+    ('latency_p50_ms', False),
+    ('latency_p95_ms', False),
+    ('peak_rss_mb', False),
+    ('webdriver_calls', False),
+]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, None if it is empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RssSampler:
+    """Samples the RSS of this process and its children (Chrome) in the background and keeps the peak"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = process_tree_rss_mb(os.getpid())
+        if rss is None:
+            # No /proc: fall back to the lifetime peak of this process alone (KB on Linux, bytes on macOS)
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss = maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        self.peak_mb = max(self.peak_mb, rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+class DriverCounter:
+    """Driver factory wrapper that counts every WebDriver command sent to the drivers it creates"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.drivers = []
+        self.launch_failures = 0
+
+    def __call__(self):
+        driver = self.factory()
+        if driver is None:
+            self.launch_failures += 1
+            return None
+        counted = CountingDriver(driver)
+        self.drivers.append(counted)
+        return counted
+
+    @property
+    def calls(self):
+        return sum(driver.calls for driver in self.drivers)
+
+
+def summarize(companies, seconds, latencies, peak_rss_mb, webdriver_calls=0, **extra):
+    return dict(
+        companies=companies,
+        seconds=round(seconds, 3),
+        companies_per_minute=round(companies / seconds * 60, 1) if seconds else None,
+        latency_p50_ms=round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+        latency_p95_ms=round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        peak_rss_mb=round(peak_rss_mb, 1),
+        webdriver_calls=webdriver_calls,
+        **extra
+    )
+
+
+def bench_search(app, term, companies):
+    """search_companies; per-company latency is the gap between consecutive companies being found"""
+    latencies = []
+    with RssSampler() as rss:
+        started = last = time.perf_counter()
+        found = 0
+        for _ in app.scraper.iter_companies(term, companies):
+            now = time.perf_counter()
+            latencies.append(now - last)
+            last = now
+            found += 1
+        seconds = time.perf_counter() - started
+    return summarize(found, seconds, latencies, rss.peak_mb)
+
+
+def bench_company_pages(scrape, companies):
+    """Scrape each company page in turn with scrape(url) -> emails (None if the page failed)"""
+    latencies = []
+    emails = 0
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        for company in companies:
+            company_started = time.perf_counter()
+            emails += len(scrape(company['url']) or [])
+            latencies.append(time.perf_counter() - company_started)
+        seconds = time.perf_counter() - started
+    return latencies, seconds, rss.peak_mb, emails
+
+
+def bench_http_pages(app, companies):
+    latencies, seconds, peak_rss_mb, emails = bench_company_pages(
+        lambda url: app.scraper.scrape_company_page_http(url)[0], companies)
+    return summarize(len(companies), seconds, latencies, peak_rss_mb, emails_found=emails)
+
+
+def bench_browser_pages(app, companies):
+    counter = DriverCounter(app.scraper.create_driver)
+    driver = counter()
+    if driver is None:
+        return {'skipped': 'Chrome could not be started'}
+    try:
+        latencies, seconds, peak_rss_mb, emails = bench_company_pages(
+            lambda url: app.scraper.scrape_company_page(url, driver=driver), companies)
+        return summarize(len(companies), seconds, latencies, peak_rss_mb, counter.calls,
+                         webdriver_calls_per_company=round(counter.calls / len(companies), 1) if companies else None,
+                         emails_found=emails)
+    finally:
+        driver.quit()
+
+
+def bench_job(app, term, companies, workers):
+    """A full background_scraping_task, with per-company latency measured around scrape_one_company"""
+    from driver_pool import DriverPool
+
+    counter = DriverCounter(app.scraper.create_driver)
+    settings = app.scraping
+    pool = DriverPool(counter, size=settings.DRIVER_POOL_SIZE, max_page_loads=settings.DRIVER_MAX_PAGE_LOADS,
+                      max_rss_mb=settings.DRIVER_MAX_RSS_MB, acquire_timeout=settings.DRIVER_ACQUIRE_TIMEOUT)
+    latencies = []
+    original_scrape = app.scrape_one_company
+
+    def timed_scrape(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original_scrape(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    original_pool = app.driver_pool
+    app.driver_pool = pool
+    app.scrape_one_company = timed_scrape
+    search_id = app.new_search_id()
+    try:
+        with RssSampler() as rss:
+            started = time.perf_counter()
+            app.background_scraping_task(search_id, term, companies, False, workers)
+            seconds = time.perf_counter() - started
+    finally:
+        app.scrape_one_company = original_scrape
+        app.driver_pool = original_pool
+        pool.close()
+
+    job = app.job_store.get_job(search_id, include_results=False)
+    return summarize(job['companies_processed'], seconds, latencies, rss.peak_mb, counter.calls,
+                     status=job['status'], emails_found=job['emails_found'],
+                     results=job['results_count'], workers=workers,
+                     fast_path_companies=job['fast_path_companies'],
+                     slow_path_companies=job['slow_path_companies'],
+                     chrome_launch_failures=counter.launch_failures)
+
+
+def start_fixture_server(args):
+    command = [
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixture_server.py'),
+        '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--error-rate', str(args.error_rate), '--error-status', str(args.error_status),
+        '--browser-rate', str(args.browser_rate), '--seed', str(args.seed),
+    ]
+    if args.fixtures:
+        command += ['--fixtures', args.fixtures]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('Serving fixtures at '):
+        process.kill()
+        raise RuntimeError(f"Fixture server failed to start: {line!r}")
+    return process, line.rsplit(' ', 1)[1].strip()
+
+
+def git_version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_path} ({previous.get('version')})")
+    for name, result in report['benchmarks'].items():
+        before = previous.get('benchmarks', {}).get(name)
+        if not before or 'skipped' in result or 'skipped' in before:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            better = (change > 0) == higher_is_better
+            print(f"  {name:26} {metric:22} {old:>10} -> {new:>10}  {change:+6.1f}% {'better' if better else 'worse'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--companies', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--term', default='plumber')
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds the fixture server adds to every response")
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--browser-rate', type=float, default=0.0,
+                        help="share of company pages that need Chrome")
+    parser.add_argument('--fixtures', help="directory with recorded pages (see fixture_server.py)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-browser', action='store_true', help="don't benchmark scrape_company_page")
+    parser.add_argument('--rate-limit', action='store_true', help="keep the configured rate limiter on")
+    parser.add_argument('--label', help="free-form name stored in the report")
+    parser.add_argument('--out', help="report path (default bench-results/scraping-<version>-<time>.json)")
+    parser.add_argument('--compare', help="previous report to compare against")
+    args = parser.parse_args()
+
+    server, base_url = start_fixture_server(args)
+    try:
+        # Configure app before importing it: its settings are read at import time
+        os.environ['TRUSTPILOT_BASE_URL'] = base_url
+        os.environ.setdefault('JOB_STORE_BACKEND', 'memory')
+        os.environ.setdefault('HTTP_CACHE_ENABLED', '0')
+        os.environ.setdefault('COMPANY_CACHE_ENABLED', '0')
+        os.environ.setdefault('DRIVER_POOL_PREWARM', '0')
+        if not args.rate_limit:
+            os.environ['RATE_LIMIT_ENABLED'] = '0'
+        import app
+
+        benchmarks = {'search_companies': bench_search(app, args.term, args.companies)}
+        companies = app.scraper.search_companies(args.term, args.companies)
+        benchmarks['scrape_company_page_http'] = bench_http_pages(app, companies)
+        if args.skip_browser:
+            benchmarks['scrape_company_page'] = {'skipped': '--skip-browser'}
+        else:
+            benchmarks['scrape_company_page'] = bench_browser_pages(app, companies)
+        benchmarks['background_scraping_task'] = bench_job(app, args.term, args.companies, args.workers)
+        with app.scraper.engine.get(f"{base_url}/__stats") as response:
+            server_stats = response.json()
+    finally:
+        server.terminate()
+        server.wait()
+
+    version = git_version()
+    report = {
+        'version': version,
+        'label': args.label,
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('out', 'compare', 'label')},
+        'fixture_server': server_stats,
+        'benchmarks': benchmarks,
+    }
+
+    for name, result in benchmarks.items():
+        if 'skipped' in result:
+            print(f"{name:26} skipped: {result['skipped']}")
+            continue
+        print(f"{name:26} {result['companies']:5} companies  {result['companies_per_minute'] or 0:9.1f}/min  "
+              f"p50 {result['latency_p50_ms'] or 0:8.1f} ms  p95 {result['latency_p95_ms'] or 0:8.1f} ms  "
+              f"peak RSS {result['peak_rss_mb']:7.1f} MB  {result['webdriver_calls']} WebDriver calls")
+
+    out = args.out or os.path.join(
+        'bench-results', f"scraping-{version or 'unknown'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: search page parsing with page_parser vs. the original BeautifulSoup code
+
+Parses saved search pages (every *.html in --pages) or, without it, pages
+generated by fixture_server.py. Checks that both parsers find the same
+companies, then reports parse time and the memory a parsed page tree takes.
+The memory is measured as RSS growth in a fresh process holding every tree,
+since tracemalloc can't see lxml's C allocations.
+
+Usage: python bench_search_parse.py [--pages DIR] [--count N] [--repeat N]
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from fixture_server import FixtureSite
+from page_parser import extract_search_results, parse_html
+
+BASE_URL = 'https://www.trustpilot.com'
+
+
+def legacy_search_results(content, base_url):
+    """The original TrustpilotScraper.search_companies parsing, kept as the reference implementation"""
+    soup = BeautifulSoup(content, 'html.parser')
+    results = []
+    for link in soup.find_all('a', href=re.compile(r'/review/')):
+        results.append({
+            'raw_name': link.get_text(strip=True),
+            'url': base_url + link['href'] if link['href'].startswith('/') else link['href'],
+        })
+    return results
+
+
+def load_pages(directory, count):
+    if directory:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+            with open(path, 'rb') as f:
+                pages.append(f.read())
+        if not pages:
+            raise SystemExit(f"No *.html pages in {directory}")
+        return pages
+    site = FixtureSite(companies_per_page=20)
+    return [site.search_page(f"term {i}") for i in range(count)]
+
+
+def legacy_tree(content):
+    return BeautifulSoup(content, 'html.parser')
+
+
+def lxml_tree(content):
+    return parse_html(content)
+
+
+def rss_bytes():
+    """Current RSS from /proc, or the peak RSS where /proc is missing"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def _hold_trees(build, pages, connection):
+    before = rss_bytes()
+    trees = [build(page) for page in pages]
+    connection.send((rss_bytes() - before) / len(trees))
+    connection.close()
+
+
+def tree_bytes(build, pages):
+    """Average RSS growth per page while every page's parsed tree is held, in a fresh process"""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_hold_trees, args=(build, pages, sender))
+    process.start()
+    per_page = receiver.recv()
+    process.join()
+    return per_page
+
+
+def measure(parse, build, pages, repeat):
+    """(best seconds over repeat runs, tree bytes per page, results of the last run)"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [parse(page, BASE_URL) for page in pages]
+        best = min(best, time.perf_counter() - started)
+    return best, tree_bytes(build, pages), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', help="directory of saved search result pages")
+    parser.add_argument('--count', type=int, default=200, help="generated pages when --pages is not given")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.count)
+    size_mb = sum(len(page) for page in pages) / 1024 / 1024
+
+    legacy_time, legacy_tree_bytes, legacy_results = measure(legacy_search_results, legacy_tree, pages, args.repeat)
+    new_time, new_tree_bytes, new_results = measure(extract_search_results, lxml_tree, pages, args.repeat)
+    comparable = [[{'raw_name': r['raw_name'], 'url': r['url']} for r in page] for page in new_results]
+    assert comparable == legacy_results, "page_parser found different companies than the reference"
+
+    companies = sum(len(page) for page in new_results)
+    print(f"search pages: {len(pages)} pages, {size_mb:.1f} MB, {companies} company links")
+    print(f"  bs4 html.parser  {legacy_time * 1000:8.1f} ms  {len(pages) / legacy_time:8.0f} pages/s  "
+          f"{legacy_tree_bytes / 1024:8.1f} KB per parsed page")
+    print(f"  page_parser      {new_time * 1000:8.1f} ms  {len(pages) / new_time:8.0f} pages/s  "
+          f"{new_tree_bytes / 1024:8.1f} KB per parsed page  ({legacy_time / new_time:.1f}x faster, "
+          f"{legacy_tree_bytes / max(new_tree_bytes, 1):.1f}x less memory)")
+
+
+if __name__ == '__main__':
+    main()
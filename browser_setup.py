@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Resolve the chromedriver and Chrome binaries once and remember them on disk
+
+webdriver_manager checks versions, and may download, every time it is asked
+for a driver. Here it runs at most once per cache file. The order is:
+
+1. the CHROMEDRIVER_PATH / CHROME_BINARY environment overrides
+2. the paths saved in the cache file by an earlier resolution
+3. binaries on PATH
+4. webdriver_manager (skipped in offline mode)
+
+Run `python browser_setup.py` at build time to do the network part before
+the app starts, and delete the cache file after upgrading Chrome. Selenium
+and webdriver_manager are only imported when they are actually needed.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'browser.json')
+CHROMEDRIVER_NAMES = ('chromedriver',)
+CHROME_NAMES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+
+
+class BrowserNotFoundError(Exception):
+    """Raised when chromedriver can't be found without the network in offline mode"""
+
+
+def _executable(path):
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def _which(names):
+    for name in names:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, data):
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temporary, cache_path)
+
+
+def resolve_chromedriver(cache_path=DEFAULT_CACHE_PATH, env_path=None, offline=False, install=None):
+    """Path of a usable chromedriver; `install` (default webdriver_manager) is only called as a last resort
+
+    A chromedriver found on PATH is used as is, without checking that its version
+    matches the installed Chrome; set CHROMEDRIVER_PATH to pick a specific one.
+    """
+    if env_path:
+        if not _executable(env_path):
+            raise BrowserNotFoundError(f"CHROMEDRIVER_PATH {env_path} is not an executable file")
+        return env_path
+
+    cache = load_cache(cache_path)
+    cached = cache.get('chromedriver')
+    if _executable(cached):
+        return cached
+
+    path = _which(CHROMEDRIVER_NAMES)
+    source = 'path'
+    if path is None:
+        if offline:
+            raise BrowserNotFoundError(
+                "No chromedriver found and offline mode is on; set CHROMEDRIVER_PATH or run browser_setup.py once online"
+            )
+        if install is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+
+            def install():
+                return ChromeDriverManager().install()
+        started = time.perf_counter()
+        path = install()
+        source = 'webdriver_manager'
+        logger.info(f"Installed chromedriver {path} in {time.perf_counter() - started:.1f}s")
+
+    cache.update(chromedriver=path, chromedriver_source=source, resolved_at=time.time())
+    try:
+        save_cache(cache_path, cache)
+    except OSError as e:
+        logger.warning(f"Could not save chromedriver path to {cache_path}: {e}")
+    return path
+
+
+def resolve_chrome_binary(cache_path=DEFAULT_CACHE_PATH, env_path=None):
+    """Path of the Chrome binary, or None to let Selenium find it"""
+    if env_path:
+        return env_path
+    cache = load_cache(cache_path)
+    cached = cache.get('chrome')
+    if _executable(cached):
+        return cached
+    path = _which(CHROME_NAMES)
+    if path:
+        cache.update(chrome=path)
+        try:
+            save_cache(cache_path, cache)
+        except OSError as e:
+            logger.warning(f"Could not save Chrome path to {cache_path}: {e}")
+    return path
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    cache_path = os.environ.get('BROWSER_CACHE_PATH', DEFAULT_CACHE_PATH)
+    chromedriver = resolve_chromedriver(
+        cache_path,
+        env_path=os.environ.get('CHROMEDRIVER_PATH'),
+        offline=os.environ.get('BROWSER_OFFLINE', '0') == '1'
+    )
+    chrome = resolve_chrome_binary(cache_path, env_path=os.environ.get('CHROME_BINARY'))
+    print(f"chromedriver: {chromedriver}")
+    print(f"chrome: {chrome or 'not found (Selenium will search for it)'}")
+    print(f"saved to {cache_path}")
+
+
+if __name__ == '__main__':
+    main()
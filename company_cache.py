@@ -0,0 +1,88 @@
+"""
+Cross-job cache of scraped company results, keyed by canonical Trustpilot URL
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'companies.sqlite3')
+DEFAULT_TTL = 3 * 24 * 3600  # seconds a scraped company stays fresh
+
+
+def canonical_company_url(url, base_url='https://www.trustpilot.com'):
+    """Canonical form of a company page URL: https://host/review/<domain>, lowercase, no query or slash"""
+    parts = urlsplit(url.strip())
+    host = (parts.netloc or urlsplit(base_url).netloc).lower()
+    path = parts.path.rstrip('/')
+    if path.startswith('/review/'):
+        path = '/review/' + path[len('/review/'):].split('/', 1)[0].lower()
+    return f"https://{host}{path}"
+
+
+class CompanyCache:
+    """SQLite-backed map of canonical company URL -> emails, name and scrape time"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS companies (
+                url TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                emails TEXT NOT NULL,
+                source TEXT NOT NULL,
+                scraped_at REAL NOT NULL
+            )
+        ''')
+        self._conn.commit()
+
+    def get(self, url, ttl=None):
+        """Return the cached entry for a company if it is still fresh, else None"""
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT name, emails, source, scraped_at FROM companies WHERE url = ?',
+                    (canonical_company_url(url),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Company cache lookup failed for {url}: {e}")
+            return None
+        if not row or time.time() - row[3] > ttl:
+            return None
+        return {'name': row[0], 'emails': json.loads(row[1]), 'source': row[2], 'scraped_at': row[3]}
+
+    def put(self, url, name, emails, source):
+        """Store a freshly scraped company (including companies without emails)"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO companies (url, name, emails, source, scraped_at) VALUES (?, ?, ?, ?, ?)',
+                    (canonical_company_url(url), name, json.dumps(list(emails)), source, time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Company cache write failed for {url}: {e}")
+
+    def stats(self):
+        """Return the number of cached and still-fresh companies"""
+        with self._lock:
+            total, fresh = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(scraped_at >= ?), 0) FROM companies', (time.time() - self.ttl,)
+            ).fetchone()
+        return {'companies': total, 'fresh': fresh, 'ttl_seconds': self.ttl}
@@ -0,0 +1,284 @@
+"""
+Leased pool of warm Chrome WebDriver instances for the Trustpilot scraper
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Default pool configuration
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_PAGE_LOADS = 200  # recycle a driver after this many leases
+DEFAULT_MAX_RSS_MB = 1024  # recycle a driver once Chrome grows past this
+DEFAULT_ACQUIRE_TIMEOUT = 120  # seconds
+
+
+class DriverPoolError(Exception):
+    """Raised when a driver could not be leased from the pool"""
+
+
+def process_tree_rss_mb(pid):
+    """Return the resident memory (MB) of a process and all its descendants, or None"""
+    if not pid or not os.path.isdir('/proc'):
+        return None
+
+    children = {}
+    try:
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # Field 4 is the parent pid; the command name may contain spaces
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+                children.setdefault(ppid, []).append(int(entry))
+            except (OSError, ValueError, IndexError):
+                continue
+    except OSError:
+        return None
+
+    total_kb = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError, IndexError):
+            continue
+    return total_kb / 1024.0
+
+
+class _PooledDriver:
+    """A driver owned by the pool plus its usage bookkeeping"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.page_loads = 0
+        self.created_at = time.time()
+
+    @property
+    def pid(self):
+        try:
+            return self.driver.service.process.pid
+        except Exception:
+            return None
+
+
+class DriverPool:
+    """Fixed-size pool of Chrome drivers that are leased out one task at a time"""
+
+    def __init__(self, factory, size=DEFAULT_POOL_SIZE, max_page_loads=DEFAULT_MAX_PAGE_LOADS,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB, acquire_timeout=DEFAULT_ACQUIRE_TIMEOUT):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.max_page_loads = max_page_loads
+        self.max_rss_mb = max_rss_mb
+        self.acquire_timeout = acquire_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._live = 0  # idle + leased + currently launching
+        self._leased = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            'leases': 0,
+            'launches': 0,
+            'launch_failures': 0,
+            'recycled': 0,
+            'health_check_failures': 0,
+            'acquire_timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+        }
+
+    def warm(self):
+        """Pre-launch drivers until the pool is full"""
+        while True:
+            with self._cond:
+                if self._closed or self._live >= self.size:
+                    return
+                self._live += 1
+            entry = self._launch()
+            with self._cond:
+                if entry is None:
+                    self._live -= 1
+                    self._cond.notify()
+                    return
+                self._idle.append(entry)
+                self._cond.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Lease a healthy driver for the duration of a with-block"""
+        entry = self._acquire(self.acquire_timeout if timeout is None else timeout)
+        try:
+            yield entry.driver
+        finally:
+            self._release(entry)
+
+    def stats(self):
+        """Return occupancy and wait-time statistics for sizing the pool"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self.size,
+                'live': self._live,
+                'idle': len(self._idle),
+                'leased': self._leased,
+                'waiting': self._waiting,
+                'avg_wait_seconds': (stats['total_wait_seconds'] / stats['leases']) if stats['leases'] else 0.0,
+            })
+            return stats
+
+    def close(self):
+        """Quit every idle driver; leased drivers are quit when they are returned"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._quit(entry)
+
+    def _acquire(self, timeout):
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+
+        launch = False
+        with self._cond:
+            while not self._idle and self._live >= self.size and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._stats['acquire_timeouts'] += 1
+                    raise DriverPoolError(f"No Chrome driver available after {timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if self._closed:
+                raise DriverPoolError("Driver pool is closed")
+
+            if self._idle:
+                entry = self._idle.pop()
+                self._leased += 1
+            else:
+                self._live += 1
+                self._leased += 1
+                launch = True
+
+        if launch:
+            entry = self._launch()
+            if entry is None:
+                with self._cond:
+                    self._live -= 1
+                    self._leased -= 1
+                    self._cond.notify()
+                raise DriverPoolError("Failed to launch Chrome driver")
+        elif not self._healthy(entry):
+            with self._cond:
+                self._stats['health_check_failures'] += 1
+            self._quit(entry)
+            replacement = self._launch()
+            if replacement is None:
+                with self._cond:
+                    self._live -= 1
+                    self._leased -= 1
+                    self._cond.notify()
+                raise DriverPoolError("Failed to replace unhealthy Chrome driver")
+            entry = replacement
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._stats['leases'] += 1
+            self._stats['total_wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+        entry.page_loads += 1
+        return entry
+
+    def _release(self, entry):
+        recycle = self._needs_recycle(entry)
+        if recycle:
+            self._quit(entry)
+
+        with self._cond:
+            self._leased -= 1
+            if recycle or self._closed:
+                self._live -= 1
+                if recycle:
+                    self._stats['recycled'] += 1
+            else:
+                self._idle.append(entry)
+            self._cond.notify()
+
+        if self._closed and not recycle:
+            self._quit(entry)
+
+    def _needs_recycle(self, entry):
+        if self.max_page_loads and entry.page_loads >= self.max_page_loads:
+            logger.info(f"Recycling Chrome driver after {entry.page_loads} page loads")
+            return True
+        if self.max_rss_mb:
+            rss = process_tree_rss_mb(entry.pid)
+            if rss is not None and rss > self.max_rss_mb:
+                logger.info(f"Recycling Chrome driver using {rss:.0f} MB RSS")
+                return True
+        return False
+
+    def _healthy(self, entry):
+        try:
+            entry.driver.execute_script("return 1")
+            return True
+        except Exception as e:
+            logger.warning(f"Chrome driver failed health check: {e}")
+            return False
+
+    def _launch(self):
+        try:
+            driver = self.factory()
+        except Exception as e:
+            logger.error(f"Failed to launch pooled Chrome driver: {e}")
+            driver = None
+        with self._cond:
+            if driver is None:
+                self._stats['launch_failures'] += 1
+                return None
+            self._stats['launches'] += 1
+        return _PooledDriver(driver)
+
+    def _quit(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass
+
+
+class CountingDriver:
+    """Wraps a WebDriver and counts the commands sent through it (method calls and property reads)"""
+
+    def __init__(self, driver):
+        self._driver = driver
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._driver, name)
+        if not callable(attr):
+            self.calls += 1
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+        return counted
@@ -0,0 +1,93 @@
+"""
+Streaming CSV, JSON and NDJSON exports
+
+Each exporter is a generator that encodes one result at a time. The rows are
+batched into chunks of about CHUNK_SIZE bytes and can be gzip-compressed on
+the fly, so memory use stays the same however many results a job has.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+CHUNK_SIZE = 64 * 1024  # bytes handed to the server per write
+
+CSV_HEADER = [
+    'Company Name', 'Company URL', 'Company Contact Info',
+    'Total Emails', 'Sector', 'Scraped At'
+]
+
+
+def csv_row(company):
+    return [
+        company['name'],
+        company['url'],
+        '; '.join(company['company_emails']),
+        company['total_emails'],
+        company.get('sector', ''),
+        company.get('scraped_at', '')
+    ]
+
+
+def iter_csv(results):
+    """CSV text, one line at a time, header first"""
+    line = io.StringIO()
+    writer = csv.writer(line)
+    for row in _with_header(results):
+        writer.writerow(row)
+        yield line.getvalue()
+        line.seek(0)
+        line.truncate()
+
+
+def _with_header(results):
+    yield CSV_HEADER
+    for company in results:
+        yield csv_row(company)
+
+
+def iter_ndjson(results):
+    """One JSON document per result per line"""
+    for company in results:
+        yield json.dumps(company) + '\n'
+
+
+def iter_json(job, results):
+    """The job dict as one JSON object, with its results array written element by element"""
+    yield '{\n'
+    for key, value in job.items():
+        if key != 'results':
+            yield f'  {json.dumps(key)}: {json.dumps(value)},\n'
+    yield '  "results": ['
+    separator = '\n    '
+    for company in results:
+        yield separator + json.dumps(company)
+        separator = ',\n    '
+    yield '\n  ]\n}\n'
+
+
+def encode_chunks(pieces, chunk_size=CHUNK_SIZE):
+    """UTF-8 encode text pieces and regroup them into chunks of roughly chunk_size bytes"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of byte chunks incrementally"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
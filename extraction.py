@@ -0,0 +1,131 @@
+"""
+Precompiled text extraction for company names and emails
+
+Produces exactly the same output as the original inline re.sub/re.findall
+code in TrustpilotScraper, but compiles every pattern once, looks personal
+domains up in a frozenset and memoizes repeated inputs (search variants keep
+returning the same names, and overlapping contact sections share text).
+"""
+
+import logging
+import os
+import re
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+# An email can't contain whitespace, so only whitespace-delimited tokens holding an '@'
+# need the full email pattern; the rest of a large block is skipped by str.split
+
+DEFAULT_PERSONAL_DOMAINS = frozenset([
+    'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
+    'aol.com', 'icloud.com', 'protonmail.com', 'mail.com'
+])
+
+# Applied in order; each step sees the output of the previous one
+NAME_CLEANUP_STEPS = [
+    # Remove review counts, ratings, and URLs
+    (re.compile(r'www\.[^\s]+'), ''),
+    (re.compile(r'[0-9]+\.[0-9]+'), ''),
+    (re.compile(r'[0-9,]+\s*reviews?'), ''),
+    (re.compile(r'[0-9,]+\s*ratings?'), ''),
+    # Remove location patterns (e.g., "27 Union Square West, New York, United States")
+    (re.compile(r'\d+\s+[A-Za-z\s]+,?\s*[A-Za-z\s]+,?\s*[A-Za-z\s]+$'), ''),
+    # Remove remaining numbers and special characters
+    (re.compile(r'[0-9,]+'), ''),
+    (re.compile(r'[^\w\s\-&]'), ''),  # Keep only alphanumeric, spaces, hyphens, and ampersands
+    # Normalize whitespace and strip leading/trailing non-word chars
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'^[^\w]*'), ''),
+    (re.compile(r'[^\w]*$'), ''),
+]
+
+# Bound sub methods, so the hot loop skips an attribute lookup per step
+_NAME_SUBS = [(pattern.sub, replacement) for pattern, replacement in NAME_CLEANUP_STEPS]
+
+NAME_CACHE_SIZE = 4096
+TEXT_CACHE_SIZE = 1024
+
+personal_domains = DEFAULT_PERSONAL_DOMAINS
+
+
+def load_personal_domains(path):
+    """Extend the personal email domain list from a file with one domain per line (# for comments)"""
+    global personal_domains
+    extra = set()
+    with open(path) as f:
+        for line in f:
+            domain = line.split('#', 1)[0].strip().lower()
+            if domain:
+                extra.add(domain)
+    personal_domains = personal_domains | extra
+    _company_emails.cache_clear()
+    logger.info(f"Loaded {len(extra)} personal email domains from {path}")
+    return personal_domains
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _clean_company_name(raw_name):
+    clean_name = raw_name
+    for sub, replacement in _NAME_SUBS:
+        clean_name = sub(replacement, clean_name)
+    return clean_name.strip()
+
+
+def clean_company_name(raw_name):
+    """Clean up company name by removing extra text"""
+    if not raw_name:
+        return ""
+    return _clean_company_name(raw_name)
+
+
+def clean_company_names(raw_names):
+    """Batch version of clean_company_name"""
+    return [clean_company_name(raw_name) for raw_name in raw_names]
+
+
+def is_personal_email(email):
+    """Check if email is likely personal rather than company email"""
+    return email.rpartition('@')[2].lower() in personal_domains
+
+
+def find_emails(text):
+    """All email-like strings in a block of text, in order, duplicates kept"""
+    if not text or '@' not in text:
+        return []
+    emails = []
+    for token in text.split():
+        if '@' in token:
+            emails.extend(EMAIL_PATTERN.findall(token))
+    return emails
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _company_emails(text):
+    return tuple(email for email in find_emails(text) if not is_personal_email(email))
+
+
+def find_company_emails(text):
+    """Emails in a block of text that don't belong to personal mail providers"""
+    return list(_company_emails(text)) if text else []
+
+
+def find_company_emails_batch(texts):
+    """Company emails across many text blocks in one call, in order, duplicates kept
+
+    Repeated blocks (e.g. several matches sharing one parent element) are only scanned once.
+    """
+    emails = []
+    for text in texts:
+        if text:
+            emails.extend(_company_emails(text))
+    return emails
+
+
+PERSONAL_DOMAINS_FILE = os.environ.get('PERSONAL_EMAIL_DOMAINS_FILE')
+if PERSONAL_DOMAINS_FILE:
+    try:
+        load_personal_domains(PERSONAL_DOMAINS_FILE)
+    except OSError as e:
+        logger.error(f"Failed to load personal email domains from {PERSONAL_DOMAINS_FILE}: {e}")
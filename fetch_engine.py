@@ -0,0 +1,171 @@
+"""
+asyncio fetch engine on httpx, with HTTP/2 and keep-alive connection pooling
+
+Every HTML-only request (search pages, server-rendered company pages) is
+made by one httpx.AsyncClient on an event loop running in a background
+thread. HTTPS hosts that offer HTTP/2 get one multiplexed connection; others
+get pooled HTTP/1.1 keep-alive connections, so the TCP/TLS handshake happens
+once instead of once per page. The number of requests in flight to a host is
+capped; open and kept-alive connections are capped across the whole pool. A request that takes longer than its timeout is abandoned.
+
+An in-flight request costs a coroutine rather than a blocked thread.
+Coroutines use request()/get_async(). Threaded code uses the sync get(),
+which returns a requests.Response, or run(), which waits for any coroutine,
+such as a gather() of many fetches. httpx errors are raised as the matching
+requests exceptions, so callers can't tell the engine from requests.Session.
+"""
+
+import asyncio
+import datetime
+import logging
+import threading
+import time
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO; the engine logs its own at DEBUG
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+DEFAULT_MAX_PER_HOST = 20  # requests in flight per host
+DEFAULT_MAX_CONNECTIONS = 100  # open, and kept-alive, connections across every host
+DEFAULT_TIMEOUT = 15  # seconds for a whole request, redirects included
+MAX_REDIRECTS = 10
+
+
+def _build_response(response, elapsed):
+    """A requests.Response for an httpx one"""
+    converted = requests.models.Response()
+    converted.url = str(response.url)
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.headers = CaseInsensitiveDict(response.headers)
+    converted._content = response.content
+    converted.encoding = requests.utils.get_encoding_from_headers(converted.headers)
+    converted.elapsed = datetime.timedelta(seconds=elapsed)
+    return converted
+
+
+class FetchEngine:
+    """httpx.AsyncClient on a private event loop, shared by every thread in the process"""
+
+    def __init__(self, headers=None, max_per_host=DEFAULT_MAX_PER_HOST, timeout=DEFAULT_TIMEOUT,
+                 max_connections=DEFAULT_MAX_CONNECTIONS, http2=True):
+        self.headers = dict(headers or {})
+        self.max_per_host = max_per_host
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+        # Only touched on the loop thread
+        self._slots = {}
+        self._stats = {
+            'requests': 0,
+            'http2_responses': 0,
+            'in_flight': 0,
+            'max_in_flight': 0,
+            'timeouts': 0,
+            'errors': 0,
+        }
+
+    # -- sync side --------------------------------------------------------
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._client = httpx.AsyncClient(
+                    http2=self.http2,
+                    headers=self.headers,
+                    # httpx caps keep-alive connections for the whole pool, not per host
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                    ),
+                    follow_redirects=True,
+                    max_redirects=MAX_REDIRECTS,
+                )
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='fetch-engine', daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coroutine):
+        """Run a coroutine on the engine's loop and block the calling thread for its result
+
+        The caller's context goes with it, so job wait tallies and trace spans
+        recorded while fetching are attributed to the calling job.
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("FetchEngine.run() called from the engine's own loop; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        """requests.Session.get-compatible GET, for ThrottledSession and HttpCache"""
+        return self.run(self.request(url, headers=headers, timeout=timeout))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, max_per_host=self.max_per_host, http2=self.http2)
+
+    def close(self):
+        """Close the client's connections and stop the loop thread"""
+        with self._lock:
+            loop, thread, client = self._loop, self._thread, self._client
+            self._loop = self._thread = self._client = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    # -- async side -------------------------------------------------------
+
+    async def get_async(self, url, headers=None, timeout=None, **kwargs):
+        return await self.request(url, headers=headers, timeout=timeout)
+
+    async def request(self, url, headers=None, timeout=None):
+        """GET url, following redirects; raises requests.Timeout or requests.ConnectionError like requests does"""
+        timeout = self.timeout if timeout is None else timeout
+        headers = {name: value for name, value in (headers or {}).items() if value is not None}
+        started = time.perf_counter()
+        try:
+            host = httpx.URL(url).host
+            slots = self._slots.get(host)
+            if slots is None:
+                slots = self._slots[host] = asyncio.Semaphore(self.max_per_host)
+            async with slots:
+                self._count(requests=1, in_flight=1)
+                try:
+                    # httpx's timeout applies per connect/read; wait_for bounds the whole request
+                    response = await asyncio.wait_for(self._client.get(url, headers=headers, timeout=timeout), timeout)
+                finally:
+                    self._count(in_flight=-1)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            self._count(timeouts=1)
+            raise requests.Timeout(f"GET {url} timed out after {timeout}s")
+        except httpx.TooManyRedirects as e:
+            raise requests.TooManyRedirects(str(e))
+        except httpx.UnsupportedProtocol as e:
+            raise requests.exceptions.InvalidSchema(str(e))
+        except (httpx.TransportError, httpx.InvalidURL) as e:
+            self._count(errors=1)
+            raise requests.ConnectionError(f"GET {url} failed: {e!r}")
+        finally:
+            logger.debug(f"GET {url} took {time.perf_counter() - started:.3f}s")
+
+        if response.http_version == 'HTTP/2':
+            self._count(http2_responses=1)
+        return _build_response(response, time.perf_counter() - started)
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+            self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._stats['in_flight'])
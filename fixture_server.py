@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Trustpilot, serving search-result and company pages for offline tests and benchmarks
+
+Pages are read from a fixtures directory when one is given (search.html,
+search-<page>.html and review/<domain>.html, saved from the real site) and
+generated otherwise. The generated pages have the same shape the scraper
+relies on: paginated search results (&page=N) with /review/ anchors and
+Trustpilot-style anchor text, and a contact section with company and
+personal emails on company pages. A share of company pages can
+render their contact section from JavaScript only, which forces the browser
+fallback.
+
+Every response can be delayed by a fixed latency plus random jitter, and a
+share of them replaced by an injected error (429/503 with Retry-After, or any
+other status).
+
+Usage: python fixture_server.py [--port N] [--latency S] [--jitter S] [--error-rate R] [--error-status N]
+Then:  TRUSTPILOT_BASE_URL=http://127.0.0.1:N python app.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote_plus, urlsplit
+
+DEFAULT_COMPANIES_PER_PAGE = 20
+DEFAULT_SEARCH_PAGES = 5  # result pages per query; later pages are empty
+DEFAULT_DOMAIN_POOL = 500  # distinct companies all queries draw from, so search variants overlap like on the real site
+DEFAULT_REVIEWS_PER_PAGE = 20
+STATS_PATH = '/__stats'
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ren', 'sto', 'var', 'bel', 'dun', 'fra', 'gol', 'hex', 'jun', 'nor', 'pel', 'qui', 'tas']
+PERSONAL_DOMAINS = ['gmail.com', 'hotmail.com', 'yahoo.com']
+
+
+def company_name(number):
+    """A unique, letters-only company name for a number (digits would be stripped by clean_company_name)"""
+    parts = []
+    number += len(SYLLABLES)  # at least two syllables
+    while number:
+        number, digit = divmod(number, len(SYLLABLES))
+        parts.append(SYLLABLES[digit])
+    return ''.join(reversed(parts)).title()
+
+
+def _stable_random(*parts):
+    """A Random seeded from the parts, identical across processes and runs"""
+    digest = hashlib.sha256('|'.join(str(p) for p in parts).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+
+class FixtureSite:
+    """Generates the pages; kept apart from the HTTP plumbing so tests can call it directly"""
+
+    def __init__(self, fixtures_dir=None, companies_per_page=DEFAULT_COMPANIES_PER_PAGE,
+                 domain_pool=DEFAULT_DOMAIN_POOL, browser_only_rate=0.0, no_email_rate=0.1,
+                 reviews_per_page=DEFAULT_REVIEWS_PER_PAGE, search_pages=DEFAULT_SEARCH_PAGES, seed=0):
+        self.fixtures_dir = fixtures_dir
+        self.companies_per_page = companies_per_page
+        self.search_pages = search_pages
+        self.domain_pool = domain_pool
+        self.browser_only_rate = browser_only_rate
+        self.no_email_rate = no_email_rate
+        self.reviews_per_page = reviews_per_page
+        self.seed = seed
+
+    def _recorded(self, *path):
+        if not self.fixtures_dir:
+            return None
+        full_path = os.path.join(self.fixtures_dir, *path)
+        if not os.path.isfile(full_path):
+            return None
+        with open(full_path, 'rb') as f:
+            return f.read()
+
+    def search_page(self, query, page=1):
+        recorded = self._recorded('search.html' if page == 1 else f"search-{page}.html")
+        if recorded is not None:
+            return recorded
+
+        # Page 1 keeps the seed it had before pagination, so its companies don't change
+        rng = _stable_random(self.seed, 'search', query.lower(), *([page] if page > 1 else []))
+        count = min(self.companies_per_page, self.domain_pool) if page <= self.search_pages else 0
+        numbers = rng.sample(range(self.domain_pool), count)
+        cards = []
+        for number in numbers:
+            name = company_name(number)
+            domain = f"{name.lower()}.com"
+            # Anchor text runs name, domain, rating, review count and address together, as Trustpilot's does
+            cards.append(
+                f'<div class="styles_businessUnitCard"><a href="/review/{domain}" class="link_internal">'
+                f'<p>{name} Ltd</p><p>www.{domain}</p><span>{rng.randint(10, 50) / 10}</span>'
+                f'<p>{rng.randint(1, 9999):,} reviews</p><p>{rng.randint(1, 300)} High Street, London, United Kingdom</p>'
+                f'</a></div>'
+            )
+        next_link = f'<a href="/search?query={quote_plus(query)}&amp;page={page + 1}">Next page</a>' if page < self.search_pages else ''
+        return (
+            f'<!DOCTYPE html><html><head><title>{query} | Trustpilot</title></head><body>'
+            f'<nav><a href="/categories">Categories</a><a href="/blog">Blog</a></nav>'
+            f'<main><h1>Results for "{query}"</h1>{"".join(cards)}<nav>{next_link}</nav></main>'
+            f'<footer><a href="/about">About us</a></footer></body></html>'
+        ).encode('utf-8')
+
+    def company_page(self, domain):
+        recorded = self._recorded('review', f"{domain}.html")
+        if recorded is not None:
+            return recorded
+
+        rng = _stable_random(self.seed, 'company', domain)
+        name = domain.split('.', 1)[0].title()
+        if rng.random() < self.no_email_rate:
+            lines = [f"+44 20 {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}"]
+        else:
+            lines = [f"info@{domain}", f"sales@{domain}", f"{name.lower()}.owner@{rng.choice(PERSONAL_DOMAINS)}"]
+        contact = (
+            '<div class="styles_contactInfo"><h3>Contact info</h3><ul>'
+            + ''.join(f'<li>{line}</li>' for line in lines)
+            + '</ul></div>'
+        )
+        if rng.random() < self.browser_only_rate:
+            # Only a browser sees this contact section
+            contact = (
+                '<div id="root-info"></div><script>'
+                f'document.getElementById("root-info").innerHTML = {json.dumps(contact)};'
+                '</script>'
+            )
+        reviews = ''.join(
+            f'<article class="styles_reviewCard"><h2>Review {i + 1}</h2>'
+            f'<p>{" ".join(rng.choice(SYLLABLES) for _ in range(60))}</p></article>'
+            for i in range(self.reviews_per_page)
+        )
+        return (
+            f'<!DOCTYPE html><html><head><title>{name} Reviews | Trustpilot</title></head><body>'
+            f'<main><h1>{name}</h1><aside>{contact}</aside><section>{reviews}</section></main>'
+            f'</body></html>'
+        ).encode('utf-8')
+
+
+class FixtureServer:
+    """Threaded HTTP server for a FixtureSite with latency and error injection
+
+    Use as a context manager, or call start() and stop(). base_url is only
+    known once the server is started (port 0 picks a free port).
+    """
+
+    def __init__(self, site=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, error_status=503, retry_after=0, seed=0):
+        self.site = site or FixtureSite(seed=seed)
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'search_pages': 0, 'company_pages': 0, 'errors_injected': 0, 'not_found': 0}
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _draw(self):
+        """(delay, inject_error) for one request"""
+        with self._lock:
+            self._stats['requests'] += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            return delay, self._rng.random() < self.error_rate
+
+    def respond(self, path):
+        """(status, headers, body) for a GET of path"""
+        parts = urlsplit(path)
+        if parts.path == STATS_PATH:
+            return 200, {'Content-Type': 'application/json'}, json.dumps(self.stats()).encode('utf-8')
+
+        delay, inject_error = self._draw()
+        if delay > 0:
+            time.sleep(delay)
+        if inject_error:
+            self._count('errors_injected')
+            headers = {'Content-Type': 'text/plain'}
+            if self.error_status in (429, 503):
+                headers['Retry-After'] = str(self.retry_after)
+            return self.error_status, headers, b'Injected error'
+
+        html_headers = {'Content-Type': 'text/html; charset=utf-8'}
+        if parts.path.rstrip('/') == '/search':
+            params = parse_qs(parts.query)
+            query = params.get('query', [''])[0]
+            try:
+                page = max(1, int(params.get('page', ['1'])[0]))
+            except ValueError:
+                page = 1
+            self._count('search_pages')
+            return 200, html_headers, self.site.search_page(query, page)
+        if parts.path.startswith('/review/'):
+            domain = parts.path[len('/review/'):].strip('/').lower()
+            if domain:
+                self._count('company_pages')
+                return 200, html_headers, self.site.company_page(domain)
+        self._count('not_found')
+        return 404, {'Content-Type': 'text/plain'}, b'Not found'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real site
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+            def do_GET(self):
+                status, headers, body = server.respond(self.path)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help="0 picks a free port")
+    parser.add_argument('--fixtures', help="directory with recorded search.html and review/<domain>.html pages")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random seconds, 0 to this value")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of responses replaced by an error")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--retry-after', type=int, default=0, help="Retry-After seconds sent with 429/503")
+    parser.add_argument('--companies-per-page', type=int, default=DEFAULT_COMPANIES_PER_PAGE)
+    parser.add_argument('--search-pages', type=int, default=DEFAULT_SEARCH_PAGES, help="result pages per search query")
+    parser.add_argument('--browser-rate', type=float, default=0.0,
+                        help="share of company pages whose contact section only renders in a browser")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    site = FixtureSite(fixtures_dir=args.fixtures, companies_per_page=args.companies_per_page,
+                       browser_only_rate=args.browser_rate, search_pages=args.search_pages, seed=args.seed)
+    server = FixtureServer(site, host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, error_status=args.error_status,
+                           retry_after=args.retry_after, seed=args.seed).start()
+    # The first line is read by bench_scraping.py to find the port
+    print(f"Serving fixtures at {server.base_url}", flush=True)
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
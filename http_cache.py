@@ -0,0 +1,235 @@
+"""
+SQLite-backed HTTP response cache with per-route TTLs, conditional revalidation and LRU eviction
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# Default cache configuration
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'http_cache.sqlite3')
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_TTL = 3600  # seconds
+# (path prefix, TTL seconds); the first matching prefix wins
+DEFAULT_ROUTE_TTLS = [
+    ('/search', 10 * 60),
+    ('/review/', 24 * 3600),
+]
+
+# Response headers worth keeping with a cached body
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+def normalize_url(url):
+    """Canonical cache key for a URL: lowercase scheme/host, sorted query, no fragment"""
+    parts = urlsplit(url.strip())
+    path = parts.path or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ''))
+
+
+def _build_response(url, status_code, headers, body):
+    """Rebuild a requests.Response from a cached entry so callers can't tell the difference"""
+    response = requests.models.Response()
+    response.url = url
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+class HttpCache:
+    """Persistent response cache shared by every thread in the process"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES,
+                 route_ttls=None, default_ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.route_ttls = DEFAULT_ROUTE_TTLS if route_ttls is None else route_ttls
+        self.default_ttl = default_ttl
+
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'stores': 0,
+            'evictions': 0,
+            'bytes_saved': 0,
+        }
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self._conn.commit()
+
+    def ttl_for(self, url):
+        """TTL in seconds for a URL based on its route"""
+        path = urlsplit(url).path
+        for prefix, ttl in self.route_ttls:
+            if path.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def fetch(self, session, url, timeout=None, headers=None, revalidate=False):
+        """GET a URL through the cache, revalidating stale entries with ETag/Last-Modified
+
+        With revalidate=True a fresh entry is treated as stale, so the upstream is always asked.
+        """
+        key, now, entry, cached, request_headers = self._lookup(url, headers, revalidate)
+        if cached is not None:
+            return cached
+        response = session.get(url, timeout=timeout, headers=request_headers or None)
+        return self._complete(key, now, entry, url, response)
+
+    async def fetch_async(self, session, url, timeout=None, headers=None, revalidate=False):
+        """fetch() for coroutines, over a session with get_async() (e.g. a ThrottledSession on the fetch engine)
+
+        SQLite reads and writes run in a worker thread, so a slow disk doesn't stall the event loop.
+        """
+        key, now, entry, cached, request_headers = await asyncio.to_thread(self._lookup, url, headers, revalidate)
+        if cached is not None:
+            return cached
+        response = await session.get_async(url, timeout=timeout, headers=request_headers or None)
+        return await asyncio.to_thread(self._complete, key, now, entry, url, response)
+
+    def _lookup(self, url, headers, revalidate):
+        """(key, now, entry, cached response or None, request headers with any validators)"""
+        key = normalize_url(url)
+        now = time.time()
+        entry = self._load(key)
+
+        if entry and entry['expires_at'] > now and not revalidate:
+            self._touch(key, now)
+            self._count(hits=1, bytes_saved=entry['size'])
+            return key, now, entry, _build_response(url, entry['status'], entry['headers'], entry['body']), None
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry['headers'].get('ETag'):
+                request_headers['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return key, now, entry, None, request_headers
+
+    def _complete(self, key, now, entry, url, response):
+        """Serve a 304 from the stored entry, or store a cacheable upstream response"""
+        if entry and response.status_code == 304:
+            self._refresh(key, now)
+            self._count(revalidated=1, bytes_saved=entry['size'])
+            return _build_response(url, entry['status'], entry['headers'], entry['body'])
+
+        self._count(misses=1)
+        if response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', ''):
+            self._store(key, response, now)
+        return response
+
+    def stats(self):
+        """Return hit/miss/bytes-saved counters plus the current cache size"""
+        with self._lock:
+            stats = dict(self._stats)
+            row = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats.update({
+            'entries': row[0],
+            'size_bytes': row[1],
+            'max_bytes': self.max_bytes,
+            'hit_ratio': round((stats['hits'] + stats['revalidated']) / lookups, 3) if lookups else 0.0,
+        })
+        return stats
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._stats[name] += value
+
+    def _load(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, headers, body, size, expires_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            'status': row[0],
+            'headers': json.loads(row[1]),
+            'body': row[2],
+            'size': row[3],
+            'expires_at': row[4],
+        }
+
+    def _touch(self, key, now):
+        with self._lock:
+            self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+
+    def _refresh(self, key, now):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE responses SET fetched_at = ?, expires_at = ?, last_access = ? WHERE key = ?',
+                (now, now + self.ttl_for(key), now, key)
+            )
+            self._conn.commit()
+
+    def _store(self, key, response, now):
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, status, headers, body, size, fetched_at, expires_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, response.status_code, json.dumps(headers), sqlite3.Binary(body), len(body),
+                 now, now + self.ttl_for(key), now)
+            )
+            self._stats['stores'] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+            self._stats['evictions'] += 1
@@ -0,0 +1,619 @@
+"""
+Storage backends for scraping job state and results
+
+Every web worker reads jobs through a JobStore, so a job started by one
+gunicorn worker can be polled, cancelled and exported through any other.
+"""
+
+import copy
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = os.path.join('.cache', 'jobs.sqlite3')
+DEFAULT_FLUSH_INTERVAL = 0.5  # seconds between batched writes
+RESULT_BATCH_SIZE = 500  # results loaded per query when iterating a job's results
+DEFAULT_RESULT_BUFFER = 1000  # results a job keeps in memory before they go to disk
+
+# Statuses after which a job never changes again
+TERMINAL_STATUSES = ('completed', 'cancelled', 'error')
+
+
+class JobStore:
+    """Interface for job storage backends"""
+
+    def create_job(self, job_id, job):
+        """Create (or replace) a job; `job` is the progress dict including its results list"""
+        raise NotImplementedError
+
+    def save_job(self, job_id, job):
+        """Save the job's counters and status (not its results); may be batched"""
+        raise NotImplementedError
+
+    def append_result(self, job_id, result):
+        """Append one result row to a job; may be batched"""
+        raise NotImplementedError
+
+    def update_results(self, job_id, results):
+        """Replace already appended results; `results` maps positions to the new rows"""
+        raise NotImplementedError
+
+    def get_job(self, job_id, include_results=True):
+        """Return the job's progress dict (with its results list), or None if unknown"""
+        raise NotImplementedError
+
+    def get_results(self, job_id, since=0, limit=None):
+        """Return up to `limit` of the job's results from position `since` on, in order"""
+        raise NotImplementedError
+
+    def iter_results(self, job_id, since=0, batch_size=RESULT_BATCH_SIZE):
+        """Yield the job's results in order, loading only `batch_size` at a time
+
+        Results appended while iterating (a job still running) are included.
+        """
+        while True:
+            batch = self.get_results(job_id, since, batch_size)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            since += len(batch)
+
+    def get_status(self, job_id):
+        """Return just the job's status, or None if unknown"""
+        raise NotImplementedError
+
+    def request_cancel(self, job_id):
+        """Mark a job cancelled so whichever worker runs it stops; returns False if unknown"""
+        raise NotImplementedError
+
+    def delete_job(self, job_id):
+        """Forget a job and its results"""
+        raise NotImplementedError
+
+    def reopen_job(self, job_id, job):
+        """Overwrite a finished or abandoned job's counters and status (e.g. to resume it), keeping its results"""
+        raise NotImplementedError
+
+    def acquire_lease(self, job_id, owner, seconds):
+        """Make `owner` the job's runner for `seconds`, unless another owner's lease is still live
+
+        Returns whether `owner` holds the lease. Written immediately, so two workers
+        racing for the same job can't both win.
+        """
+        raise NotImplementedError
+
+    def renew_leases(self, job_ids, owner, seconds):
+        """Extend `owner`'s leases on these jobs to `seconds` from now"""
+        raise NotImplementedError
+
+    def release_lease(self, job_id, owner):
+        """Give up `owner`'s lease on a job, e.g. once it stops running"""
+        raise NotImplementedError
+
+    def checkpoint_company(self, job_id, index, company):
+        """Record the company discovered at position `index` of a job; may be batched"""
+        raise NotImplementedError
+
+    def mark_company_done(self, job_id, index, source, emails):
+        """Record that company `index` is finished and its result (if any) appended; may be batched"""
+        raise NotImplementedError
+
+    def get_checkpoint(self, job_id):
+        """The job's discovered companies in order, as dicts with index, company, done, source and emails"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Write out any batched updates"""
+
+    def close(self):
+        """Flush and release resources"""
+        self.flush()
+
+
+def _counters(job):
+    """The job dict without its results list"""
+    return {key: value for key, value in job.items() if key != 'results'}
+
+
+class ResultSpool:
+    """Append-only list of one job's results that keeps at most `buffer_size` of them in memory
+
+    Whenever the buffer fills it is written to the end of the job's segment file
+    as one block of JSON lines, and the block's byte offset is remembered. Reads
+    of older results seek straight to their block. Memory use is O(buffer_size)
+    plus one offset per block. Without a path nothing is spilled.
+    """
+
+    def __init__(self, path=None, buffer_size=DEFAULT_RESULT_BUFFER):
+        self.path = path
+        self.buffer_size = max(1, buffer_size)
+        self.buffer = []
+        self.spilled = 0
+        self._block_offsets = []
+        self._file = None
+
+    def __len__(self):
+        return self.spilled + len(self.buffer)
+
+    def append(self, result):
+        self.buffer.append(result)
+        if self.path and len(self.buffer) >= self.buffer_size:
+            self._spill()
+
+    def replace(self, rows):
+        """Replace the results at the given positions (position -> result)
+
+        Spilled blocks with a replaced row are written again at the end of the
+        file and their offset moved there, so the file stays append-only.
+        """
+        blocks = {}
+        for position, result in rows.items():
+            if position >= self.spilled:
+                self.buffer[position - self.spilled] = result
+            else:
+                blocks.setdefault(position // self.buffer_size, {})[position % self.buffer_size] = result
+        for block, replaced in blocks.items():
+            self._file.seek(self._block_offsets[block])
+            lines = [self._file.readline() for _ in range(self.buffer_size)]
+            for offset, result in replaced.items():
+                lines[offset] = json.dumps(result).encode('utf-8') + b'\n'
+            self._file.seek(0, os.SEEK_END)
+            self._block_offsets[block] = self._file.tell()
+            self._file.write(b''.join(lines))
+        if blocks:
+            self._file.flush()
+
+    def read(self, since=0, limit=None):
+        """Results from position `since` on, at most `limit` of them"""
+        end = len(self) if limit is None else min(len(self), since + limit)
+        rows = []
+        position = since
+        # Blocks need not be contiguous once one has been replaced, so each is sought separately
+        while position < min(end, self.spilled):
+            block = position // self.buffer_size
+            skip = position - block * self.buffer_size
+            self._file.seek(self._block_offsets[block])
+            for line in self._file:
+                if skip:
+                    skip -= 1
+                    continue
+                rows.append(json.loads(line))
+                position += 1
+                if position >= min(end, self.spilled) or position % self.buffer_size == 0:
+                    break
+        if position < end:
+            rows.extend(self.buffer[position - self.spilled:end - self.spilled])
+        return rows
+
+    def close(self):
+        """Drop the segment file"""
+        if self._file:
+            self._file.close()
+            self._file = None
+            os.remove(self.path)
+
+    def _spill(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'w+b')
+        self._file.seek(0, os.SEEK_END)
+        self._block_offsets.append(self._file.tell())
+        self._file.write(b''.join(json.dumps(result).encode('utf-8') + b'\n' for result in self.buffer))
+        self._file.flush()
+        self.spilled += len(self.buffer)
+        self.buffer = []
+
+
+class MemoryJobStore(JobStore):
+    """Process-local store, for tests and single-worker deployments
+
+    With a `spill_dir`, each job keeps only `buffer_size` results in memory and
+    spills older ones to an append-only segment file in that directory.
+    """
+
+    def __init__(self, spill_dir=None, buffer_size=DEFAULT_RESULT_BUFFER):
+        self.spill_dir = spill_dir
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._results = {}
+        self._companies = {}
+        self._leases = {}  # job ID -> (owner, expires_at)
+
+    def create_job(self, job_id, job):
+        with self._lock:
+            self._jobs[job_id] = copy.deepcopy(_counters(job))
+            self._jobs[job_id]['updated_at'] = time.time()
+            self._companies[job_id] = {}
+            self._drop_results(job_id)
+            spool = self._results[job_id] = self._new_spool(job_id)
+            for result in job.get('results', []):
+                spool.append(result)
+
+    def _new_spool(self, job_id):
+        path = os.path.join(self.spill_dir, f'{job_id}.ndjson') if self.spill_dir else None
+        return ResultSpool(path, self.buffer_size)
+
+    def _drop_results(self, job_id):
+        spool = self._results.pop(job_id, None)
+        if spool:
+            spool.close()
+
+    def save_job(self, job_id, job):
+        with self._lock:
+            if job_id not in self._jobs:
+                return
+            status = self._jobs[job_id].get('status')
+            self._jobs[job_id] = copy.deepcopy(_counters(job))
+            self._jobs[job_id]['updated_at'] = time.time()
+            if status == 'cancelled':
+                self._jobs[job_id]['status'] = status
+
+    def append_result(self, job_id, result):
+        with self._lock:
+            if job_id not in self._results:
+                self._results[job_id] = self._new_spool(job_id)
+            self._results[job_id].append(result)
+
+    def update_results(self, job_id, results):
+        with self._lock:
+            spool = self._results.get(job_id)
+            if spool:
+                spool.replace(copy.deepcopy(results))
+
+    def get_job(self, job_id, include_results=True):
+        with self._lock:
+            if job_id not in self._jobs:
+                return None
+            job = copy.deepcopy(self._jobs[job_id])
+            if include_results:
+                job['results'] = self._results[job_id].read() if job_id in self._results else []
+            return job
+
+    def get_results(self, job_id, since=0, limit=None):
+        with self._lock:
+            spool = self._results.get(job_id)
+            return spool.read(since, limit) if spool else []
+
+    def get_status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.get('status') if job else None
+
+    def request_cancel(self, job_id):
+        with self._lock:
+            if job_id not in self._jobs:
+                return False
+            self._jobs[job_id]['status'] = 'cancelled'
+            return True
+
+    def delete_job(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._companies.pop(job_id, None)
+            self._leases.pop(job_id, None)
+            self._drop_results(job_id)
+
+    def reopen_job(self, job_id, job):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id] = copy.deepcopy(_counters(job))
+                self._jobs[job_id]['updated_at'] = time.time()
+
+    def acquire_lease(self, job_id, owner, seconds):
+        with self._lock:
+            now = time.time()
+            held = self._leases.get(job_id)
+            if held and held[0] != owner and held[1] > now:
+                return False
+            self._leases[job_id] = (owner, now + seconds)
+            return True
+
+    def renew_leases(self, job_ids, owner, seconds):
+        with self._lock:
+            expires_at = time.time() + seconds
+            for job_id in job_ids:
+                if self._leases.get(job_id, (None,))[0] == owner:
+                    self._leases[job_id] = (owner, expires_at)
+
+    def release_lease(self, job_id, owner):
+        with self._lock:
+            if self._leases.get(job_id, (None,))[0] == owner:
+                del self._leases[job_id]
+
+    def checkpoint_company(self, job_id, index, company):
+        with self._lock:
+            self._companies.setdefault(job_id, {})[index] = {
+                'index': index, 'company': copy.deepcopy(company), 'done': False, 'source': None, 'emails': 0
+            }
+
+    def mark_company_done(self, job_id, index, source, emails):
+        with self._lock:
+            row = self._companies.get(job_id, {}).get(index)
+            if row:
+                row.update(done=True, source=source, emails=emails)
+
+    def get_checkpoint(self, job_id):
+        with self._lock:
+            companies = self._companies.get(job_id, {})
+            return [copy.deepcopy(companies[index]) for index in sorted(companies)]
+
+    def close(self):
+        with self._lock:
+            for job_id in list(self._results):
+                self._drop_results(job_id)
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite (WAL mode) store shared by every worker process on the host
+
+    Counter updates, result rows and company checkpoints are buffered and written in one
+    transaction every `flush_interval` seconds, so frequent progress updates
+    don't turn into one fsync each. At most `max_buffered_results` result rows
+    are held in memory before an early flush. Status changes to a terminal state
+    and cancellations are written immediately.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_buffered_results=DEFAULT_RESULT_BUFFER):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_buffered_results = max_buffered_results
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS companies (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                source TEXT,
+                emails INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                job_id TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        ''')
+        self._conn.commit()
+
+        self._pending_jobs = {}
+        self._pending_results = {}
+        self._pending_count = 0
+        self._pending_companies = []
+        self._pending_done = []
+        self._next_seq = {}
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name='job-store-flusher', daemon=True)
+        self._flusher.start()
+
+    def create_job(self, job_id, job):
+        results = job.get('results', [])
+        with self._lock:
+            self._pending_jobs.pop(job_id, None)
+            self._pending_count -= len(self._pending_results.pop(job_id, []))
+            self._drop_pending_companies(job_id)
+            self._conn.execute('DELETE FROM results WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM companies WHERE job_id = ?', (job_id,))
+            self._conn.execute(
+                'INSERT OR REPLACE INTO jobs (id, status, data, updated_at) VALUES (?, ?, ?, ?)',
+                (job_id, job.get('status', 'running'), json.dumps(_counters(job)), time.time())
+            )
+            self._conn.executemany(
+                'INSERT INTO results (job_id, seq, data) VALUES (?, ?, ?)',
+                [(job_id, seq, json.dumps(result)) for seq, result in enumerate(results)]
+            )
+            self._conn.commit()
+            self._next_seq[job_id] = len(results)
+
+    def save_job(self, job_id, job):
+        with self._lock:
+            self._pending_jobs[job_id] = json.dumps(_counters(job))
+            if job.get('status') in TERMINAL_STATUSES:
+                self.flush()
+
+    def append_result(self, job_id, result):
+        with self._lock:
+            if job_id not in self._next_seq:
+                row = self._conn.execute(
+                    'SELECT COALESCE(MAX(seq) + 1, 0) FROM results WHERE job_id = ?', (job_id,)
+                ).fetchone()
+                self._next_seq[job_id] = row[0]
+            seq = self._next_seq[job_id]
+            self._next_seq[job_id] = seq + 1
+            self._pending_results.setdefault(job_id, []).append((job_id, seq, json.dumps(result)))
+            self._pending_count += 1
+            if self._pending_count >= self.max_buffered_results:
+                self.flush()
+
+    def update_results(self, job_id, results):
+        with self._lock:
+            # Written with INSERT OR REPLACE after any pending rows at the same positions
+            self._pending_results.setdefault(job_id, []).extend(
+                (job_id, seq, json.dumps(result)) for seq, result in results.items()
+            )
+            self._pending_count += len(results)
+            if self._pending_count >= self.max_buffered_results:
+                self.flush()
+
+    def get_job(self, job_id, include_results=True):
+        with self._lock:
+            self.flush()
+            row = self._conn.execute('SELECT status, data, updated_at FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if not row:
+                return None
+            job = json.loads(row[1])
+            job['status'] = row[0]
+            job['updated_at'] = row[2]
+            if include_results:
+                job['results'] = [
+                    json.loads(data) for (data,) in self._conn.execute(
+                        'SELECT data FROM results WHERE job_id = ? ORDER BY seq', (job_id,)
+                    )
+                ]
+            return job
+
+    def get_results(self, job_id, since=0, limit=None):
+        with self._lock:
+            self.flush()
+            return [
+                json.loads(data) for (data,) in self._conn.execute(
+                    'SELECT data FROM results WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?',
+                    (job_id, since, -1 if limit is None else limit)
+                )
+            ]
+
+    def get_status(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return row[0] if row else None
+
+    def request_cancel(self, job_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ?", (time.time(), job_id)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def delete_job(self, job_id):
+        with self._lock:
+            self._pending_jobs.pop(job_id, None)
+            self._pending_count -= len(self._pending_results.pop(job_id, []))
+            self._next_seq.pop(job_id, None)
+            self._drop_pending_companies(job_id)
+            self._conn.execute('DELETE FROM results WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM companies WHERE job_id = ?', (job_id,))
+            self._conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            self._conn.execute('DELETE FROM leases WHERE job_id = ?', (job_id,))
+            self._conn.commit()
+
+    def reopen_job(self, job_id, job):
+        with self._lock:
+            self.flush()
+            self._pending_jobs.pop(job_id, None)
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE id = ?',
+                (job.get('status', 'running'), json.dumps(_counters(job)), time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def acquire_lease(self, job_id, owner, seconds):
+        with self._lock:
+            now = time.time()
+            # One statement, so it is atomic across every worker sharing the database
+            cursor = self._conn.execute(
+                'INSERT INTO leases (job_id, owner, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (job_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at '
+                'WHERE leases.owner = excluded.owner OR leases.expires_at <= ?',
+                (job_id, owner, now + seconds, now)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def renew_leases(self, job_ids, owner, seconds):
+        with self._lock:
+            expires_at = time.time() + seconds
+            self._conn.executemany(
+                'UPDATE leases SET expires_at = ? WHERE job_id = ? AND owner = ?',
+                [(expires_at, job_id, owner) for job_id in job_ids]
+            )
+            self._conn.commit()
+
+    def release_lease(self, job_id, owner):
+        with self._lock:
+            self._conn.execute('DELETE FROM leases WHERE job_id = ? AND owner = ?', (job_id, owner))
+            self._conn.commit()
+
+    def checkpoint_company(self, job_id, index, company):
+        with self._lock:
+            self._pending_companies.append((job_id, index, json.dumps(company)))
+
+    def mark_company_done(self, job_id, index, source, emails):
+        with self._lock:
+            self._pending_done.append((source, emails, job_id, index))
+
+    def get_checkpoint(self, job_id):
+        with self._lock:
+            self.flush()
+            return [
+                {'index': idx, 'company': json.loads(data), 'done': bool(done), 'source': source, 'emails': emails}
+                for idx, data, done, source, emails in self._conn.execute(
+                    'SELECT idx, data, done, source, emails FROM companies WHERE job_id = ? ORDER BY idx', (job_id,)
+                )
+            ]
+
+    def _drop_pending_companies(self, job_id):
+        self._pending_companies = [row for row in self._pending_companies if row[0] != job_id]
+        self._pending_done = [row for row in self._pending_done if row[2] != job_id]
+
+    def flush(self):
+        with self._lock:
+            if not (self._pending_jobs or self._pending_results or self._pending_companies or self._pending_done):
+                return
+            # Appends wait on the lock, so the buffers are only cleared once they are committed;
+            # after a failure (e.g. "database is locked" under contention) the next flush retries them
+            jobs, results = self._pending_jobs, self._pending_results
+            companies, done = self._pending_companies, self._pending_done
+            now = time.time()
+            try:
+                for job_id, data in jobs.items():
+                    status = json.loads(data).get('status', 'running')
+                    # A cancellation written by another worker wins over a stale 'running'
+                    self._conn.execute(
+                        "UPDATE jobs SET status = CASE WHEN status = 'cancelled' THEN status ELSE ? END, "
+                        "data = ?, updated_at = ? WHERE id = ?",
+                        (status, data, now, job_id)
+                    )
+                for rows in results.values():
+                    self._conn.executemany('INSERT OR REPLACE INTO results (job_id, seq, data) VALUES (?, ?, ?)', rows)
+                # Done markers go in the same transaction as the results they vouch for
+                self._conn.executemany('INSERT OR REPLACE INTO companies (job_id, idx, data) VALUES (?, ?, ?)', companies)
+                self._conn.executemany(
+                    'UPDATE companies SET done = 1, source = ?, emails = ? WHERE job_id = ? AND idx = ?', done
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to flush job store, will retry: {e}")
+                self._conn.rollback()
+                return
+            self._pending_jobs, self._pending_results = {}, {}
+            self._pending_companies, self._pending_done = [], []
+            self._pending_count = 0
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
@@ -0,0 +1,172 @@
+"""
+lxml-based parsing of server-rendered Trustpilot pages
+"""
+
+import json
+import logging
+import re
+
+from lxml import html as lxml_html
+from lxml.etree import ParserError
+
+logger = logging.getLogger(__name__)
+
+# Same selectors the Selenium path uses, minus script/style blocks which the
+# browser would never render as visible text
+CONTACT_TEXT_XPATH = (
+    "//body//*[not(self::script) and not(self::style)]"
+    "[contains(text(), 'Contact') or contains(text(), 'contact') "
+    "or contains(text(), 'Email') or contains(text(), 'email')]"
+)
+CONTACT_CLASS_XPATH = (
+    "//body//*[not(self::script) and not(self::style)]"
+    "[contains(@class, 'contact') or contains(@class, 'email') or contains(@placeholder, 'email')]"
+)
+MAILTO_XPATH = "//a[starts-with(@href, 'mailto:')]/@href"
+VISIBLE_TEXT_XPATH = ".//text()[not(ancestor::script) and not(ancestor::style)]"
+EMBEDDED_JSON_XPATH = "//script[@id='__NEXT_DATA__' or @type='application/ld+json']/text()"
+
+# Every anchor to a company page, in document order, as bs4's find_all(href=re.compile('/review/')) finds them
+SEARCH_RESULT_XPATH = "//a[contains(@href, '/review/')]"
+RATING_RE = re.compile(r'^(?:TrustScore\s*)?([0-5](?:\.[0-9])?)$')
+REVIEW_COUNT_RE = re.compile(r'([0-9][0-9,]*)\s*reviews?\b', re.IGNORECASE)
+SKIPPED_TAGS = ('script', 'style')
+
+EMAIL_KEYS = ('email', 'emails')
+CONTACT_KEYS = ('contactInfo', 'contact', 'contactPoint')
+
+
+def parse_html(content):
+    """Parse raw HTML bytes/text into an lxml tree, or None if it is not HTML"""
+    if not content:
+        return None
+    try:
+        return lxml_html.fromstring(content)
+    except (ParserError, ValueError) as e:
+        logger.debug(f"Failed to parse HTML: {e}")
+        return None
+
+
+def _visible_text(element):
+    """Text of an element with script/style content stripped"""
+    return '\n'.join(element.xpath(VISIBLE_TEXT_XPATH))
+
+
+def _walk_json(data, texts):
+    """Collect email-ish string values from embedded page JSON; return True if contact data exists"""
+    found_contact = False
+    stack = [data]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            for key, value in current.items():
+                if key in CONTACT_KEYS and value:
+                    found_contact = True
+                if key in EMAIL_KEYS:
+                    if isinstance(value, str) and value:
+                        texts.append(value)
+                        found_contact = True
+                    elif isinstance(value, list):
+                        texts.extend(v for v in value if isinstance(v, str))
+                        found_contact = found_contact or bool(value)
+                if isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(current, list):
+            stack.extend(item for item in current if isinstance(item, (dict, list)))
+    return found_contact
+
+
+def extract_contact_texts(content):
+    """
+    Pull candidate contact text out of a company page.
+
+    Returns (texts, has_contact_section): the text blocks that may contain
+    emails, and whether the page has a contact block at all. When the page has
+    no contact block the caller should fall back to a real browser.
+    """
+    tree = parse_html(content)
+    if tree is None:
+        return [], False
+
+    texts = []
+    has_contact_section = False
+
+    for element in tree.xpath(CONTACT_TEXT_XPATH):
+        parent = element.getparent()
+        texts.append(_visible_text(parent if parent is not None else element))
+        has_contact_section = True
+
+    for element in tree.xpath(CONTACT_CLASS_XPATH):
+        texts.append(_visible_text(element))
+        has_contact_section = True
+
+    for href in tree.xpath(MAILTO_XPATH):
+        texts.append(href[len('mailto:'):].split('?', 1)[0])
+        has_contact_section = True
+
+    for raw_json in tree.xpath(EMBEDDED_JSON_XPATH):
+        try:
+            data = json.loads(raw_json)
+        except ValueError:
+            continue
+        if _walk_json(data, texts):
+            has_contact_section = True
+
+    return texts, has_contact_section
+
+
+def _strings(element):
+    """Text nodes under element in document order, without comments, scripts and styles (like bs4's get_text)"""
+    if element.text:
+        yield element.text
+    for child in element:
+        # Comments and processing instructions have a non-string tag; their tail is still page text
+        if isinstance(child.tag, str) and child.tag not in SKIPPED_TAGS:
+            yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def extract_search_results(content, base_url):
+    """
+    Pull the company cards out of a search page in one pass.
+
+    Returns one dict per /review/ anchor, in page order: raw_name (the anchor
+    text joined like bs4's get_text(strip=True)), url (relative links made
+    absolute against base_url), and rating and review_count when the card
+    shows them (else None).
+    """
+    if isinstance(content, bytes):
+        # lxml would guess latin-1 for pages without a charset declaration; bs4 detected UTF-8
+        try:
+            content = content.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    tree = parse_html(content)
+    if tree is None:
+        return []
+
+    results = []
+    for anchor in tree.xpath(SEARCH_RESULT_XPATH):
+        href = anchor.get('href')
+        pieces = [piece.strip() for piece in _strings(anchor)]
+        pieces = [piece for piece in pieces if piece]
+        rating = None
+        review_count = None
+        for piece in pieces:
+            if rating is None:
+                match = RATING_RE.match(piece)
+                if match:
+                    rating = float(match.group(1))
+                    continue
+            if review_count is None:
+                match = REVIEW_COUNT_RE.search(piece)
+                if match:
+                    review_count = int(match.group(1).replace(',', ''))
+        results.append({
+            'raw_name': ''.join(pieces),
+            'url': base_url + href if href.startswith('/') else href,
+            'rating': rating,
+            'review_count': review_count,
+        })
+    return results
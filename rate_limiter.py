@@ -0,0 +1,326 @@
+"""
+Process-wide, per-host token-bucket rate limiting with Retry-After aware backoff
+
+One RateLimiter is shared by every job, search request and company fetch in
+the process. Each host gets a token bucket (sustained rate plus burst).
+A 429 or 503 halves that host's rate and pauses it for Retry-After seconds;
+each success then raises the rate again a little at a time, up to the
+configured maximum. The limiter settles near the highest rate the upstream
+tolerates.
+"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUESTS_PER_MINUTE = 30
+DEFAULT_BURST = 5
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_DELAY = 1  # seconds; base of the exponential backoff
+MAX_RETRY_DELAY = 60  # seconds
+MIN_RATE_FRACTION = 0.05  # never slow a host below this share of its configured rate
+RECOVERY_FRACTION = 0.05  # share of the configured rate regained per successful request
+
+# Status codes that mean "slow down" and get the host's rate cut
+THROTTLE_STATUSES = (429, 503)
+# Status codes worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# A context variable rather than a thread-local, so fetches handed to the fetch engine's loop keep the caller's tally
+_current_tally = contextvars.ContextVar('rate_limiter_tally', default=None)
+
+UPSTREAM_RESPONSES = metrics.Counter(
+    'trustpilot_upstream_responses_total', 'Upstream HTTP responses by status code (connection errors as "error")', ['status']
+)
+UPSTREAM_RETRIES = metrics.Counter('trustpilot_upstream_retries_total', 'Upstream requests retried after an error or throttling')
+UPSTREAM_THROTTLED = metrics.Counter('trustpilot_upstream_throttled_total', 'Upstream 429/503 responses that slowed a host down')
+
+
+class WaitTally:
+    """Accumulates limiter wait time and retries for one job across all its threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait_seconds = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def add(self, wait_seconds=0.0, requests=0, retries=0, throttled=0):
+        with self._lock:
+            self.wait_seconds += wait_seconds
+            self.requests += requests
+            self.retries += retries
+            self.throttled += throttled
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'rate_limit_wait_seconds': round(self.wait_seconds, 3),
+                'upstream_requests': self.requests,
+                'upstream_retries': self.retries,
+                'upstream_throttled': self.throttled,
+            }
+
+
+@contextmanager
+def tally_waits(tally):
+    """Attribute limiter waits made by the current thread to `tally` (e.g. a job's)"""
+    token = _current_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _current_tally.reset(token)
+
+
+def _tally(**counts):
+    tally = _current_tally.get()
+    if tally is not None:
+        tally.add(**counts)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket whose refill rate can be cut and restored at runtime"""
+
+    def __init__(self, rate_per_second, burst):
+        self.max_rate = rate_per_second
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take a token, returning how long the caller must sleep before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def throttle(self, pause):
+        """Halve the rate and pause the bucket for `pause` seconds"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.max_rate * MIN_RATE_FRACTION, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self.blocked_until = max(self.blocked_until, now + pause)
+
+    def recover(self):
+        """Creep the rate back up towards its configured maximum"""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self._refill(time.monotonic())
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_FRACTION)
+
+
+class RateLimiter:
+    """Per-host token buckets shared by every thread in the process"""
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, burst=DEFAULT_BURST, enabled=True):
+        self.rate_per_second = requests_per_minute / 60.0
+        self.burst = burst
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = {'requests': 0, 'waits': 0, 'wait_seconds': 0.0, 'throttled': 0, 'retries': 0}
+
+    def _bucket(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate_per_second, self.burst)
+            return bucket
+
+    def _reserve(self, url):
+        """Take a token for url's host; returns (host, seconds the caller must wait before sending)"""
+        host = urlsplit(url).netloc
+        wait = self._bucket(host).reserve()
+        with self._lock:
+            self._stats['requests'] += 1
+            if wait > 0:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds'] += wait
+        _tally(wait_seconds=wait, requests=1)
+        return host, wait
+
+    def acquire(self, url):
+        """Block until a request to url's host may be sent; returns seconds waited"""
+        if not self.enabled:
+            return 0.0
+        host, wait = self._reserve(url)
+        if wait > 0:
+            with tracing.span('rate_limit_wait', host=host):
+                time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url):
+        """acquire() for coroutines: the wait is awaited, so the event loop keeps serving other requests"""
+        if not self.enabled:
+            return 0.0
+        host, wait = self._reserve(url)
+        if wait > 0:
+            with tracing.span('rate_limit_wait', host=host):
+                await asyncio.sleep(wait)
+        return wait
+
+    def throttled(self, url, retry_after=None, attempt=0):
+        """Record a 429/503 from url's host; returns the pause applied"""
+        pause = retry_after if retry_after is not None else backoff_delay(attempt, DEFAULT_RETRY_DELAY)
+        pause = min(pause, MAX_RETRY_DELAY)
+        host = urlsplit(url).netloc
+        if self.enabled:
+            self._bucket(host).throttle(pause)
+        with self._lock:
+            self._stats['throttled'] += 1
+        UPSTREAM_THROTTLED.inc()
+        _tally(throttled=1)
+        logger.warning(f"Upstream {host} is throttling us; pausing {pause:.1f}s and slowing down")
+        return pause
+
+    def succeeded(self, url):
+        """Record a successful request so the host's rate can recover"""
+        if self.enabled:
+            self._bucket(urlsplit(url).netloc).recover()
+
+    def retried(self):
+        with self._lock:
+            self._stats['retries'] += 1
+        UPSTREAM_RETRIES.inc()
+        _tally(retries=1)
+
+    def stats(self):
+        """Totals plus each host's current rate and pause"""
+        with self._lock:
+            stats = dict(self._stats, enabled=self.enabled, burst=self.burst,
+                         max_requests_per_minute=round(self.rate_per_second * 60, 2))
+            buckets = list(self._buckets.items())
+        now = time.monotonic()
+        stats['hosts'] = {
+            host: {
+                'requests_per_minute': round(bucket.rate * 60, 2),
+                'paused_for_seconds': round(max(0.0, bucket.blocked_until - now), 2),
+            }
+            for host, bucket in buckets
+        }
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        return stats
+
+
+def backoff_delay(attempt, base_delay):
+    """Jittered exponential backoff: base * 2^attempt, scaled by a random 0.5-1.5"""
+    return min(MAX_RETRY_DELAY, base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+class ThrottledSession:
+    """requests.Session-like wrapper whose get() goes through the rate limiter and retries
+
+    get_async() does the same for coroutines, over a session with its own get_async() (the fetch engine).
+    """
+
+    def __init__(self, session, limiter, max_retries=DEFAULT_MAX_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+        self.session = session
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def get(self, url, **kwargs):
+        attempt = 0
+        while True:
+            self.limiter.acquire(url)
+            response = error = None
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            retry = self._retry(url, attempt, response, error)
+            if retry is None:
+                return response
+            delay, sleep_here = retry
+            attempt += 1
+            if sleep_here:
+                with tracing.span('retry_backoff', url=url, attempt=attempt):
+                    time.sleep(delay)
+
+    async def get_async(self, url, **kwargs):
+        attempt = 0
+        while True:
+            await self.limiter.acquire_async(url)
+            response = error = None
+            try:
+                response = await self.session.get_async(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            retry = self._retry(url, attempt, response, error)
+            if retry is None:
+                return response
+            delay, sleep_here = retry
+            attempt += 1
+            if sleep_here:
+                with tracing.span('retry_backoff', url=url, attempt=attempt):
+                    await asyncio.sleep(delay)
+
+    def _retry(self, url, attempt, response=None, error=None):
+        """(delay, sleep_here) before retrying, or None to return `response`; re-raises `error` once out of retries"""
+        if error is not None:
+            UPSTREAM_RESPONSES.inc(status='error')
+            if attempt >= self.max_retries:
+                raise error
+            delay = backoff_delay(attempt, self.retry_delay)
+            logger.warning(f"Request to {url} failed ({error}); retrying in {delay:.1f}s")
+            self.limiter.retried()
+            return delay, True
+
+        UPSTREAM_RESPONSES.inc(status=response.status_code)
+        if response.status_code not in RETRY_STATUSES:
+            self.limiter.succeeded(url)
+            return None
+        # Throttled hosts are paused inside the limiter, so the next acquire() does that waiting
+        sleep_here = True
+        if response.status_code in THROTTLE_STATUSES:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            delay = self.limiter.throttled(url, retry_after, attempt)
+            sleep_here = not self.limiter.enabled
+        else:
+            delay = backoff_delay(attempt, self.retry_delay)
+        if attempt >= self.max_retries:
+            return None
+        logger.warning(f"Got {response.status_code} from {url}; retrying in {delay:.1f}s")
+        self.limiter.retried()
+        return delay, sleep_here
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
@@ -0,0 +1,122 @@
+"""
+Condition-based page readiness waits with recorded wait times
+
+Each wait polls a concrete condition (document.readyState, an element being
+present, the page height growing after a scroll) and returns as soon as it
+holds, up to a configurable upper bound. Every wait's actual duration is
+recorded so the bounds can be tuned from real data.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.1  # seconds between condition checks
+DEFAULT_MAX_SAMPLES = 1000  # recent durations kept per wait name
+
+READY_STATE_SCRIPT = "return document.readyState"
+SCROLL_HEIGHT_SCRIPT = "return document.body ? document.body.scrollHeight : 0"
+SCROLL_TO_BOTTOM_SCRIPT = "window.scrollTo(0, document.body.scrollHeight); return document.body.scrollHeight"
+
+
+class WaitRecorder:
+    """Keeps recent wait durations per wait name"""
+
+    def __init__(self, max_samples=DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def record(self, name, seconds, timed_out):
+        with self._lock:
+            samples = self._samples.setdefault(name, deque(maxlen=self.max_samples))
+            samples.append(seconds)
+            counts = self._counts.setdefault(name, {'count': 0, 'timeouts': 0, 'total_seconds': 0.0})
+            counts['count'] += 1
+            counts['total_seconds'] += seconds
+            if timed_out:
+                counts['timeouts'] += 1
+
+    def stats(self):
+        """Per wait name: count, timeouts, average and p50/p95/max over recent samples"""
+        with self._lock:
+            snapshot = {name: (sorted(samples), dict(self._counts[name])) for name, samples in self._samples.items()}
+        stats = {}
+        for name, (samples, counts) in snapshot.items():
+            stats[name] = dict(
+                counts,
+                avg_seconds=round(counts['total_seconds'] / counts['count'], 4),
+                p50_seconds=round(_percentile(samples, 0.50), 4),
+                p95_seconds=round(_percentile(samples, 0.95), 4),
+                max_seconds=round(samples[-1], 4),
+            )
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+def _percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+
+recorder = WaitRecorder()
+
+
+def wait_until(condition, timeout, name, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Poll condition() until it returns something truthy or timeout passes; returns that value or None"""
+    started = time.monotonic()
+    deadline = started + timeout
+    result = None
+    with tracing.span(f"wait_{name}") as span:
+        while True:
+            try:
+                result = condition()
+            except Exception as e:
+                logger.debug(f"Wait condition '{name}' raised: {e}")
+                result = None
+            if result:
+                recorder.record(name, time.monotonic() - started, False)
+                return result
+            if time.monotonic() >= deadline:
+                recorder.record(name, time.monotonic() - started, True)
+                span.set(timed_out=True)
+                logger.debug(f"Wait '{name}' timed out after {timeout}s")
+                return None
+            time.sleep(poll_interval)
+
+
+def wait_for_document_ready(driver, timeout):
+    """Wait for document.readyState to reach 'complete'"""
+    return wait_until(
+        lambda: driver.execute_script(READY_STATE_SCRIPT) == 'complete',
+        timeout,
+        'document_ready'
+    )
+
+
+def scroll_until_settled(driver, max_scrolls, timeout_per_scroll):
+    """Scroll to the bottom until the page stops growing (or max_scrolls); returns how many scrolls loaded more"""
+    grew = 0
+    for _ in range(max_scrolls):
+        previous_height = driver.execute_script(SCROLL_TO_BOTTOM_SCRIPT) or 0
+        new_height = wait_until(
+            lambda: (driver.execute_script(SCROLL_HEIGHT_SCRIPT) or 0) > previous_height,
+            timeout_per_scroll,
+            'scroll_growth'
+        )
+        if not new_height:
+            break
+        grew += 1
+    return grew
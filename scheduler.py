@@ -0,0 +1,157 @@
+"""
+Job scheduler with admission control, priorities and per-client fair share
+
+At most `max_running` jobs run at once, each in its own thread. Further jobs
+wait in a bounded queue, and when that is full submit() raises QueueFullError
+instead of starting yet another thread (and another Chrome). When a slot
+frees up, the waiting job with the highest priority runs next. Among equal
+priorities, the client with the fewest running jobs goes first, then the
+client whose last job started longest ago (round robin), then the oldest
+submission.
+"""
+
+import itertools
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_RUNNING = 2
+DEFAULT_MAX_QUEUED = 20
+DEFAULT_MAX_QUEUED_PER_CLIENT = 5
+
+
+class QueueFullError(Exception):
+    """Raised when a job can't be admitted because the wait queue (or the client's share of it) is full"""
+
+
+class _Job:
+    __slots__ = ('job_id', 'func', 'args', 'client', 'priority', 'seq')
+
+    def __init__(self, job_id, func, args, client, priority, seq):
+        self.job_id = job_id
+        self.func = func
+        self.args = args
+        self.client = client
+        self.priority = priority
+        self.seq = seq
+
+
+class JobScheduler:
+    """Bounded concurrent job runner shared by every request in the process
+
+    `on_queue_change(positions)` is called with {job_id: 1-based position} for
+    every waiting job whenever the order may have changed.
+    """
+
+    def __init__(self, max_running=DEFAULT_MAX_RUNNING, max_queued=DEFAULT_MAX_QUEUED,
+                 max_queued_per_client=DEFAULT_MAX_QUEUED_PER_CLIENT, on_queue_change=None):
+        self.max_running = max(1, max_running)
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.on_queue_change = on_queue_change
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._starts = itertools.count()
+        self._last_started = {}  # client -> start counter of its most recent job
+        self._waiting = []
+        self._running = {}
+        self._stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'cancelled_while_queued': 0}
+
+    def submit(self, job_id, func, args=(), client=None, priority=0):
+        """Run func(*args) now or once a slot frees up; returns the queue position (0 = started)"""
+        with self._lock:
+            if len(self._running) >= self.max_running or self._waiting:
+                if len(self._waiting) >= self.max_queued:
+                    self._stats['rejected'] += 1
+                    raise QueueFullError(f"Job queue is full ({self.max_queued} waiting)")
+                if sum(1 for job in self._waiting if job.client == client) >= self.max_queued_per_client:
+                    self._stats['rejected'] += 1
+                    raise QueueFullError(f"Too many queued jobs for this client ({self.max_queued_per_client})")
+            self._stats['submitted'] += 1
+            self._waiting.append(_Job(job_id, func, args, client, priority, next(self._seq)))
+            self._dispatch()
+            positions = self._positions()
+        self._notify(positions)
+        return positions.get(job_id, 0)
+
+    def position(self, job_id):
+        """1-based queue position of a waiting job, 0 if it is running, None if unknown"""
+        with self._lock:
+            if job_id in self._running:
+                return 0
+            return self._positions().get(job_id)
+
+    def cancel(self, job_id):
+        """Drop a waiting job from the queue; returns False if it isn't waiting"""
+        with self._lock:
+            for job in self._waiting:
+                if job.job_id == job_id:
+                    self._waiting.remove(job)
+                    self._stats['cancelled_while_queued'] += 1
+                    break
+            else:
+                return False
+            positions = self._positions()
+        self._notify(positions)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                running=len(self._running),
+                queued=len(self._waiting),
+                max_running=self.max_running,
+                max_queued=self.max_queued,
+                max_queued_per_client=self.max_queued_per_client,
+            )
+
+    def _order(self):
+        """Waiting jobs in the order they will start (lock held)"""
+        running_per_client = {}
+        for job in self._running.values():
+            running_per_client[job.client] = running_per_client.get(job.client, 0) + 1
+        return sorted(
+            self._waiting,
+            key=lambda job: (
+                -job.priority,
+                running_per_client.get(job.client, 0),
+                self._last_started.get(job.client, -1),
+                job.seq,
+            )
+        )
+
+    def _positions(self):
+        return {job.job_id: index + 1 for index, job in enumerate(self._order())}
+
+    def _dispatch(self):
+        """Start waiting jobs while there are free slots (lock held)"""
+        while self._waiting and len(self._running) < self.max_running:
+            job = self._order()[0]
+            self._waiting.remove(job)
+            self._running[job.job_id] = job
+            self._last_started[job.client] = next(self._starts)
+            thread = threading.Thread(target=self._run, args=(job,), name=f"job-{job.job_id}", daemon=True)
+            thread.start()
+
+    def _run(self, job):
+        try:
+            job.func(*job.args)
+            outcome = 'completed'
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}")
+            outcome = 'failed'
+        with self._lock:
+            self._running.pop(job.job_id, None)
+            self._stats[outcome] += 1
+            self._dispatch()
+            positions = self._positions()
+        self._notify(positions)
+
+    def _notify(self, positions):
+        if self.on_queue_change and positions:
+            try:
+                self.on_queue_change(positions)
+            except Exception as e:
+                logger.error(f"Queue change callback failed: {e}")
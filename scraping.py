@@ -0,0 +1,590 @@
+"""
+Scraping Trustpilot without the web app
+
+The search and company scrapers, the per-company scrape-and-cache step and
+the factories for the objects they share (rate limiter, Chrome pool, company
+cache). app.py runs them as jobs behind Flask; the batch command line in
+trustpilot_scraper.py imports only this module, so its worker processes
+never build the web stack.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+# selenium and webdriver_manager are imported where a browser is needed, so web-only workers start fast
+
+import browser_setup
+import extraction
+import metrics
+import readiness
+import tracing
+from company_cache import CompanyCache, canonical_company_url
+from driver_pool import CountingDriver, DriverPool, DriverPoolError
+from fetch_engine import FetchEngine
+from http_cache import HttpCache
+from page_parser import extract_contact_texts, extract_search_results
+from rate_limiter import RateLimiter, ThrottledSession
+
+logger = logging.getLogger(__name__)
+
+# Scraper settings, read once at import
+CHROMEDRIVER_PATH = os.environ.get('CHROMEDRIVER_PATH')  # Use this chromedriver instead of resolving one
+CHROME_BINARY = os.environ.get('CHROME_BINARY')  # Use this Chrome/Chromium binary
+BROWSER_CACHE_PATH = os.environ.get('BROWSER_CACHE_PATH', browser_setup.DEFAULT_CACHE_PATH)  # Resolved browser paths, shared by restarts
+BROWSER_OFFLINE = os.environ.get('BROWSER_OFFLINE', '0') == '1'  # Never download chromedriver; fail if none is found locally
+DEFAULT_PAGE_LOAD_TIMEOUT = 15
+DEFAULT_ELEMENT_TIMEOUT = 5
+CHROME_HEADLESS = True
+CHROME_NO_SANDBOX = True
+CHROME_DISABLE_DEV_SHM = True
+CHROME_DISABLE_GPU = True
+CHROME_WINDOW_SIZE = "1920,1080"
+TRUSTPILOT_BASE_URL = os.environ.get('TRUSTPILOT_BASE_URL', "https://www.trustpilot.com").rstrip('/')  # Point at fixture_server.py for offline runs
+TRUSTPILOT_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+DRIVER_POOL_SIZE = int(os.environ.get('DRIVER_POOL_SIZE', 2))
+DRIVER_MAX_PAGE_LOADS = int(os.environ.get('DRIVER_MAX_PAGE_LOADS', 200))  # Recycle Chrome after this many page loads
+DRIVER_MAX_RSS_MB = int(os.environ.get('DRIVER_MAX_RSS_MB', 1024))  # Recycle Chrome once it uses this much memory
+DRIVER_ACQUIRE_TIMEOUT = 120
+PAGE_READY_TIMEOUT = float(os.environ.get('PAGE_READY_TIMEOUT', 10))  # Upper bound for document.readyState == 'complete'
+CONTACT_WAIT_TIMEOUT = float(os.environ.get('CONTACT_WAIT_TIMEOUT', DEFAULT_ELEMENT_TIMEOUT))  # Upper bound for the contact section to appear
+SCROLL_SETTLE_TIMEOUT = float(os.environ.get('SCROLL_SETTLE_TIMEOUT', 2))  # Upper bound per scroll for more reviews to load
+HTTP_POOL_SIZE = 20  # Requests in flight per upstream host
+SEARCH_CONCURRENCY = int(os.environ.get('SEARCH_CONCURRENCY', 3))  # Search result pages fetched at once after the first
+SEARCH_MAX_PAGES = int(os.environ.get('SEARCH_MAX_PAGES', 3))  # Result pages followed per search variant while they find new companies
+HTTP_CACHE_ENABLED = os.environ.get('HTTP_CACHE_ENABLED', '1') == '1'
+HTTP_CACHE_PATH = os.environ.get('HTTP_CACHE_PATH', os.path.join('.cache', 'http_cache.sqlite3'))
+HTTP_CACHE_MAX_MB = int(os.environ.get('HTTP_CACHE_MAX_MB', 200))
+HTTP_CACHE_SEARCH_TTL = 10 * 60  # seconds; search results change often
+HTTP_CACHE_COMPANY_TTL = 24 * 3600  # seconds; company pages rarely change
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_MAX_REQUESTS_PER_MINUTE = int(os.environ.get('RATE_LIMIT_MAX_REQUESTS_PER_MINUTE', 30))  # Per host, shared by all jobs
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 5))
+MAX_RETRIES = 3
+RETRY_DELAY = 1  # seconds; base of the jittered exponential backoff
+COMPANY_CACHE_ENABLED = os.environ.get('COMPANY_CACHE_ENABLED', '1') == '1'
+COMPANY_CACHE_PATH = os.environ.get('COMPANY_CACHE_PATH', os.path.join('.cache', 'companies.sqlite3'))
+COMPANY_CACHE_TTL = int(os.environ.get('COMPANY_CACHE_TTL', 3 * 24 * 3600))  # seconds a scraped company stays fresh
+
+# Runs the contact-section XPath queries in the page and returns the visible text of
+# every match (the parent of a 'Contact'/'Email' text node, or the element itself for
+# contact/email classes and placeholders), de-duplicated, in a single WebDriver call
+CONTACT_HARVEST_SCRIPT = """
+const queries = [
+    ["//*[contains(text(), 'Contact') or contains(text(), 'contact') or contains(text(), 'Email') or contains(text(), 'email')]", true],
+    ["//*[contains(@class, 'contact') or contains(@class, 'email') or contains(@placeholder, 'email')]", false]
+];
+const texts = new Set();
+let matched = 0;
+for (const [xpath, useParent] of queries) {
+    const matches = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    matched += matches.snapshotLength;
+    for (let i = 0; i < matches.snapshotLength; i++) {
+        let element = matches.snapshotItem(i);
+        if (useParent && element.parentElement) {
+            element = element.parentElement;
+        }
+        if (element.innerText) {
+            texts.add(element.innerText);
+        }
+    }
+}
+return {matched: matched, texts: Array.from(texts)};
+"""
+
+# Served by /api/metrics
+STAGE_SECONDS = metrics.Histogram(
+    'trustpilot_stage_duration_seconds',
+    'Time spent in each scraping stage (search_fetch_batch, search_parse, company_fetch, company_parse, driver_get, dom_extraction, company_total)',
+    ['stage']
+)
+
+@contextmanager
+def stage(name, **trace_args):
+    """Time a scraping stage into the stage histogram and, if the job is traced, its trace"""
+    with STAGE_SECONDS.time(stage=name), tracing.span(name, **trace_args):
+        yield
+
+# chromedriver path, resolved once per process and remembered across restarts in BROWSER_CACHE_PATH
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+def get_chromedriver_path():
+    """Resolve the chromedriver binary once instead of on every driver launch"""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path is None:
+            with tracing.span('chromedriver_install'):
+                _chromedriver_path = browser_setup.resolve_chromedriver(
+                    BROWSER_CACHE_PATH, env_path=CHROMEDRIVER_PATH, offline=BROWSER_OFFLINE
+                )
+        return _chromedriver_path
+
+class TrustpilotScraper:
+    def __init__(self, limiter=None, base_url=None):
+        self.base_url = (base_url or TRUSTPILOT_BASE_URL).rstrip('/')
+        self.headers = {
+            'User-Agent': TRUSTPILOT_USER_AGENT
+        }
+        self.driver = None
+        self.limiter = limiter or RateLimiter(enabled=False)
+        # Page fetches share one event loop and its keep-alive connections instead of a blocked thread each
+        self.engine = FetchEngine(headers=self.headers, max_per_host=HTTP_POOL_SIZE, timeout=DEFAULT_PAGE_LOAD_TIMEOUT)
+        # Every upstream request is paced by the shared limiter and retried on errors/throttling
+        self.http = ThrottledSession(self.engine, self.limiter, max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY)
+        self.http_cache = None
+        if HTTP_CACHE_ENABLED:
+            try:
+                self.http_cache = HttpCache(
+                    HTTP_CACHE_PATH,
+                    max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024,
+                    route_ttls=[('/search', HTTP_CACHE_SEARCH_TTL), ('/review/', HTTP_CACHE_COMPANY_TTL)]
+                )
+            except Exception as e:
+                logger.error(f"HTTP cache disabled, failed to open {HTTP_CACHE_PATH}: {e}")
+    
+    def fetch(self, url, revalidate=False):
+        """GET a Trustpilot page through the shared session and the on-disk response cache"""
+        if self.http_cache:
+            return self.http_cache.fetch(self.http, url, timeout=DEFAULT_PAGE_LOAD_TIMEOUT, revalidate=revalidate)
+        return self.http.get(url, timeout=DEFAULT_PAGE_LOAD_TIMEOUT)
+    
+    async def fetch_async(self, url, revalidate=False):
+        """fetch() for coroutines running on the fetch engine's loop"""
+        if self.http_cache:
+            return await self.http_cache.fetch_async(self.http, url, timeout=DEFAULT_PAGE_LOAD_TIMEOUT, revalidate=revalidate)
+        return await self.http.get_async(url, timeout=DEFAULT_PAGE_LOAD_TIMEOUT)
+    
+    def fetch_many(self, urls, revalidate=False):
+        """Fetch several pages at once on the fetch engine, blocking only the calling thread
+        
+        Returns a response, or the exception that fetching it raised, for each URL in order.
+        """
+        async def fetch_all():
+            return await asyncio.gather(*(self.fetch_async(url, revalidate) for url in urls), return_exceptions=True)
+        return self.engine.run(fetch_all())
+    
+    def setup_driver(self):
+        """Setup Chrome driver with options"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except:
+                pass
+        
+        self.driver = self.create_driver()
+        return self.driver
+    
+    def create_driver(self):
+        """Launch a new Chrome driver with options (used by the driver pool)"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        
+        chrome_options = Options()
+        chrome_binary = browser_setup.resolve_chrome_binary(BROWSER_CACHE_PATH, env_path=CHROME_BINARY)
+        if chrome_binary:
+            chrome_options.binary_location = chrome_binary
+        if CHROME_HEADLESS:
+            chrome_options.add_argument("--headless")
+        if CHROME_NO_SANDBOX:
+            chrome_options.add_argument("--no-sandbox")
+        if CHROME_DISABLE_DEV_SHM:
+            chrome_options.add_argument("--disable-dev-shm-usage")
+        if CHROME_DISABLE_GPU:
+            chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument(f"--window-size={CHROME_WINDOW_SIZE}")
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        chrome_options.add_argument(f"user-agent={self.headers['User-Agent']}")
+        
+        try:
+            service = Service(get_chromedriver_path())
+            with tracing.span('chrome_launch'):
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            return driver
+        except Exception as e:
+            logger.error(f"Failed to setup Chrome driver: {e}")
+            return None
+    
+    def cleanup_driver(self):
+        """Clean up the driver"""
+        if self.driver:
+            try:
+                self.driver.quit()
+                self.driver = None
+            except:
+                pass
+    
+    def clean_company_name(self, raw_name):
+        """Clean up company name by removing extra text"""
+        return extraction.clean_company_name(raw_name)
+    
+    def search_companies(self, search_term, max_companies=10):
+        """Search for companies on Trustpilot with improved sector targeting"""
+        return list(self.iter_companies(search_term, max_companies))
+    
+    def search_url(self, variant, page=1):
+        """URL of one page of Trustpilot search results"""
+        url = f"{self.base_url}/search?query={variant}"
+        return url if page == 1 else f"{url}&page={page}"
+    
+    def iter_companies(self, search_term, max_companies=10):
+        """Yield de-duplicated companies as each search page is parsed
+        
+        Each search variant's result pages are followed, up to SEARCH_MAX_PAGES deep, until one finds no
+        company that hasn't been yielded yet. Companies are de-duplicated by canonical /review/<domain> URL.
+        Remaining pages are skipped once max_companies unique companies have been yielded, so callers can
+        start scraping on the first hit instead of waiting for every variant. The first page is fetched
+        alone; when it falls short the rest are fetched SEARCH_CONCURRENCY at a time.
+        """
+        found = 0
+        try:
+            # Enhanced search terms for better sector targeting, each from its first result page
+            pending = [(variant, 1) for variant in self.get_enhanced_search_terms(search_term)]
+            seen_urls = set()
+            first = True
+            
+            while pending and found < max_companies:
+                size = 1 if first else SEARCH_CONCURRENCY
+                batch, pending = pending[:size], pending[size:]
+                first = False
+                # Timed as a whole: the pages of a batch are fetched concurrently
+                with stage('search_fetch_batch', pages=[[variant, page] for variant, page in batch]):
+                    responses = self.fetch_many([self.search_url(variant, page) for variant, page in batch])
+                
+                next_pages = []
+                for (search_term_variant, page), response in zip(batch, responses):
+                    if found >= max_companies:
+                        break
+                    try:
+                        if isinstance(response, Exception):
+                            raise response
+                        response.raise_for_status()
+                    except Exception as e:
+                        # One failed page (after retries) shouldn't abort the whole search
+                        logger.warning(f"Skipping page {page} of search variant '{search_term_variant}': {e}")
+                        continue
+                    
+                    with stage('search_parse'):
+                        # Company cards (name, URL, rating, review count) in one lxml pass
+                        cards = extract_search_results(response.content, self.base_url)
+                    
+                    new_companies = 0
+                    for card in cards:
+                        if found >= max_companies:
+                            break
+                        
+                        # Clean up company name
+                        clean_name = self.clean_company_name(card['raw_name'])
+                        if clean_name and len(clean_name) > 2:  # Only add if name is meaningful
+                            # Check if company has already been yielded
+                            key = canonical_company_url(card['url'], self.base_url)
+                            if key not in seen_urls:
+                                seen_urls.add(key)
+                                found += 1
+                                new_companies += 1
+                                yield {
+                                    'name': clean_name,
+                                    'url': card['url'],
+                                    'raw_name': card['raw_name'],  # Keep original for debugging
+                                    'search_term_used': search_term_variant,
+                                    'rating': card['rating'],
+                                    'review_count': card['review_count']
+                                }
+                    
+                    # A page with nothing new means the variant's later pages are unlikely to add much
+                    if new_companies and page < SEARCH_MAX_PAGES:
+                        next_pages.append((search_term_variant, page + 1))
+                
+                # Deeper pages of productive variants go before variants not yet tried
+                pending = next_pages + pending
+            
+        except Exception as e:
+            logger.error(f"Error searching companies: {e}")
+        
+        logger.info(f"Found {found} companies for search term: {search_term}")
+    
+    def get_enhanced_search_terms(self, base_term):
+        """Generate enhanced search terms for better sector targeting"""
+        # Real estate specific enhancements
+        real_estate_terms = [
+            f"{base_term} real estate",
+            f"{base_term} property",
+            f"{base_term} realtor",
+            f"{base_term} estate agent",
+            f"{base_term} property management",
+            f"{base_term} real estate agency",
+            f"{base_term} property investment",
+            f"{base_term} real estate broker",
+            f"{base_term} property developer",
+            f"{base_term} real estate consultant"
+        ]
+        
+        # General business enhancements
+        general_terms = [
+            base_term,
+            f"{base_term} company",
+            f"{base_term} business",
+            f"{base_term} services",
+            f"{base_term} ltd",
+            f"{base_term} inc",
+            f"{base_term} corp"
+        ]
+        
+        # Combine and return unique terms
+        all_terms = real_estate_terms + general_terms
+        return list(dict.fromkeys(all_terms))  # Remove duplicates while preserving order
+    
+    def safe_find_elements(self, driver, by, value, timeout=DEFAULT_ELEMENT_TIMEOUT):
+        """Safely find elements with timeout and retry logic"""
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        
+        try:
+            wait = WebDriverWait(driver, timeout)
+            elements = wait.until(EC.presence_of_all_elements_located((by, value)))
+            return elements
+        except (TimeoutException, WebDriverException) as e:
+            logger.warning(f"Timeout finding elements {by}={value}: {e}")
+            return []
+    
+    def scrape_company_page_http(self, company_url, revalidate=False):
+        """Fast path: fetch the server-rendered company page over HTTP and parse it with lxml
+        
+        Returns (emails, has_contact_section). When the page has no contact section the
+        caller should fall back to scrape_company_page, which drives a real browser.
+        """
+        try:
+            with stage('company_fetch'):
+                response = self.fetch(company_url, revalidate=revalidate)
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"HTTP fetch failed for {company_url}: {e}")
+            return [], False
+        
+        with stage('company_parse'):
+            texts, has_contact_section = extract_contact_texts(response.content)
+        
+        company_emails = extraction.find_company_emails_batch(texts)
+        return list(dict.fromkeys(company_emails)), has_contact_section
+    
+    def scrape_company(self, company_url, pool=None, force_refresh=False):
+        """Scrape a company's emails over HTTP first, using Chrome only when that finds no contact section
+        
+        Returns (emails, source) where source is 'http' or 'browser', or 'failed' when neither could
+        read the page; a failure is not the same as a page without emails and shouldn't be cached.
+        force_refresh revalidates any cached copy of the page with Trustpilot.
+        """
+        emails, has_contact_section = self.scrape_company_page_http(company_url, revalidate=force_refresh)
+        if has_contact_section:
+            return emails, 'http'
+        
+        logger.info(f"No contact section in server-rendered page, falling back to browser: {company_url}")
+        if pool is None:
+            emails = self.scrape_company_page(company_url)
+        else:
+            try:
+                with tracing.span('browser_fallback'), pool.lease() as driver:
+                    emails = self.scrape_company_page(company_url, driver=driver)
+            except DriverPoolError as e:
+                # One company without a browser shouldn't end the whole job
+                logger.error(f"No Chrome driver for {company_url}, skipping it: {e}")
+                emails = None
+        if emails is None:
+            return [], 'failed'
+        return emails, 'browser'
+    
+    def scrape_company_page(self, company_url, driver=None):
+        """Scrape company page for company contact information (emails only)
+        
+        Returns None, rather than an empty list, when Chrome couldn't start or load the page.
+        """
+        try:
+            if driver is None:
+                if not self.driver:
+                    self.setup_driver()
+                driver = self.driver
+            
+            if not driver:
+                return None
+            
+            driver = CountingDriver(driver)
+            self.limiter.acquire(company_url)
+            with stage('driver_get'):
+                driver.get(company_url)
+                readiness.wait_for_document_ready(driver, PAGE_READY_TIMEOUT)
+            
+            # Collect every candidate text block in one execute_script round trip instead of
+            # two find_elements scans plus a find_element/.text call per match. Polls until
+            # the page has at least one match, like the old presence wait did.
+            def harvest():
+                harvested = driver.execute_script(CONTACT_HARVEST_SCRIPT)
+                return harvested['texts'] if harvested and harvested['matched'] else None
+            
+            with stage('dom_extraction'):
+                texts = readiness.wait_until(harvest, CONTACT_WAIT_TIMEOUT, 'contact_section') or []
+            
+            # Look for company emails only (personal mail providers are filtered out)
+            company_emails = extraction.find_company_emails_batch(texts)
+            logger.info(f"Harvested {len(texts)} contact blocks from {company_url} in {driver.calls} WebDriver calls")
+            
+            # Remove duplicates - no limit on emails per company
+            unique_emails = list(set(company_emails))
+            return unique_emails
+            
+        except Exception as e:
+            logger.error(f"Error scraping company page: {e}")
+            return None
+    
+    def is_personal_email(self, email):
+        """Check if email is likely personal rather than company email"""
+        return extraction.is_personal_email(email)
+    
+    def scrape_reviews_for_emails(self, company_url, max_reviews=50, driver=None):
+        """Scrape reviews for potential email addresses"""
+        try:
+            if driver is None:
+                if not self.driver:
+                    self.setup_driver()
+                driver = self.driver
+            
+            if not driver:
+                return []
+            
+            # Go to reviews page
+            reviews_url = company_url.replace('/review/', '/reviews/')
+            self.limiter.acquire(reviews_url)
+            driver.get(reviews_url)
+            readiness.wait_for_document_ready(driver, PAGE_READY_TIMEOUT)
+            
+            emails = []
+            
+            # Scroll through reviews until no more content loads
+            try:
+                readiness.scroll_until_settled(driver, max_scrolls=3, timeout_per_scroll=SCROLL_SETTLE_TIMEOUT)
+            except Exception as e:
+                logger.debug(f"Error scrolling reviews: {e}")
+            
+            # Extract all text content
+            page_text = driver.page_source
+            soup = BeautifulSoup(page_text, 'html.parser')
+            
+            # Find all review text with better pattern matching
+            review_elements = soup.find_all(['p', 'div', 'span'], class_=re.compile(r'review|comment|text|content'))
+            
+            for element in review_elements:
+                text = element.get_text()
+                # Extract emails from review text
+                found_emails = extraction.find_emails(text)
+                emails.extend(found_emails)
+                
+                # Limit the number of reviews processed
+                if len(emails) >= max_reviews:
+                    break
+            
+            return list(set(emails))  # Remove duplicates
+            
+        except Exception as e:
+            logger.error(f"Error scraping reviews: {e}")
+            return []
+
+def create_rate_limiter():
+    """Per-host token bucket configured by the RATE_LIMIT_* settings"""
+    return RateLimiter(
+        requests_per_minute=RATE_LIMIT_MAX_REQUESTS_PER_MINUTE,
+        burst=RATE_LIMIT_BURST,
+        enabled=RATE_LIMIT_ENABLED
+    )
+
+def create_driver_pool(scraper):
+    """Chrome pool launching drivers through `scraper`, configured by the DRIVER_* settings"""
+    return DriverPool(
+        scraper.create_driver,
+        size=DRIVER_POOL_SIZE,
+        max_page_loads=DRIVER_MAX_PAGE_LOADS,
+        max_rss_mb=DRIVER_MAX_RSS_MB,
+        acquire_timeout=DRIVER_ACQUIRE_TIMEOUT
+    )
+
+def create_company_cache():
+    """The shared company cache, or None when COMPANY_CACHE_ENABLED is off"""
+    return CompanyCache(COMPANY_CACHE_PATH, ttl=COMPANY_CACHE_TTL) if COMPANY_CACHE_ENABLED else None
+
+def discover_companies(scraper, search_terms, max_companies, matched_terms, already_found=0):
+    """Yield up to max_companies companies found by any of the terms, each canonical URL only once
+    
+    Terms are searched in order; matched_terms (canonical URL -> terms) records every searched
+    term that found a company, including companies already yielded for an earlier term.
+    Companies already in matched_terms (e.g. from a resumed job's checkpoint) are not yielded
+    again and count towards max_companies via already_found.
+    """
+    found = already_found
+    for term in search_terms:
+        if found >= max_companies:
+            break
+        for company in scraper.iter_companies(term, max_companies):
+            key = canonical_company_url(company['url'], TRUSTPILOT_BASE_URL)
+            terms = matched_terms.get(key)
+            if terms is not None:
+                if term not in terms:
+                    terms.append(term)
+                continue
+            if found >= max_companies:
+                break
+            matched_terms[key] = [term]
+            found += 1
+            yield company
+
+def scrape_one_company(scraper, company, search_term, scrape_all_emails, force_refresh=False, pool=None, cache=None):
+    """Scrape one company, or reuse `cache`'s copy; returns (result or None, source)
+    
+    The result is None when the company has no emails. Chrome is leased from `pool` only
+    if the server-rendered page has no contact section. Failed scrapes aren't cached.
+    """
+    cached = None
+    if cache and not force_refresh:
+        with tracing.span('company_cache_lookup'):
+            cached = cache.get(company['url'])
+    
+    if cached:
+        # Scraped recently by this or another job; no need to hit Trustpilot again
+        company_emails, source = cached['emails'], 'cache'
+        scraped_at = datetime.fromtimestamp(cached['scraped_at']).isoformat()
+    else:
+        # Get company contact info (emails only); Chrome is leased from the pool only if needed
+        company_emails, source = scraper.scrape_company(company['url'], pool=pool, force_refresh=force_refresh)
+        scraped_at = datetime.now().isoformat()
+        # A failed scrape isn't cached as "no emails"; the next job tries the company again
+        if cache and source != 'failed':
+            cache.put(company['url'], company['name'], company_emails, source)
+    
+    if not scrape_all_emails:
+        # Limit to first 10 emails per company
+        company_emails = company_emails[:10]
+    
+    result = None
+    # Only include companies that have at least one email
+    if company_emails:
+        result = {
+            'name': company['name'],
+            'url': company['url'],
+            'raw_name': company.get('raw_name', ''),
+            'company_emails': company_emails,
+            'total_emails': len(company_emails),
+            'sector': search_term,
+            'source': source,
+            'scraped_at': scraped_at
+        }
+    else:
+        logger.info(f"Skipping company {company['name']} - no emails found")
+    
+    return result, source
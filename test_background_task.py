@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+Tests for background_scraping_task with the network and Chrome stubbed out
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+os.environ.setdefault('DRIVER_POOL_PREWARM', '0')
+os.environ.setdefault('JOB_STORE_BACKEND', 'memory')
+os.environ.setdefault('COMPANY_CACHE_ENABLED', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+import app
+from company_cache import CompanyCache
+from driver_pool import DriverPool
+import scraping
+
+
+def make_companies(count):
+    return [
+        {'name': f'Company {i}', 'url': f'https://www.trustpilot.com/review/company{i}.com', 'raw_name': f'Company {i}'}
+        for i in range(count)
+    ]
+
+
+def fake_scrape_company(company_url, pool=None, force_refresh=False):
+    time.sleep(random.uniform(0, 0.01))
+    index = int(company_url.rsplit('company', 1)[1].split('.')[0])
+    if index % 3 == 0:
+        return [], 'browser'
+    return [f'info@company{index}.com', f'sales@company{index}.com'], 'http'
+
+
+def run_job(monkeypatch, search_id, companies, workers, force_refresh=False, scrape=fake_scrape_company):
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter(companies))
+    monkeypatch.setattr(app.scraper, 'scrape_company', scrape)
+    app.background_scraping_task(search_id, 'test', len(companies), False, workers, force_refresh)
+    assert search_id not in app.scraping_progress
+    return app.job_store.get_job(search_id)
+
+
+def test_concurrent_job_keeps_order_and_exact_counters(monkeypatch):
+    companies = make_companies(30)
+    job = run_job(monkeypatch, 'search_test_concurrent', companies, workers=6)
+
+    expected_urls = [c['url'] for i, c in enumerate(companies) if i % 3 != 0]
+    assert job['status'] == 'completed'
+    assert [r['url'] for r in job['results']] == expected_urls
+    assert job['companies_processed'] == 30
+    assert job['progress'] == 100
+    assert job['emails_found'] == 2 * len(expected_urls)
+    assert job['fast_path_companies'] == len(expected_urls)
+    assert job['slow_path_companies'] == 10
+
+
+def test_single_worker_matches_concurrent_output(monkeypatch):
+    companies = make_companies(12)
+    serial = run_job(monkeypatch, 'search_test_serial', companies, workers=1)
+    parallel = run_job(monkeypatch, 'search_test_parallel', companies, workers=4)
+    assert [r['url'] for r in serial['results']] == [r['url'] for r in parallel['results']]
+    assert serial['emails_found'] == parallel['emails_found']
+
+
+def test_scraping_starts_before_search_finishes(monkeypatch):
+    first_scrape = threading.Event()
+    companies = make_companies(3)
+
+    def slow_search(term, max_companies):
+        yield companies[0]
+        # The rest of the search only continues once the first hit is being scraped
+        assert first_scrape.wait(timeout=5)
+        yield from companies[1:]
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        first_scrape.set()
+        return ['hello@example.org'], 'http'
+
+    monkeypatch.setattr(app.scraper, 'iter_companies', slow_search)
+    monkeypatch.setattr(app.scraper, 'scrape_company', scrape)
+    app.background_scraping_task('search_test_pipeline', 'test', 3, False, 2)
+    job = app.job_store.get_job('search_test_pipeline')
+
+    assert job['status'] == 'completed'
+    assert job['companies_found'] == 3
+    assert len(job['results']) == 3
+
+
+def test_one_failing_company_does_not_end_the_job(monkeypatch):
+    def scrape(company_url, pool=None, force_refresh=False):
+        if company_url.endswith('company2.com'):
+            raise RuntimeError('boom')
+        return fake_scrape_company(company_url, pool, force_refresh)
+
+    job = run_job(monkeypatch, 'search_test_one_failure', make_companies(6), workers=3, scrape=scrape)
+
+    assert job['status'] == 'completed'
+    assert job['companies_processed'] == 6
+    assert job['failed_companies'] == 1
+    assert [r['url'].rsplit('/', 1)[1] for r in job['results']] == ['company1.com', 'company4.com', 'company5.com']
+    # The failed company isn't checkpointed, so a resume tries it again
+    assert [row['index'] for row in app.job_store.get_checkpoint('search_test_one_failure') if not row['done']] == [2]
+
+
+def test_chrome_launch_failure_skips_the_company_not_the_job(monkeypatch):
+    pool = DriverPool(lambda: None, size=1)
+    monkeypatch.setattr(app, 'driver_pool', pool)
+    monkeypatch.setattr(app.scraper, 'scrape_company_page_http', lambda url, revalidate=False: ([], False))
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter(make_companies(3)))
+    app.background_scraping_task('search_test_no_chrome', 'test', 3, False, 2)
+    job = app.job_store.get_job('search_test_no_chrome')
+
+    assert job['status'] == 'completed'
+    assert job['companies_processed'] == 3 and job['failed_companies'] == 3
+    assert job['results'] == []
+
+
+class FakeSearchPage:
+    """A fetched search results page listing (domain, name) company cards"""
+
+    def __init__(self, cards):
+        self.content = ''.join(f'<a href="/review/{domain}">{name}</a>' for domain, name in cards).encode()
+
+    def raise_for_status(self):
+        pass
+
+
+def fake_search_pages(monkeypatch, cards):
+    """Serve the scraper's search fetches from cards(variant, page), a card list or an exception to fail with
+
+    Returns the list of URL batches fetched, in order.
+    """
+    requested = []
+
+    def fake_fetch_many(urls):
+        requested.append(urls)
+        responses = []
+        for url in urls:
+            query = parse_qs(urlsplit(url).query)
+            page = cards(query['query'][0], int(query.get('page', ['1'])[0]))
+            responses.append(page if isinstance(page, Exception) else FakeSearchPage(page))
+        return responses
+
+    monkeypatch.setattr(app.scraper, 'fetch_many', fake_fetch_many)
+    return requested
+
+
+def test_iter_companies_stops_after_max_companies(monkeypatch):
+    shops = [(f'shop{i}.com', f'Shop Number {chr(65 + i)}') for i in range(4)]
+    requested = fake_search_pages(monkeypatch, lambda variant, page: shops)
+    companies = list(app.scraper.iter_companies('bakery', max_companies=3))
+    assert len(companies) == 3
+    assert len(requested) == 1 and len(requested[0]) == 1
+
+
+def test_iter_companies_fetches_later_variants_concurrently(monkeypatch):
+    shops = {variant: [(f'shop{i}.com', f'Shop Number {chr(65 + i)}')] for i, variant in enumerate('bcd')}
+    monkeypatch.setattr(scraping, 'SEARCH_CONCURRENCY', 3)
+    monkeypatch.setattr(app.scraper, 'get_enhanced_search_terms', lambda term: ['a', 'b', 'c', 'd', 'e'])
+    requested = fake_search_pages(monkeypatch, lambda variant, page: shops.get(variant, ConnectionError('reset')))
+    companies = list(app.scraper.iter_companies('bakery', max_companies=2))
+    # The lone first variant fails, then the next three are fetched in one batch
+    assert [len(urls) for urls in requested] == [1, 3]
+    assert len(companies) == 2
+
+
+def test_iter_companies_follows_pages_and_dedups_by_url(monkeypatch):
+    pages = {
+        ('a', 1): [('one.com', 'Shop One'), ('two.com', 'Shop Two')],
+        ('a', 2): [('three.com', 'Shop Three'), ('ONE.com/', 'Shop One')],
+        ('a', 3): [('two.com', 'Shop Two')],
+        ('a', 4): [('four.com', 'Shop Four')],
+        ('b', 1): [('one-ltd.com', 'Shop One')],
+    }
+    monkeypatch.setattr(scraping, 'SEARCH_CONCURRENCY', 2)
+    monkeypatch.setattr(scraping, 'SEARCH_MAX_PAGES', 5)
+    monkeypatch.setattr(app.scraper, 'get_enhanced_search_terms', lambda term: ['a', 'b'])
+    requested = fake_search_pages(monkeypatch, lambda variant, page: pages.get((variant, page), []))
+    companies = list(app.scraper.iter_companies('shop', max_companies=10))
+
+    # Same URL in another case is one company; same name at another URL is another
+    assert [company['url'].rsplit('/', 1)[-1] for company in companies] == ['one.com', 'two.com', 'three.com', 'one-ltd.com']
+    # Page 3 of 'a' finds nothing new, so page 4 is never asked for
+    assert requested == [
+        [app.scraper.search_url('a')],
+        [app.scraper.search_url('a', 2), app.scraper.search_url('b')],
+        [app.scraper.search_url('a', 3), app.scraper.search_url('b', 2)],
+    ]
+
+
+def test_cancel_from_another_worker_stops_job(monkeypatch):
+    companies = make_companies(20)
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        # Simulate a cancel request served by a different web worker
+        app.job_store.request_cancel('search_test_cancel')
+        return ['hello@example.org'], 'http'
+
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter(companies))
+    monkeypatch.setattr(app.scraper, 'scrape_company', scrape)
+    app.background_scraping_task('search_test_cancel', 'test', 20, False, 1)
+    job = app.job_store.get_job('search_test_cancel')
+
+    assert job['status'] == 'cancelled'
+    assert job['companies_processed'] < 20
+    assert len(job['results']) == job['companies_processed']
+
+
+def test_company_cache_is_shared_across_jobs(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'company_cache', CompanyCache(str(tmp_path / 'companies.sqlite3')))
+    scraped = []
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        scraped.append(company_url)
+        return fake_scrape_company(company_url)
+
+    companies = make_companies(6)
+    first = run_job(monkeypatch, 'search_test_cache_1', companies, workers=2, scrape=scrape)
+    second = run_job(monkeypatch, 'search_test_cache_2', companies, workers=2, scrape=scrape)
+    assert len(scraped) == 6
+    assert second['companies_from_cache'] == 6
+    assert [r['company_emails'] for r in second['results']] == [r['company_emails'] for r in first['results']]
+
+    refreshed = run_job(monkeypatch, 'search_test_cache_3', companies, workers=2, force_refresh=True, scrape=scrape)
+    assert len(scraped) == 12
+    assert refreshed['companies_from_cache'] == 0
+
+
+def test_failed_scrapes_are_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'company_cache', CompanyCache(str(tmp_path / 'companies.sqlite3')))
+    monkeypatch.setattr(app.scraper, 'scrape_company_page_http', lambda url, revalidate=False: ([], False))
+    monkeypatch.setattr(app.scraper, 'scrape_company_page', lambda url, driver=None: None)
+    monkeypatch.setattr(app, 'driver_pool', None)
+    assert app.scraper.scrape_company('https://www.trustpilot.com/review/company0.com') == ([], 'failed')
+
+    companies = make_companies(3)
+    failed = run_job(monkeypatch, 'search_test_cache_failed', companies, workers=2, scrape=app.scraper.scrape_company)
+    assert failed['failed_companies'] == 3
+    assert all(app.company_cache.get(c['url']) is None for c in companies)
+
+    scraped = []
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        scraped.append(company_url)
+        return fake_scrape_company(company_url)
+
+    retried = run_job(monkeypatch, 'search_test_cache_retried', companies, workers=2, scrape=scrape)
+    assert len(scraped) == 3 and retried['companies_from_cache'] == 0
+
+
+def logged_in_client():
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+    return client
+
+
+def test_progress_since_cursor_returns_only_new_results(monkeypatch):
+    run_job(monkeypatch, 'search_test_since', make_companies(6), workers=2)
+    client = logged_in_client()
+
+    full = client.get('/api/progress/search_test_since').get_json()
+    assert full['cursor'] == len(full['results']) == 4
+
+    delta = client.get('/api/progress/search_test_since?since=3').get_json()
+    assert [r['url'] for r in delta['results']] == [full['results'][3]['url']]
+    assert delta['cursor'] == 4
+    assert delta['emails_found'] == full['emails_found']
+    assert client.get('/api/progress/search_test_since?since=4').get_json()['results'] == []
+    assert client.get('/api/progress/missing?since=0').status_code == 404
+
+
+def test_progress_stream_sends_deltas_and_ends_when_done(monkeypatch):
+    monkeypatch.setattr(app, 'PROGRESS_STREAM_INTERVAL', 0)
+    run_job(monkeypatch, 'search_test_stream', make_companies(6), workers=2)
+    client = logged_in_client()
+
+    response = client.get('/api/progress/search_test_stream/stream', headers={'Last-Event-ID': '2'})
+    assert response.mimetype == 'text/event-stream'
+    events = [block for block in response.get_data(as_text=True).split('\n\n') if block]
+    assert len(events) == 1
+    lines = events[0].split('\n')
+    assert lines[:2] == ['id: 4', 'event: done']
+    payload = json.loads(lines[2][len('data: '):])
+    assert payload['status'] == 'completed'
+    assert len(payload['results']) == 2
+
+    assert client.get('/api/progress/missing/stream').status_code == 404
+
+
+def test_exports_stream_running_jobs_and_gzip(monkeypatch):
+    run_job(monkeypatch, 'search_test_export', make_companies(6), workers=2)
+    job = app.job_store.get_job('search_test_export')
+    # Reopen it as a running job that has some results so far
+    job['status'] = 'running'
+    app.job_store.create_job('search_test_export_running', job)
+    client = logged_in_client()
+
+    csv_response = client.get('/api/export/csv/search_test_export_running')
+    assert csv_response.headers['X-Search-Status'] == 'running'
+    assert 'Content-Encoding' not in csv_response.headers
+    rows = list(csv.reader(io.StringIO(csv_response.get_data(as_text=True))))
+    assert rows[0][0] == 'Company Name'
+    assert [row[1] for row in rows[1:]] == [r['url'] for r in job['results']]
+
+    ndjson_response = client.get('/api/export/ndjson/search_test_export', headers={'Accept-Encoding': 'gzip'})
+    assert ndjson_response.headers['Content-Encoding'] == 'gzip'
+    lines = gzip.decompress(ndjson_response.get_data()).decode().splitlines()
+    assert [json.loads(line)['url'] for line in lines] == [r['url'] for r in job['results']]
+
+    exported = json.loads(client.get('/api/export/json/search_test_export').get_data(as_text=True))
+    assert exported == app.job_store.get_job('search_test_export')
+    assert client.get('/api/export/ndjson/missing').status_code == 404
+
+
+def test_results_are_paginated_with_a_cursor(monkeypatch):
+    job = run_job(monkeypatch, 'search_test_pages', make_companies(15), workers=3)
+    client = logged_in_client()
+
+    urls = []
+    cursor = 0
+    while cursor is not None:
+        page = client.get(f'/api/results/search_test_pages?limit=4&cursor={cursor}').get_json()
+        assert len(page['results']) <= 4
+        urls.extend(r['url'] for r in page['results'])
+        cursor = page['next_cursor']
+    assert urls == [r['url'] for r in job['results']]
+    assert page['results_count'] == len(urls) == 10
+
+    assert len(client.get('/api/results/search_test_pages').get_json()['results']) == 10
+
+
+def test_search_admission_queue_positions_and_unique_ids(monkeypatch):
+    release = threading.Event()
+    ran = []
+
+    def blocking_task(search_id, *args):
+        ran.append(search_id)
+        app.job_store.save_job(search_id, dict(app.scraping_progress[search_id], status='running'))
+        release.wait(timeout=5)
+        app.scraping_progress.pop(search_id, None)
+
+    scheduler = app.JobScheduler(max_running=1, max_queued=1, on_queue_change=app.update_queue_positions)
+    monkeypatch.setattr(app, 'job_scheduler', scheduler)
+    monkeypatch.setattr(app, 'background_scraping_task', blocking_task)
+    client = logged_in_client()
+
+    responses = [client.post('/api/search', json={'search_term': 'bakery'}) for _ in range(3)]
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert 'Retry-After' in responses[2].headers
+    first, second = responses[0].get_json(), responses[1].get_json()
+    # Both started within the same second but got distinct IDs
+    assert first['search_id'] != second['search_id']
+    assert first['queue_position'] == 0
+    assert second['queue_position'] == 1
+    queued = client.get(f"/api/progress/{second['search_id']}").get_json()
+    assert queued['status'] == 'queued'
+    assert queued['queue_position'] == 1
+
+    # Cancelling a queued search removes it from the queue without ever running it
+    assert client.post(f"/api/cancel/{second['search_id']}").status_code == 200
+    assert scheduler.stats()['queued'] == 0
+    release.set()
+    assert ran == [first['search_id']]
+
+
+def test_client_priority_is_clamped(monkeypatch):
+    submitted = []
+
+    class RecordingScheduler:
+        def submit(self, job_id, func, args=(), client=None, priority=0):
+            submitted.append(priority)
+            return 1
+
+    monkeypatch.setattr(app, 'job_scheduler', RecordingScheduler())
+    client = logged_in_client()
+    for priority in (1000, -1000, 1):
+        response = client.post('/api/search', json={'search_term': 'bakery', 'priority': priority})
+        assert response.status_code == 200
+        app.scraping_progress.pop(response.get_json()['search_id'], None)  # never runs
+    assert submitted == [app.MAX_SEARCH_PRIORITY, -app.MAX_SEARCH_PRIORITY, 1]
+
+
+def test_fair_share_client_is_the_hop_the_proxy_appended(monkeypatch):
+    clients = []
+
+    class RecordingScheduler:
+        def submit(self, job_id, func, args=(), client=None, priority=0):
+            clients.append(client)
+            return 1
+
+    monkeypatch.setattr(app, 'job_scheduler', RecordingScheduler())
+    client = logged_in_client()
+    for forged in ('1.1.1.1', '2.2.2.2'):
+        # The client sends its own first hop; the proxy appends the address it saw
+        response = client.post('/api/search', json={'search_term': 'bakery'},
+                               headers={'X-Forwarded-For': f"{forged}, 203.0.113.7"})
+        assert response.status_code == 200
+        app.scraping_progress.pop(response.get_json()['search_id'], None)  # never runs
+    assert clients == ['203.0.113.7', '203.0.113.7']
+
+
+def test_batch_job_scrapes_each_company_once_and_records_matching_terms(monkeypatch):
+    companies = make_companies(6)
+    found_by = {
+        'bakery': companies[0:4],
+        # Same companies under a differently written URL, plus two new ones
+        'cakes': [dict(c, url=c['url'].replace('www.', 'WWW.') + '/?page=2') for c in companies[2:4]] + companies[4:6],
+    }
+    scraped = []
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        scraped.append(company_url)
+        return ['hello@example.org'], 'http'
+
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter(found_by[term]))
+    monkeypatch.setattr(app.scraper, 'scrape_company', scrape)
+    app.background_scraping_task('search_test_batch', 'bakeries', 10, False, 3, search_terms=['bakery', 'cakes'])
+    job = app.job_store.get_job('search_test_batch')
+
+    assert sorted(scraped) == sorted(c['url'] for c in companies)
+    assert job['companies_found'] == 6
+    assert job['search_terms'] == ['bakery', 'cakes']
+    assert [r['matched_terms'] for r in job['results']] == [
+        ['bakery'], ['bakery'], ['bakery', 'cakes'], ['bakery', 'cakes'], ['cakes'], ['cakes']
+    ]
+
+
+def test_batch_job_writes_results_and_checkpoints_before_every_term_is_searched(monkeypatch):
+    companies = make_companies(4)
+    scraped = []
+    seen_mid_discovery = {}
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        scraped.append(company_url)
+        return ['hi@example.org'], 'http'
+
+    def search_cakes():
+        # Let the first term's companies finish; the next submit appends them
+        deadline = time.time() + 5
+        while len(scraped) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        yield from companies[1:3]
+        seen_mid_discovery['results'] = app.job_store.get_results('search_test_early')
+        seen_mid_discovery['done'] = [row['done'] for row in app.job_store.get_checkpoint('search_test_early')]
+        yield companies[3]
+
+    found_by = {'bakery': lambda: iter(companies[0:2]), 'cakes': search_cakes}
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: found_by[term]())
+    monkeypatch.setattr(app.scraper, 'scrape_company', scrape)
+    app.background_scraping_task('search_test_early', 'bakeries', 10, False, 2, search_terms=['bakery', 'cakes'])
+
+    assert [r['url'] for r in seen_mid_discovery['results']] == [c['url'] for c in companies[0:2]]
+    assert seen_mid_discovery['done'][:2] == [True, True]
+    # The stored result picks up the later term once discovery is over
+    job = app.job_store.get_job('search_test_early')
+    assert [r['matched_terms'] for r in job['results']] == [['bakery'], ['bakery', 'cakes'], ['cakes'], ['cakes']]
+
+
+def test_search_request_terms_from_list_or_sector():
+    assert app.resolve_search_terms({'search_terms': ['Bakery', ' bakery ', 'cakes', '']}) == ['Bakery', 'cakes']
+    assert app.resolve_search_terms({'sector': 'finance'}) == app.SECTORS['finance']['search_terms']
+    assert app.resolve_search_terms({'sector': 'custom', 'search_term': 'vets'}) == ['vets']
+    assert app.resolve_search_terms({}) == []
+
+
+def wait_for_status(search_id, statuses, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = app.job_store.get_job(search_id)
+        if job and job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"{search_id} never reached {statuses}")
+
+
+def test_cancelled_search_resumes_from_its_checkpoint(monkeypatch):
+    companies = make_companies(12)
+    scraped = []
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        scraped.append(company_url)
+        if len(scraped) == 6:
+            # Interrupt the first run part-way through; this company is still in flight when it stops
+            app.job_store.request_cancel(search_id)
+            time.sleep(0.2)
+        return fake_scrape_company(company_url)
+
+    monkeypatch.setattr(app, 'job_scheduler', app.JobScheduler(max_running=1, on_queue_change=app.update_queue_positions))
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter(companies))
+    monkeypatch.setattr(app.scraper, 'scrape_company', scrape)
+    client = logged_in_client()
+
+    search_id = client.post('/api/search', json={'search_term': 'test', 'max_companies': 12, 'workers': 1}).get_json()['search_id']
+    first = wait_for_status(search_id, ('cancelled',))
+    assert first['companies_processed'] < 12
+    while search_id in app.scraping_progress:
+        time.sleep(0.01)
+
+    response = client.post(f'/api/resume/{search_id}')
+    assert response.status_code == 200
+    assert response.get_json()['companies_done'] == 5
+    job = wait_for_status(search_id, ('completed',))
+
+    # Only the company in flight at the cancel is scraped twice, and the results are complete
+    assert len(scraped) == 13
+    assert sorted(set(scraped)) == sorted(c['url'] for c in companies)
+    assert sorted(r['url'] for r in job['results']) == sorted(c['url'] for i, c in enumerate(companies) if i % 3 != 0)
+    assert job['companies_processed'] == 12
+    assert job['emails_found'] == 2 * len(job['results'])
+
+    assert client.post(f'/api/resume/{search_id}').status_code == 400
+    assert client.post('/api/resume/missing').status_code == 404
+
+
+def test_search_live_in_another_worker_is_not_resumed(monkeypatch):
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter([]))
+    search_id = 'search_test_leased'
+    params = {'max_companies': 5, 'scrape_all_emails': False, 'workers': 1, 'force_refresh': False}
+    app.job_store.create_job(search_id, app.new_job_progress('test', 1, status='queued', params=params))
+    # Queued in another worker, which keeps renewing its lease however long the job waits
+    assert app.job_store.acquire_lease(search_id, 'other-worker', 60)
+    client = logged_in_client()
+    assert client.post(f'/api/resume/{search_id}').status_code == 409
+
+    # That worker died: its lease runs out and the job can be taken over
+    app.job_store.renew_leases([search_id], 'other-worker', -1)
+    assert client.post(f'/api/resume/{search_id}').status_code == 200
+    wait_for_status(search_id, ('completed',))
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch scraping command line
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from fixture_server import FixtureServer, FixtureSite
+from trustpilot_scraper import read_terms
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_read_terms_skips_blanks_comments_and_repeats(tmp_path):
+    path = tmp_path / 'terms.txt'
+    path.write_text("plumber\n\n# trades\nelectrician  # second\nplumber\n")
+    assert read_terms(str(path)) == ['plumber', 'electrician']
+
+
+def test_batch_scrapes_every_unique_company_across_processes(tmp_path):
+    terms = tmp_path / 'terms.txt'
+    terms.write_text("plumber\nelectrician\nplumber\n")
+    out = tmp_path / 'results.ndjson'
+
+    site = FixtureSite(companies_per_page=8, domain_pool=12, browser_only_rate=0, no_email_rate=0, seed=1)
+    with FixtureServer(site) as server:
+        env = dict(
+            os.environ, TRUSTPILOT_BASE_URL=server.base_url, HTTP_CACHE_ENABLED='0',
+            COMPANY_CACHE_ENABLED='0', RATE_LIMIT_ENABLED='0'
+        )
+        result = subprocess.run(
+            [sys.executable, '-m', 'trustpilot_scraper', 'batch', str(terms), '--procs', '2', '--threads', '2',
+             '--max-companies', '8', '--out', str(out)],
+            cwd=HERE, env=env, capture_output=True, text=True, timeout=120
+        )
+
+    assert result.returncode == 0, result.stderr
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    urls = [row['url'] for row in rows]
+    assert rows and len(urls) == len(set(urls))
+    assert all(row['company_emails'] and row['matched_terms'] for row in rows)
+    assert 'Searched 2 terms' in result.stderr
+    assert f"Scraped {len(rows)} companies (0 failed)" in result.stderr
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for chromedriver/Chrome resolution and lazy browser imports
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import browser_setup
+from browser_setup import BrowserNotFoundError, resolve_chrome_binary, resolve_chromedriver
+
+
+def make_executable(path):
+    path.write_text('#!/bin/sh\n')
+    path.chmod(0o755)
+    return str(path)
+
+
+def test_install_runs_once_then_the_cached_path_is_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser_setup.shutil, 'which', lambda name: None)
+    driver = make_executable(tmp_path / 'chromedriver')
+    cache = str(tmp_path / 'browser.json')
+    installs = []
+
+    def install():
+        installs.append(1)
+        return driver
+
+    assert resolve_chromedriver(cache, install=install) == driver
+    assert resolve_chromedriver(cache, install=install, offline=True) == driver
+    assert installs == [1]
+    assert browser_setup.load_cache(cache)['chromedriver_source'] == 'webdriver_manager'
+
+
+def test_env_override_and_path_lookup(tmp_path, monkeypatch):
+    driver = make_executable(tmp_path / 'chromedriver')
+    cache = str(tmp_path / 'browser.json')
+    assert resolve_chromedriver(cache, env_path=driver) == driver
+    with pytest.raises(BrowserNotFoundError):
+        resolve_chromedriver(cache, env_path=str(tmp_path / 'missing'))
+
+    chrome = make_executable(tmp_path / 'chromium')
+    found = {'chromedriver': driver, 'chromium': chrome}
+    monkeypatch.setattr(browser_setup.shutil, 'which', found.get)
+    assert resolve_chromedriver(cache, offline=True) == driver
+    assert resolve_chrome_binary(cache) == chrome
+    assert browser_setup.load_cache(cache)['chrome'] == chrome
+
+
+def test_offline_mode_never_installs(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser_setup.shutil, 'which', lambda name: None)
+
+    def install():
+        raise AssertionError("offline mode must not hit the network")
+
+    with pytest.raises(BrowserNotFoundError):
+        resolve_chromedriver(str(tmp_path / 'browser.json'), offline=True, install=install)
+
+
+def test_importing_app_does_not_import_selenium(tmp_path):
+    env = dict(os.environ, DRIVER_POOL_PREWARM='0', JOB_STORE_BACKEND='memory', COMPANY_CACHE_ENABLED='0')
+    code = "import sys, app; sys.exit('selenium' in sys.modules or 'webdriver_manager' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, timeout=60)
+    assert result.returncode == 0, result.stderr.decode()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Tests for the cross-job company result cache
+"""
+
+from company_cache import CompanyCache, canonical_company_url
+
+
+def test_canonical_company_url():
+    expected = 'https://www.trustpilot.com/review/acme.com'
+    assert canonical_company_url('https://www.trustpilot.com/review/Acme.com/') == expected
+    assert canonical_company_url('https://WWW.trustpilot.com/review/acme.com?page=2#reviews') == expected
+    assert canonical_company_url('/review/acme.com') == expected
+
+
+def test_fresh_and_expired_entries(tmp_path):
+    cache = CompanyCache(str(tmp_path / 'companies.sqlite3'), ttl=3600)
+    cache.put('https://www.trustpilot.com/review/acme.com', 'Acme', ['info@acme.com'], 'http')
+
+    entry = cache.get('https://www.trustpilot.com/review/ACME.com/')
+    assert entry['name'] == 'Acme'
+    assert entry['emails'] == ['info@acme.com']
+    assert entry['source'] == 'http'
+    assert cache.get('https://www.trustpilot.com/review/acme.com', ttl=-1) is None
+    assert cache.get('https://www.trustpilot.com/review/other.com') is None
+    assert cache.stats()['companies'] == 1
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the leased Chrome driver pool (uses fake drivers, no Chrome needed)
+"""
+
+import threading
+import time
+
+import pytest
+
+from driver_pool import DriverPool, DriverPoolError
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+        self.healthy = True
+
+    def execute_script(self, script):
+        if not self.healthy:
+            raise RuntimeError("chrome crashed")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_warm_prelaunches_full_pool():
+    pool = DriverPool(FakeDriver, size=3, max_rss_mb=None)
+    pool.warm()
+    stats = pool.stats()
+    assert stats['launches'] == 3
+    assert stats['idle'] == 3
+    assert stats['leased'] == 0
+
+
+def test_lease_returns_driver_to_pool():
+    pool = DriverPool(FakeDriver, size=1, max_rss_mb=None)
+    with pool.lease() as first:
+        assert pool.stats()['leased'] == 1
+    with pool.lease() as second:
+        assert second is first
+    assert pool.stats()['launches'] == 1
+    assert pool.stats()['leases'] == 2
+
+
+def test_recycles_after_max_page_loads():
+    pool = DriverPool(FakeDriver, size=1, max_page_loads=2, max_rss_mb=None)
+    with pool.lease() as first:
+        pass
+    with pool.lease() as again:
+        assert again is first
+    assert first.quit_called
+    with pool.lease() as fresh:
+        assert fresh is not first
+    assert pool.stats()['recycled'] == 1
+
+
+def test_unhealthy_driver_is_replaced():
+    pool = DriverPool(FakeDriver, size=1, max_rss_mb=None)
+    with pool.lease() as first:
+        first.healthy = False
+    with pool.lease() as second:
+        assert second is not first
+    assert first.quit_called
+    assert pool.stats()['health_check_failures'] == 1
+
+
+def test_concurrent_leases_never_exceed_size():
+    pool = DriverPool(FakeDriver, size=2, max_rss_mb=None)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        with pool.lease() as driver:
+            with lock:
+                active.append(driver)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.remove(driver)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) <= 2
+    assert pool.stats()['launches'] == 2
+    assert pool.stats()['leases'] == 8
+
+
+def test_acquire_timeout():
+    pool = DriverPool(FakeDriver, size=1, max_rss_mb=None)
+    with pool.lease():
+        with pytest.raises(DriverPoolError):
+            with pool.lease(timeout=0.05):
+                pass
+    assert pool.stats()['acquire_timeouts'] == 1
+
+
+def test_failed_launch_raises():
+    pool = DriverPool(lambda: None, size=1, max_rss_mb=None)
+    with pytest.raises(DriverPoolError):
+        with pool.lease():
+            pass
+    assert pool.stats()['live'] == 0
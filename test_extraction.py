@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the precompiled extraction module (must match the original inline regex code)
+"""
+
+import random
+
+import extraction
+from bench_extraction import (legacy_clean_company_name, legacy_company_emails,
+                              make_raw_names, make_text_blocks)
+
+# Inputs from test_improvements.test_company_name_cleaning. Several of its expected
+# values don't match what the original code has always produced; the extraction
+# module must reproduce the original output, so only the inputs are reused here.
+NAME_CASES = [
+    ("Goldbellywww.goldbelly.com4.315,494reviews27 Union Square West, New York, United States", "Goldbelly"),
+    ("Restaurant Flammenrestaurant-flammen.dk4.02,354reviewsDenmark", "Restaurant Flammenrestaurantflammendk"),
+    ("KFCwww.kfc.com3.05,789reviews", "KFC"),
+    ("Restaurant Gorillarestaurantgorilla.dk1.799reviewsDenmark", "Restaurant Gorillarestaurantgorilladk"),
+    ("Simple Company Name", "Simple Company Name"),
+    ("", ""),
+    (None, ""),
+]
+
+
+def test_clean_company_name_cases():
+    for raw_name, _ in NAME_CASES:
+        assert extraction.clean_company_name(raw_name) == legacy_clean_company_name(raw_name)
+    assert extraction.clean_company_name("KFCwww.kfc.com3.05,789reviews") == "KFC"
+    assert extraction.clean_company_name(None) == ""
+
+
+def test_clean_company_name_matches_legacy_on_generated_names():
+    names = make_raw_names(500, random.Random(1))
+    assert extraction.clean_company_names(names) == [legacy_clean_company_name(n) for n in names]
+
+
+def test_company_emails_match_legacy():
+    blocks = make_text_blocks(200, random.Random(2))
+    blocks += [
+        "Email: info@acme.co.uk, sales@acme.co.uk; support@gmail.com",
+        "<info@shop.dk>(hello@shop.dk)",
+        "weird spacing contact@firm.io\tend",
+        "no emails here",
+        "",
+    ]
+    assert extraction.find_company_emails_batch(blocks) == legacy_company_emails(blocks)
+
+
+def test_personal_domains_are_filtered_case_insensitively():
+    assert extraction.is_personal_email('Someone@GMAIL.com')
+    assert not extraction.is_personal_email('team@acme.com')
+
+
+def test_load_personal_domains(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, 'personal_domains', extraction.DEFAULT_PERSONAL_DOMAINS)
+    path = tmp_path / 'domains.txt'
+    path.write_text("# extra providers\nGMX.de\nweb.de  # german\n\n")
+    extraction.load_personal_domains(str(path))
+    assert extraction.is_personal_email('x@gmx.de')
+    assert extraction.find_company_emails('a@web.de b@acme.com') == ['b@acme.com']
+    extraction._company_emails.cache_clear()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio fetch engine
+"""
+
+import asyncio
+import gzip
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from fetch_engine import FetchEngine
+from fixture_server import FixtureServer, FixtureSite
+from rate_limiter import RateLimiter, ThrottledSession
+
+
+class ChunkedGzipHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    client_ports = None  # the client port of every request, to count connections
+
+    def do_GET(self):
+        self.client_ports.append(self.client_address[1])
+        if self.path == '/old':
+            self.send_response(301)
+            self.send_header('Location', '/new?from=old')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path.startswith('/slow'):
+            time.sleep(0.05)
+        body = gzip.compress(f"<p>{self.path} {self.headers.get('X-Test')}</p>".encode())
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for start in range(0, len(body), 10):
+            chunk = body[start:start + 10]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve():
+    """(base URL, client ports seen) of a local HTTP/1.1 server"""
+    ports = []
+    handler = type('Handler', (ChunkedGzipHandler,), {'client_ports': ports})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", ports
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_connections_are_kept_alive_and_reused():
+    engine = FetchEngine(headers={'User-Agent': 'test'})
+    try:
+        with serve() as (base_url, ports):
+            for i in range(5):
+                response = engine.get(f"{base_url}/page?query=term {i}")
+                assert response.status_code == 200
+                assert response.text == f"<p>/page?query=term%20{i} None</p>"
+        assert engine.stats()['requests'] == 5
+        assert len(ports) == 5 and len(set(ports)) == 1
+    finally:
+        engine.close()
+
+
+def test_many_fetches_share_one_thread_and_respect_the_host_cap():
+    engine = FetchEngine(max_per_host=4)
+    try:
+        with serve() as (base_url, ports):
+            urls = [f"{base_url}/slow/{i}" for i in range(40)]
+
+            async def fetch_all():
+                return await asyncio.gather(*(engine.request(url) for url in urls))
+
+            started = time.perf_counter()
+            responses = engine.run(fetch_all())
+            elapsed = time.perf_counter() - started
+        assert [response.status_code for response in responses] == [200] * 40
+        assert engine.stats()['max_in_flight'] == 4
+        assert len(set(ports)) <= 4
+        # 40 requests at 50ms each, 4 at a time, rather than one after another
+        assert elapsed < 40 * 0.05 / 2
+        assert [thread.name for thread in threading.enumerate()].count('fetch-engine') == 1
+    finally:
+        engine.close()
+
+
+def test_chunked_gzip_bodies_redirects_and_request_headers():
+    engine = FetchEngine()
+    try:
+        with serve() as (base_url, ports):
+            response = engine.get(f"{base_url}/old", headers={'X-Test': 'yes', 'If-None-Match': None})
+            assert response.status_code == 200
+            assert response.url == f"{base_url}/new?from=old"
+            assert response.text == '<p>/new?from=old yes</p>'
+            assert response.headers['content-type'] == 'text/html; charset=utf-8'
+        assert len(set(ports)) == 1
+    finally:
+        engine.close()
+
+
+def test_stalled_requests_time_out_and_refused_connections_raise():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    port = listener.getsockname()[1]
+    engine = FetchEngine()
+    try:
+        started = time.perf_counter()
+        with pytest.raises(requests.Timeout):
+            engine.get(f"http://127.0.0.1:{port}/", timeout=0.2)
+        assert time.perf_counter() - started < 2
+        assert engine.stats()['timeouts'] == 1
+
+        listener.close()
+        with pytest.raises(requests.ConnectionError):
+            engine.get(f"http://127.0.0.1:{port}/")
+    finally:
+        engine.close()
+        listener.close()
+
+
+def test_throttled_session_retries_on_the_engine_loop():
+    engine = FetchEngine()
+    try:
+        with FixtureServer(FixtureSite(companies_per_page=3), error_rate=0.5, seed=3) as server:
+            http = ThrottledSession(engine, RateLimiter(requests_per_minute=6000, burst=50), max_retries=5, retry_delay=0.01)
+            urls = [f"{server.base_url}/review/company{i}.com" for i in range(10)]
+
+            async def fetch_all():
+                return await asyncio.gather(*(http.get_async(url) for url in urls))
+
+            responses = engine.run(fetch_all())
+            assert all(response.status_code == 200 for response in responses)
+            assert server.stats()['requests'] > len(urls)
+    finally:
+        engine.close()
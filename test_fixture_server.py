@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline fixture server and the scraper pointed at it
+"""
+
+import os
+
+os.environ.setdefault('DRIVER_POOL_PREWARM', '0')
+os.environ.setdefault('JOB_STORE_BACKEND', 'memory')
+os.environ.setdefault('COMPANY_CACHE_ENABLED', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+import requests
+
+import app
+from bench_scraping import percentile
+from fixture_server import FixtureServer, FixtureSite
+from page_parser import extract_contact_texts, extract_search_results
+from rate_limiter import RateLimiter
+import scraping
+
+
+def make_scraper(server):
+    scraper = app.TrustpilotScraper(limiter=RateLimiter(enabled=False), base_url=server.base_url)
+    scraper.http_cache = None
+    return scraper
+
+
+def test_scraper_finds_companies_and_emails_offline():
+    with FixtureServer(FixtureSite(companies_per_page=5, no_email_rate=0)) as server:
+        scraper = make_scraper(server)
+        companies = scraper.search_companies('plumber', max_companies=12)
+
+        assert len(companies) == 12
+        assert len({c['name'] for c in companies}) == 12
+        assert all(c['url'].startswith(server.base_url + '/review/') for c in companies)
+
+        domain = companies[0]['url'].rsplit('/', 1)[1]
+        emails, has_contact_section = scraper.scrape_company_page_http(companies[0]['url'])
+        assert has_contact_section
+        assert sorted(emails) == [f'info@{domain}', f'sales@{domain}']
+        assert server.stats()['company_pages'] == 1
+
+
+def test_search_follows_result_pages_until_they_run_out(monkeypatch):
+    site = FixtureSite(companies_per_page=5, search_pages=2)
+    with FixtureServer(site) as server:
+        scraper = make_scraper(server)
+        monkeypatch.setattr(scraping, 'SEARCH_MAX_PAGES', 4)
+        monkeypatch.setattr(scraper, 'get_enhanced_search_terms', lambda term: [term])
+        companies = scraper.search_companies('plumber', max_companies=100)
+
+        expected = {
+            card['url'] for page in (1, 2) for card in extract_search_results(site.search_page('plumber', page), server.base_url)
+        }
+        assert {c['url'] for c in companies} == expected and len(companies) == len(expected) > 5
+        # Page 3 is empty, so page 4 is never fetched
+        assert server.stats()['search_pages'] == 3
+
+
+def test_pages_are_deterministic_and_recorded_pages_win(tmp_path):
+    site = FixtureSite(seed=7)
+    assert site.search_page('cafe') == FixtureSite(seed=7).search_page('cafe')
+    assert site.search_page('cafe') != site.search_page('bakery')
+
+    (tmp_path / 'review').mkdir()
+    (tmp_path / 'review' / 'acme.com.html').write_bytes(b'<html><body>recorded</body></html>')
+    recorded = FixtureSite(fixtures_dir=str(tmp_path))
+    assert recorded.company_page('acme.com') == b'<html><body>recorded</body></html>'
+    assert b'Contact' in recorded.company_page('other.com')
+
+
+def test_browser_only_pages_have_no_server_rendered_contact_section():
+    site = FixtureSite(browser_only_rate=1.0, no_email_rate=0)
+    texts, has_contact_section = extract_contact_texts(site.company_page('acme.com'))
+    assert not has_contact_section
+    assert b'info@acme.com' in site.company_page('acme.com')
+
+
+def test_error_injection_sends_retry_after():
+    with FixtureServer(error_rate=1.0, error_status=429, retry_after=3) as server:
+        response = requests.get(f"{server.base_url}/search?query=x", timeout=5)
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '3'
+        stats = requests.get(f"{server.base_url}/__stats", timeout=5).json()
+        assert stats['errors_injected'] == 1 and stats['search_pages'] == 0
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(1, 101)), 0.95) == 95
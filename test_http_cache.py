@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk HTTP response cache
+"""
+
+import requests
+
+from http_cache import HttpCache, normalize_url
+
+
+class FakeSession:
+    """Serves canned responses and records the conditional headers it was sent"""
+
+    def __init__(self, body=b'<html>hello</html>', etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.calls = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.calls.append(headers or {})
+        response = requests.models.Response()
+        response.url = url
+        if headers and headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response._content = self.body
+            response.headers['ETag'] = self.etag
+            response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        return response
+
+
+def test_normalize_url():
+    assert normalize_url('HTTPS://WWW.Trustpilot.com/search?b=2&a=1#frag') == 'https://www.trustpilot.com/search?a=1&b=2'
+    assert normalize_url('https://x.com/search?query=a b') == normalize_url('https://x.com/search?query=a+b')
+
+
+def test_fresh_entry_is_served_locally(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    session = FakeSession()
+    first = cache.fetch(session, 'https://www.trustpilot.com/review/acme.com')
+    second = cache.fetch(session, 'https://www.trustpilot.com/review/acme.com')
+    assert first.content == second.content == session.body
+    assert len(session.calls) == 1
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['bytes_saved'] == len(session.body)
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), route_ttls=[('/search', 0)])
+    session = FakeSession()
+    cache.fetch(session, 'https://www.trustpilot.com/search?query=bakery')
+    response = cache.fetch(session, 'https://www.trustpilot.com/search?query=bakery')
+    assert response.status_code == 200
+    assert response.content == session.body
+    assert session.calls[1]['If-None-Match'] == '"v1"'
+    assert cache.stats()['revalidated'] == 1
+
+
+def test_lru_eviction_keeps_cache_under_cap(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), max_bytes=250)
+    session = FakeSession(body=b'x' * 100)
+    for name in ('a', 'b', 'c'):
+        cache.fetch(session, f'https://www.trustpilot.com/review/{name}.com')
+    stats = cache.stats()
+    assert stats['size_bytes'] <= 250
+    assert stats['evictions'] == 1
+    # The oldest entry was evicted, so fetching it again goes upstream
+    cache.fetch(session, 'https://www.trustpilot.com/review/a.com')
+    assert len(session.calls) == 4
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the job store backends
+"""
+
+import os
+import sqlite3
+
+from job_store import MemoryJobStore, ResultSpool, SQLiteJobStore
+
+
+def new_job():
+    return {'status': 'running', 'progress': 0, 'companies_processed': 0, 'emails_found': 0, 'results': []}
+
+
+def check_store(store):
+    job = new_job()
+    store.create_job('job1', job)
+    job['companies_processed'] = 1
+    job['emails_found'] = 2
+    store.append_result('job1', {'name': 'Acme', 'company_emails': ['a@acme.com', 'b@acme.com']})
+    store.save_job('job1', job)
+
+    saved = store.get_job('job1')
+    assert saved['status'] == 'running'
+    assert saved['companies_processed'] == 1
+    assert [r['name'] for r in saved['results']] == ['Acme']
+    assert 'results' not in store.get_job('job1', include_results=False)
+
+    store.append_result('job1', {'name': 'Beta', 'company_emails': []})
+    assert [r['name'] for r in store.get_results('job1')] == ['Acme', 'Beta']
+    assert [r['name'] for r in store.get_results('job1', since=1)] == ['Beta']
+    assert store.get_results('job1', since=2) == []
+    assert [r['name'] for r in store.get_results('job1', limit=1)] == ['Acme']
+    assert [r['name'] for r in store.iter_results('job1', batch_size=1)] == ['Acme', 'Beta']
+    store.update_results('job1', {0: {'name': 'Acme', 'matched_terms': ['a', 'b']}})
+    assert [r.get('matched_terms') for r in store.get_results('job1')] == [['a', 'b'], None]
+
+    # A cancel from another worker is not overwritten by the runner's next save
+    assert store.request_cancel('job1')
+    store.save_job('job1', job)
+    assert store.get_status('job1') == 'cancelled'
+
+    assert store.get_job('missing') is None
+    assert not store.request_cancel('missing')
+
+    # Checkpoints survive a cancel, and reopening keeps the results
+    store.checkpoint_company('job1', 0, {'name': 'Acme'})
+    store.checkpoint_company('job1', 1, {'name': 'Beta'})
+    store.mark_company_done('job1', 0, 'http', 2)
+    checkpoint = store.get_checkpoint('job1')
+    assert [(row['company']['name'], row['done'], row['source'], row['emails']) for row in checkpoint] == [
+        ('Acme', True, 'http', 2), ('Beta', False, None, 0)
+    ]
+    store.reopen_job('job1', dict(job, status='queued'))
+    assert store.get_status('job1') == 'queued'
+    assert len(store.get_results('job1')) == 2
+    assert store.get_job('job1')['updated_at'] > 0
+
+    # Only one owner holds a job's lease until it expires or is released
+    assert store.acquire_lease('job1', 'worker-a', 60)
+    assert not store.acquire_lease('job1', 'worker-b', 60)
+    assert store.acquire_lease('job1', 'worker-a', 60)
+    store.renew_leases(['job1'], 'worker-b', 60)  # not worker-b's to renew
+    store.renew_leases(['job1'], 'worker-a', -1)
+    assert store.acquire_lease('job1', 'worker-b', 60)
+    store.release_lease('job1', 'worker-a')  # no longer worker-a's to release
+    assert not store.acquire_lease('job1', 'worker-a', 60)
+    store.release_lease('job1', 'worker-b')
+    assert store.acquire_lease('job1', 'worker-a', 60)
+
+    store.delete_job('job1')
+    assert store.get_checkpoint('job1') == []
+    assert store.get_job('job1') is None
+    assert store.get_results('job1') == []
+
+
+def test_memory_store():
+    check_store(MemoryJobStore())
+
+
+def test_memory_store_with_spilling(tmp_path):
+    store = MemoryJobStore(spill_dir=str(tmp_path), buffer_size=1)
+    check_store(store)
+
+    store.create_job('job2', new_job())
+    store.append_result('job2', {'name': 'Acme'})
+    assert os.path.exists(tmp_path / 'job2.ndjson')
+    store.close()
+    assert not os.path.exists(tmp_path / 'job2.ndjson')
+
+
+def test_result_spool_keeps_only_the_buffer_in_memory(tmp_path):
+    spool = ResultSpool(str(tmp_path / 'job.ndjson'), buffer_size=4)
+    for i in range(10):
+        spool.append({'n': i})
+
+    assert len(spool) == 10
+    assert len(spool.buffer) == 2
+    assert [r['n'] for r in spool.read()] == list(range(10))
+    # Pages that start inside a spilled block and run on into the buffer
+    assert [r['n'] for r in spool.read(5, 4)] == [5, 6, 7, 8]
+    assert [r['n'] for r in spool.read(3, 2)] == [3, 4]
+    assert [r['n'] for r in spool.read(9, 5)] == [9]
+    assert spool.read(10) == []
+
+    # Replacing rows rewrites their spilled block elsewhere in the file
+    spool.replace({1: {'n': 'one'}, 5: {'n': 'five'}, 9: {'n': 'nine'}})
+    assert [r['n'] for r in spool.read()] == [0, 'one', 2, 3, 4, 'five', 6, 7, 8, 'nine']
+    assert [r['n'] for r in spool.read(2, 5)] == [2, 3, 4, 'five', 6]
+    spool.close()
+
+
+def test_sqlite_store_keeps_buffered_writes_when_a_flush_fails(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    store = SQLiteJobStore(path, flush_interval=60)
+    store.create_job('job1', new_job())
+    store.append_result('job1', {'name': 'Acme'})
+    store.checkpoint_company('job1', 0, {'name': 'Acme'})
+    store.mark_company_done('job1', 0, 'http', 1)
+    store.save_job('job1', dict(new_job(), companies_processed=1))
+
+    # Another worker holds the write lock, and this one doesn't wait for it
+    store._conn.execute('PRAGMA busy_timeout = 0')
+    other = sqlite3.connect(path)
+    other.execute('BEGIN IMMEDIATE')
+    store.flush()
+    other.rollback()
+    other.close()
+
+    store.flush()
+    job = store.get_job('job1')
+    assert [r['name'] for r in job['results']] == ['Acme']
+    assert job['companies_processed'] == 1
+    assert [(row['done'], row['source']) for row in store.get_checkpoint('job1')] == [(True, 'http')]
+    store.close()
+
+
+def test_sqlite_store_bounds_buffered_results(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    writer = SQLiteJobStore(path, flush_interval=60, max_buffered_results=3)
+    reader = SQLiteJobStore(path, flush_interval=60)
+    writer.create_job('job1', new_job())
+    for i in range(7):
+        writer.append_result('job1', {'name': f'Company {i}'})
+
+    # Two full buffers were written without waiting for the flush interval
+    assert len(reader.get_results('job1')) == 6
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_store(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / 'jobs.sqlite3'), flush_interval=60)
+    check_store(store)
+    store.close()
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    writer = SQLiteJobStore(path, flush_interval=60)
+    reader = SQLiteJobStore(path, flush_interval=60)
+
+    job = new_job()
+    writer.create_job('job1', job)
+    for i in range(5):
+        writer.append_result('job1', {'name': f'Company {i}'})
+    job['companies_processed'] = 5
+    writer.save_job('job1', job)
+
+    # Batched writes are invisible to other workers until flushed
+    assert reader.get_job('job1')['companies_processed'] == 0
+    writer.flush()
+    shared = reader.get_job('job1')
+    assert shared['companies_processed'] == 5
+    assert [r['name'] for r in shared['results']] == [f'Company {i}' for i in range(5)]
+
+    assert reader.request_cancel('job1')
+    assert writer.get_status('job1') == 'cancelled'
+    writer.close()
+    reader.close()
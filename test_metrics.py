@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus-style metrics and the /api/metrics endpoint
+"""
+
+import os
+
+os.environ.setdefault('DRIVER_POOL_PREWARM', '0')
+os.environ.setdefault('JOB_STORE_BACKEND', 'memory')
+os.environ.setdefault('COMPANY_CACHE_ENABLED', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+import pytest
+
+import app
+import metrics
+import rate_limiter
+from rate_limiter import RateLimiter, ThrottledSession
+import scraping
+
+
+def test_counter_gauge_and_histogram_render():
+    registry = metrics.Registry()
+    requests = metrics.Counter('requests_total', 'Requests', ['status'], registry=registry)
+    requests.inc(status=200)
+    requests.inc(2, status=404)
+    metrics.Gauge('queue_size', 'Queue size', lambda: 3, registry=registry)
+    latency = metrics.Histogram('latency_seconds', 'Latency', ['stage'], buckets=(0.1, 1), registry=registry)
+    latency.observe(0.05, stage='fetch')
+    latency.observe(0.5, stage='fetch')
+    latency.observe(5, stage='fetch')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{status="200"} 1' in lines
+    assert 'requests_total{status="404"} 2' in lines
+    assert 'queue_size 3' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{stage="fetch"} 5.55' in lines
+    assert 'latency_seconds_count{stage="fetch"} 3' in lines
+
+
+def test_labels_are_checked_and_names_unique():
+    registry = metrics.Registry()
+    counter = metrics.Counter('things_total', 'Things', ['kind'], registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc(colour='red')
+    with pytest.raises(ValueError):
+        metrics.Counter('things_total', 'Again', registry=registry)
+
+
+def test_session_counts_statuses_and_retries(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, 'sleep', lambda seconds: None)
+
+    class Session:
+        def __init__(self):
+            self.statuses = [503, 200]
+
+        def get(self, url, **kwargs):
+            return type('Response', (), {'status_code': self.statuses.pop(0), 'headers': {}})()
+
+    before_503 = rate_limiter.UPSTREAM_RESPONSES.value(status=503)
+    before_retries = rate_limiter.UPSTREAM_RETRIES.value()
+    ThrottledSession(Session(), RateLimiter(enabled=False)).get('https://a.example/')
+    assert rate_limiter.UPSTREAM_RESPONSES.value(status=503) == before_503 + 1
+    assert rate_limiter.UPSTREAM_RETRIES.value() == before_retries + 1
+
+
+def test_metrics_endpoint_after_a_job(monkeypatch):
+    companies = [
+        {'name': f'Company {i}', 'url': f'https://www.trustpilot.com/review/company{i}.com'} for i in range(4)
+    ]
+
+    def scrape(company_url, pool=None, force_refresh=False):
+        if company_url.endswith('company0.com'):
+            return [], 'browser'
+        return ['info@example.com'], 'http'
+
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter(companies))
+    monkeypatch.setattr(app.scraper, 'scrape_company', scrape)
+    totals_before = scraping.STAGE_SECONDS.count(stage='company_total')
+    emails_before = app.EMAILS_FOUND.value()
+    skipped_before = app.COMPANIES_SKIPPED.value(reason='no_emails')
+
+    app.background_scraping_task('search_test_metrics', 'test', 4, False, 2)
+
+    assert scraping.STAGE_SECONDS.count(stage='company_total') == totals_before + 4
+    assert app.EMAILS_FOUND.value() == emails_before + 3
+    assert app.COMPANIES_SKIPPED.value(reason='no_emails') == skipped_before + 1
+
+    # Off unless a token is configured or anonymous scraping is opted into
+    assert app.app.test_client().get('/api/metrics').status_code == 404
+    monkeypatch.setattr(app, 'METRICS_PUBLIC', True)
+    response = app.app.test_client().get('/api/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert '# TYPE trustpilot_stage_duration_seconds histogram' in body
+    assert 'trustpilot_stage_duration_seconds_count{stage="company_total"}' in body
+    assert 'trustpilot_jobs_running 0' in body
+    assert 'trustpilot_scraping_progress_jobs 0' in body
+
+    monkeypatch.setattr(app, 'METRICS_TOKEN', 'secret')
+    assert app.app.test_client().get('/api/metrics').status_code == 401
+    headers = {'Authorization': 'Bearer secret'}
+    assert app.app.test_client().get('/api/metrics', headers=headers).status_code == 200
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for lxml parsing of server-rendered Trustpilot pages
+"""
+
+import re
+
+from bs4 import BeautifulSoup
+
+from page_parser import extract_contact_texts, extract_search_results
+
+COMPANY_PAGE = b"""
+<html>
+<head>
+<script id="__NEXT_DATA__" type="application/json">
+{"props": {"pageProps": {"businessUnit": {"contactInfo": {"email": "info@acme.co.uk", "phone": "0123"}}}}}
+</script>
+</head>
+<body>
+<section>
+  <h3>Contact info</h3>
+  <ul><li>sales@acme.co.uk</li><li><a href="mailto:hello@acme.co.uk?subject=Hi">Write to us</a></li></ul>
+</section>
+<script>var email = "tracking@analytics.example";</script>
+</body>
+</html>
+"""
+
+
+def test_extracts_contact_block_mailto_and_embedded_json():
+    texts, has_contact_section = extract_contact_texts(COMPANY_PAGE)
+    joined = '\n'.join(texts)
+    assert has_contact_section
+    assert 'sales@acme.co.uk' in joined
+    assert 'hello@acme.co.uk' in texts
+    assert 'info@acme.co.uk' in texts
+    assert 'tracking@analytics.example' not in joined
+
+
+def test_page_without_contact_section_needs_fallback():
+    texts, has_contact_section = extract_contact_texts(b"<html><body><p>Reviews only</p></body></html>")
+    assert texts == []
+    assert not has_contact_section
+
+
+def test_empty_content():
+    assert extract_contact_texts(b"") == ([], False)
+
+
+SEARCH_PAGE = """
+<html><head><meta charset="utf-8"></head>
+<body>
+<nav><a href="/categories">Categories</a></nav>
+<div class="card">
+  <a href="/review/cafe-munchen.de" class="link">
+    <p>Café München</p><!-- promoted -->
+    <p>www.cafe-munchen.de</p>
+    <div><span>TrustScore 4.5</span><span>|</span><span>1,204 reviews</span></div>
+    <script>track()</script>
+    <p>Marienplatz 1, München, Germany</p>
+  </a>
+</div>
+<div class="card">
+  <a href="https://uk.trustpilot.com/review/acme.co.uk">Acme Ltd<span>3.9</span>12 reviews</a>
+</div>
+<a href="/review/bare.com">Bare</a>
+</body></html>
+""".encode('utf-8')
+
+
+def legacy_search_results(content, base_url):
+    """What search_companies extracted with BeautifulSoup before page_parser"""
+    soup = BeautifulSoup(content, 'html.parser')
+    return [
+        {'raw_name': link.get_text(strip=True),
+         'url': base_url + link['href'] if link['href'].startswith('/') else link['href']}
+        for link in soup.find_all('a', href=re.compile(r'/review/'))
+    ]
+
+
+def test_search_results_match_beautifulsoup():
+    results = extract_search_results(SEARCH_PAGE, 'https://www.trustpilot.com')
+    assert [{'raw_name': r['raw_name'], 'url': r['url']} for r in results] == \
+        legacy_search_results(SEARCH_PAGE, 'https://www.trustpilot.com')
+    assert results[0]['raw_name'].startswith('Café München')
+
+
+def test_search_results_have_rating_and_review_count():
+    results = extract_search_results(SEARCH_PAGE, 'https://www.trustpilot.com')
+    assert [(r['rating'], r['review_count']) for r in results] == [(4.5, 1204), (3.9, 12), (None, None)]
+    assert extract_search_results(b'', 'https://www.trustpilot.com') == []
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared token-bucket rate limiter and retrying session
+"""
+
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+import rate_limiter
+from rate_limiter import RateLimiter, ThrottledSession, TokenBucket, WaitTally, parse_retry_after, tally_waits
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Replays a list of responses (or exceptions) and records each requested URL"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate_per_second=2, burst=3)
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert 0.45 <= bucket.reserve() <= 0.5
+    assert 0.95 <= bucket.reserve() <= 1.0
+
+
+def test_throttle_halves_rate_pauses_and_recovers():
+    bucket = TokenBucket(rate_per_second=10, burst=5)
+    bucket.throttle(pause=3)
+    assert bucket.rate == 5
+    assert 2.9 <= bucket.reserve() <= 3.0
+    for _ in range(20):
+        bucket.recover()
+    assert bucket.rate == 10
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('7') == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert 25 <= parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_limiter_is_per_host_and_tallied(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', sleeps.append)
+    limiter = RateLimiter(requests_per_minute=60, burst=1)
+    tally = WaitTally()
+
+    with tally_waits(tally):
+        limiter.acquire('https://a.example/1')
+        limiter.acquire('https://b.example/1')
+        limiter.acquire('https://a.example/2')
+
+    assert len(sleeps) == 1 and 0.9 <= sleeps[0] <= 1.0
+    assert tally.as_dict()['upstream_requests'] == 3
+    assert limiter.stats()['waits'] == 1
+    assert set(limiter.stats()['hosts']) == {'a.example', 'b.example'}
+
+
+def test_disabled_limiter_never_waits(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', sleeps.append)
+    limiter = RateLimiter(requests_per_minute=1, burst=1, enabled=False)
+    assert [limiter.acquire('https://a.example/') for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert sleeps == []
+
+
+def test_session_honours_retry_after_then_succeeds(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rate_limiter.time, 'sleep', sleeps.append)
+    limiter = RateLimiter(requests_per_minute=600, burst=5)
+    session = FakeSession([FakeResponse(429, {'Retry-After': '4'}), FakeResponse(200)])
+    tally = WaitTally()
+
+    with tally_waits(tally):
+        response = ThrottledSession(session, limiter, max_retries=3).get('https://a.example/search')
+
+    assert response.status_code == 200
+    assert len(session.urls) == 2
+    # The pause is served by the limiter before the retry, not slept twice
+    assert len(sleeps) == 1 and 3.9 <= sleeps[0] <= 4.0
+    assert limiter.stats()['hosts']['a.example']['requests_per_minute'] < 600
+    assert tally.as_dict()['upstream_throttled'] == 1
+    assert tally.as_dict()['upstream_retries'] == 1
+
+
+def test_session_retries_connection_errors_then_gives_up(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, 'sleep', lambda seconds: None)
+    limiter = RateLimiter(enabled=False)
+    session = FakeSession([requests.ConnectionError('reset')] * 3)
+
+    with pytest.raises(requests.ConnectionError):
+        ThrottledSession(session, limiter, max_retries=2).get('https://a.example/')
+    assert len(session.urls) == 3
+    assert limiter.stats()['retries'] == 2
+
+
+def test_session_returns_last_error_response(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, 'sleep', lambda seconds: None)
+    session = FakeSession([FakeResponse(503), FakeResponse(503)])
+    response = ThrottledSession(session, RateLimiter(enabled=False), max_retries=1).get('https://a.example/')
+    assert response.status_code == 503
+    assert len(session.urls) == 2
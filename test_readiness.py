@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for condition-based page readiness waits
+"""
+
+from readiness import WaitRecorder, recorder, scroll_until_settled, wait_until
+
+
+def test_wait_until_returns_as_soon_as_condition_holds():
+    recorder.reset()
+    attempts = []
+
+    def condition():
+        attempts.append(1)
+        return len(attempts) >= 3 and 'ready'
+
+    assert wait_until(condition, timeout=5, name='test_wait', poll_interval=0.001) == 'ready'
+    stats = recorder.stats()['test_wait']
+    assert stats['count'] == 1
+    assert stats['timeouts'] == 0
+    assert stats['max_seconds'] < 1
+
+
+def test_wait_until_times_out_and_records_it():
+    recorder.reset()
+    assert wait_until(lambda: False, timeout=0.01, name='never', poll_interval=0.001) is None
+    assert recorder.stats()['never']['timeouts'] == 1
+
+
+def test_wait_until_treats_errors_as_not_ready():
+    def flaky():
+        raise RuntimeError("stale element")
+
+    assert wait_until(flaky, timeout=0.01, name='flaky', poll_interval=0.001) is None
+
+
+def test_scroll_stops_when_page_stops_growing():
+    class FakeDriver:
+        def __init__(self):
+            self.height = 1000
+            self.scrolls = 0
+
+        def execute_script(self, script):
+            if script.startswith('window.scrollTo'):
+                self.scrolls += 1
+                previous = self.height
+                if self.scrolls <= 2:
+                    self.height += 500  # lazy-loaded reviews
+                return previous
+            return self.height
+
+    driver = FakeDriver()
+    assert scroll_until_settled(driver, max_scrolls=5, timeout_per_scroll=0.05) == 2
+    assert driver.scrolls == 3
+
+
+def test_recorder_percentiles():
+    local = WaitRecorder()
+    for i in range(1, 101):
+        local.record('load', i / 100, False)
+    stats = local.stats()['load']
+    assert stats['count'] == 100
+    assert 0.5 <= stats['p50_seconds'] <= 0.51
+    assert stats['max_seconds'] == 1.0
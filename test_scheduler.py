@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded job scheduler
+"""
+
+import threading
+
+import pytest
+
+from scheduler import JobScheduler, QueueFullError
+
+
+class Gate:
+    """A job body that blocks until released and records the order jobs started in"""
+
+    def __init__(self):
+        self.started = []
+        self.events = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+
+    def job(self, name):
+        event = self.events.setdefault(name, threading.Event())
+        with self.changed:
+            self.started.append(name)
+            self.changed.notify_all()
+        assert event.wait(timeout=5)
+
+    def release(self, name):
+        self.events.setdefault(name, threading.Event()).set()
+
+    def wait_started(self, count):
+        with self.changed:
+            assert self.changed.wait_for(lambda: len(self.started) >= count, timeout=5)
+
+
+def test_runs_at_most_max_running_and_rejects_when_full():
+    gate = Gate()
+    scheduler = JobScheduler(max_running=2, max_queued=1, max_queued_per_client=5)
+
+    assert scheduler.submit('a', gate.job, ('a',)) == 0
+    assert scheduler.submit('b', gate.job, ('b',)) == 0
+    assert scheduler.submit('c', gate.job, ('c',)) == 1
+    with pytest.raises(QueueFullError):
+        scheduler.submit('d', gate.job, ('d',))
+
+    gate.wait_started(2)
+    assert scheduler.stats()['running'] == 2
+    assert scheduler.position('c') == 1
+
+    gate.release('a')
+    gate.wait_started(3)
+    assert gate.started[2] == 'c'
+    for name in 'bc':
+        gate.release(name)
+
+
+def test_priority_then_fair_share_then_fifo():
+    gate = Gate()
+    positions = {}
+    scheduler = JobScheduler(max_running=1, max_queued=10, on_queue_change=positions.update)
+
+    scheduler.submit('busy', gate.job, ('busy',), client='alice')
+    gate.wait_started(1)
+    scheduler.submit('alice-1', gate.job, ('alice-1',), client='alice')
+    scheduler.submit('alice-2', gate.job, ('alice-2',), client='alice')
+    scheduler.submit('bob-1', gate.job, ('bob-1',), client='bob')
+    scheduler.submit('urgent', gate.job, ('urgent',), client='alice', priority=5)
+
+    # alice already has a job running, so bob's first job overtakes her queued ones
+    assert positions == {'urgent': 1, 'bob-1': 2, 'alice-1': 3, 'alice-2': 4}
+
+    for count, name in enumerate(['busy', 'urgent', 'bob-1', 'alice-1', 'alice-2'], start=2):
+        gate.release(name)
+        if count <= 5:
+            gate.wait_started(count)
+    assert gate.started == ['busy', 'urgent', 'bob-1', 'alice-1', 'alice-2']
+
+
+def test_per_client_share_of_queue_and_cancel():
+    gate = Gate()
+    scheduler = JobScheduler(max_running=1, max_queued=10, max_queued_per_client=1)
+    scheduler.submit('running', gate.job, ('running',), client='alice')
+    scheduler.submit('queued', gate.job, ('queued',), client='alice')
+    with pytest.raises(QueueFullError):
+        scheduler.submit('extra', gate.job, ('extra',), client='alice')
+    # bob has nothing running yet, so his job goes ahead of alice's
+    assert scheduler.submit('other', gate.job, ('other',), client='bob') == 1
+
+    assert scheduler.cancel('queued')
+    assert not scheduler.cancel('queued')
+    assert scheduler.position('other') == 1
+    assert scheduler.stats()['rejected'] == 1
+
+    gate.release('running')
+    gate.wait_started(2)
+    assert gate.started == ['running', 'other']
+    gate.release('other')
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for TrustpilotScraper page scraping with a fake WebDriver
+"""
+
+import os
+
+os.environ.setdefault('DRIVER_POOL_PREWARM', '0')
+os.environ.setdefault('JOB_STORE_BACKEND', 'memory')
+os.environ.setdefault('COMPANY_CACHE_ENABLED', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+import app
+import readiness
+import scraping
+
+
+class FakeDriver:
+    """Records every WebDriver command and answers the contact harvest script"""
+
+    def __init__(self, harvested):
+        self.harvested = harvested
+        self.calls = []
+
+    def get(self, url):
+        self.calls.append(('get', url))
+
+    def execute_script(self, script, *args):
+        self.calls.append(('execute_script', script))
+        if script == readiness.READY_STATE_SCRIPT:
+            return 'complete'
+        return self.harvested
+
+    def find_elements(self, *args, **kwargs):
+        raise AssertionError("scrape_company_page should not scan elements one by one")
+
+
+def test_scrape_company_page_uses_one_round_trip():
+    driver = FakeDriver({
+        'matched': 3,
+        'texts': ['Contact us\ninfo@acme.com\nowner@gmail.com', 'sales@acme.com info@acme.com'],
+    })
+    emails = app.scraper.scrape_company_page('https://www.trustpilot.com/review/acme.com', driver=driver)
+    assert sorted(emails) == ['info@acme.com', 'sales@acme.com']
+    assert [name for name, _ in driver.calls] == ['get', 'execute_script', 'execute_script']
+    assert driver.calls[2][1] == scraping.CONTACT_HARVEST_SCRIPT
+
+
+def test_scrape_company_page_without_contact_section(monkeypatch):
+    monkeypatch.setattr(scraping, 'CONTACT_WAIT_TIMEOUT', 0)
+    driver = FakeDriver({'matched': 0, 'texts': []})
+    assert app.scraper.scrape_company_page('https://www.trustpilot.com/review/acme.com', driver=driver) == []
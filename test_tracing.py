@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for per-job trace timelines
+"""
+
+import asyncio
+import json
+import os
+import threading
+
+os.environ.setdefault('DRIVER_POOL_PREWARM', '0')
+os.environ.setdefault('JOB_STORE_BACKEND', 'memory')
+os.environ.setdefault('COMPANY_CACHE_ENABLED', '0')
+os.environ.setdefault('RATE_LIMIT_ENABLED', '0')
+
+import app
+import tracing
+
+
+def test_spans_nest_per_thread_and_render_as_chrome_trace():
+    trace = tracing.Trace('job')
+    with tracing.attach(trace):
+        with tracing.span('outer', term='x') as outer:
+            with tracing.span('inner'):
+                pass
+            outer.set(found=3)
+
+    def worker():
+        with tracing.attach(trace), tracing.span('company', index=1):
+            pass
+
+    thread = threading.Thread(target=worker, name='worker-1')
+    thread.start()
+    thread.join()
+
+    data = trace.to_chrome_trace()
+    spans = {event['name']: event for event in data['traceEvents'] if event['ph'] == 'X'}
+    assert set(spans) == {'outer', 'inner', 'company'}
+    assert spans['outer']['args'] == {'term': 'x', 'found': 3}
+    assert spans['outer']['ts'] <= spans['inner']['ts']
+    assert spans['inner']['ts'] + spans['inner']['dur'] <= spans['outer']['ts'] + spans['outer']['dur']
+    assert spans['company']['tid'] != spans['outer']['tid']
+    thread_names = {event['args']['name'] for event in data['traceEvents'] if event['name'] == 'thread_name'}
+    assert 'worker-1' in thread_names
+    json.dumps(data)
+
+
+def test_untraced_spans_are_no_ops_and_errors_are_recorded():
+    assert tracing.current() is None
+    with tracing.span('nothing') as span:
+        span.set(ignored=True)
+
+    trace = tracing.Trace('job', max_events=1)
+    with tracing.attach(trace):
+        try:
+            with tracing.span('failing'):
+                raise ValueError('boom')
+        except ValueError:
+            pass
+        with tracing.span('dropped'):
+            pass
+    assert tracing.current() is None
+
+    data = trace.to_chrome_trace()
+    [event] = [event for event in data['traceEvents'] if event['ph'] == 'X']
+    assert event['args']['error'] == 'ValueError: boom'
+    assert data['otherData']['dropped_events'] == 1
+
+
+def test_traced_job_is_served_at_api_trace(monkeypatch, tmp_path):
+    companies = [
+        {'name': f'Company {i}', 'url': f'https://www.trustpilot.com/review/company{i}.com'} for i in range(3)
+    ]
+    monkeypatch.setattr(app, 'TRACE_DIR', str(tmp_path))
+    monkeypatch.setattr(app.scraper, 'iter_companies', lambda term, max_companies: iter(companies))
+    monkeypatch.setattr(app.scraper, 'scrape_company', lambda url, pool=None, force_refresh=False: (['a@b.com'], 'http'))
+
+    app.background_scraping_task('search_test_traced', 'test', 3, False, 2, trace=True)
+    app.background_scraping_task('search_test_untraced', 'test', 3, False, 2)
+
+    client = app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['logged_in'] = True
+
+    response = client.get('/api/trace/search_test_traced')
+    assert response.status_code == 200
+    names = [event['name'] for event in response.get_json()['traceEvents'] if event['ph'] == 'X']
+    assert names.count('company_total') == 3
+    assert 'discovery' in names and 'job' in names
+    assert (tmp_path / 'search_test_traced.json').exists()
+    assert not app.job_traces
+
+    assert client.get('/api/trace/search_test_untraced').status_code == 404
+    assert client.get('/api/trace/search_missing').status_code == 404
+
+
+def test_concurrent_coroutine_spans_get_a_track_each():
+    trace = tracing.Trace('job')
+
+    async def fetch(index):
+        with tracing.span('request', index=index):
+            with tracing.span('rate_limit_wait'):
+                await asyncio.sleep(0.01)
+
+    async def fetch_all():
+        await asyncio.gather(*(fetch(index) for index in range(3)))
+
+    with tracing.attach(trace):
+        asyncio.run(fetch_all())
+
+    events = trace.to_chrome_trace()['traceEvents']
+    assert not [event for event in events if event['ph'] == 'X']
+    tracks = {}
+    for event in events:
+        if event['ph'] in ('b', 'e'):
+            tracks.setdefault(event['id'], []).append((event['ph'], event['name']))
+    assert len(tracks) == 3
+    for track in tracks.values():
+        assert track == [('b', 'request'), ('b', 'rate_limit_wait'), ('e', 'rate_limit_wait'), ('e', 'request')]
@@ -0,0 +1,176 @@
+"""
+Opt-in per-job trace timelines in the Chrome trace event format
+
+A Trace collects nested spans (name, start, duration, thread, arguments)
+from every thread it is attached to. to_chrome_trace() returns JSON that
+chrome://tracing and ui.perfetto.dev open directly; spans on one thread nest
+by time, and each worker thread gets its own track. Spans opened by
+coroutines (e.g. on the fetch engine's event loop) overlap on the loop's one
+thread, so they are recorded as async begin/end pairs keyed by their asyncio
+task instead, giving every concurrent request its own track.
+
+span() is called unconditionally along the scraping path. When the current
+thread has no trace attached it returns a shared no-op object, so an
+untraced job pays one context variable lookup per span. The attached trace
+is a context variable rather than a thread-local, so requests a thread hands
+to the fetch engine's event loop are recorded in that thread's trace too.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+DEFAULT_MAX_EVENTS = 100000  # spans kept per trace; later ones are counted as dropped
+
+_current = contextvars.ContextVar('trace', default=None)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'args', 'started')
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        self.trace.add(self.name, self.started, time.perf_counter(), self.args)
+        return False
+
+    def set(self, **args):
+        """Add arguments known only once the span is under way (e.g. a result count)"""
+        self.args.update(args)
+
+
+class Trace:
+    """Spans recorded for one job, from any number of threads"""
+
+    def __init__(self, name, max_events=DEFAULT_MAX_EVENTS):
+        self.name = name
+        self.max_events = max_events
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._events = []
+        self._spans = 0
+        self._threads = {}
+        self._task_ids = weakref.WeakKeyDictionary()
+        self._next_task_id = itertools.count(1)
+
+    def add(self, name, started, ended, args=None):
+        thread = threading.current_thread()
+        task = _current_task()
+        ts = round((started - self.origin) * 1e6, 1)
+        event = {'name': name, 'ts': ts, 'pid': os.getpid(), 'tid': thread.ident}
+        if args:
+            event['args'] = args
+        with self._lock:
+            if self._spans >= self.max_events:
+                self.dropped += 1
+                return
+            self._spans += 1
+            # Sort keys put, at equal timestamps, ends before begins and outer spans around inner ones
+            dur = round((ended - started) * 1e6, 1)
+            if task is None:
+                event.update(ph='X', dur=dur)
+                self._events.append(((ts, 1, -dur), event))
+            else:
+                # Spans of one task run one after another, so they nest on the task's own track
+                task_id = self._task_ids.get(task)
+                if task_id is None:
+                    task_id = self._task_ids[task] = next(self._next_task_id)
+                event.update(ph='b', cat='async', id=task_id)
+                end = {
+                    'name': name, 'ph': 'e', 'cat': 'async', 'id': task_id,
+                    'ts': round((ended - self.origin) * 1e6, 1), 'pid': event['pid'], 'tid': thread.ident,
+                }
+                self._events.append(((ts, 1, -dur), event))
+                self._events.append(((end['ts'], 0, dur), end))
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def to_chrome_trace(self):
+        """The trace as a Chrome trace event format dict (JSON object form)"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            dropped = self.dropped
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': self.name}}]
+        metadata.extend(
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}}
+            for tid, thread_name in threads.items()
+        )
+        return {
+            'traceEvents': metadata + [event for _, event in sorted(events, key=lambda keyed: keyed[0])],
+            'displayTimeUnit': 'ms',
+            'otherData': {'name': self.name, 'started_at': self.started_at, 'dropped_events': dropped},
+        }
+
+    def save(self, path):
+        """Write the trace as JSON to path, atomically"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+        os.replace(temporary, path)
+
+
+def _current_task():
+    """The asyncio task running on this thread, or None outside an event loop"""
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        return None
+
+
+@contextmanager
+def attach(trace):
+    """Record spans made by the current thread into `trace` (None records nothing)"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """The trace attached to the current thread, or None"""
+    return _current.get()
+
+
+def span(name, **args):
+    """A with-block timed into the current thread's trace, or a no-op if it has none"""
+    trace = _current.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name, args)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Command-line batch scraping without the web app
+
+    python -m trustpilot_scraper batch terms.txt --procs 4 --out results.ndjson
+
+The main process searches every term (one per line, # for comments) and
+de-duplicates the companies found by canonical URL. It hands them to
+--procs worker processes through a shared queue, so the work is spread
+across cores. Each worker runs --threads scraping threads with its own HTTP
+session, Chrome pool and share of the rate limit. Results are written as
+NDJSON as they arrive, and a throughput summary goes to stderr at the end.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from queue import Empty
+
+from company_cache import canonical_company_url
+
+DEFAULT_THREADS = 4  # scraping threads per worker process
+DEFAULT_DRIVERS = 1  # Chrome drivers per worker process, only launched when a page needs one
+DEFAULT_MAX_COMPANIES = 50  # new companies per term
+RESULT_POLL_INTERVAL = 0.5  # seconds
+
+
+def read_terms(path):
+    """Search terms from a file (or - for stdin), one per line, skipping blanks, # comments and repeats"""
+    handle = sys.stdin if path == '-' else open(path)
+    try:
+        terms = [line.split('#', 1)[0].strip() for line in handle]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    return list(dict.fromkeys(term for term in terms if term))
+
+
+def configure_logging(verbose):
+    """Log every page with --verbose, otherwise only warnings and failures"""
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING)
+
+
+def _worker(tasks, results, env, threads, scrape_all_emails, force_refresh, verbose):
+    """Worker process: scrape companies from `tasks` on several threads until told to stop"""
+    os.environ.update(env)
+    configure_logging(verbose)
+    # Only the scraper: a worker never builds the web app, its job store or its scheduler
+    import scraping
+    scraper = scraping.TrustpilotScraper(limiter=scraping.create_rate_limiter())
+    driver_pool = scraping.create_driver_pool(scraper)
+    company_cache = scraping.create_company_cache()
+
+    def run():
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            index, company, term = task
+            started = time.perf_counter()
+            try:
+                result, source = scraping.scrape_one_company(
+                    scraper, company, term, scrape_all_emails, force_refresh, pool=driver_pool, cache=company_cache
+                )
+                results.put(('done', index, result, source, time.perf_counter() - started, os.getpid()))
+            except Exception as e:
+                results.put(('error', index, f"{company['url']}: {e}", None, time.perf_counter() - started, os.getpid()))
+
+    pool = [threading.Thread(target=run, daemon=True) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    driver_pool.close()
+
+
+class BatchStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.scraped = 0
+        self.results = 0
+        self.emails = 0
+        self.errors = 0
+        self.sources = {}
+        self.per_process = {}
+        self.latencies = []
+
+    def add(self, kind, result, source, seconds, pid):
+        self.latencies.append(seconds)
+        self.per_process[pid] = self.per_process.get(pid, 0) + 1
+        if kind == 'error':
+            self.errors += 1
+            return
+        self.scraped += 1
+        self.sources[source] = self.sources.get(source, 0) + 1
+        if result:
+            self.results += 1
+            self.emails += result['total_emails']
+
+    def summary(self, terms, discovered):
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+        lines = [
+            f"Searched {terms} terms and found {discovered} unique companies in {elapsed:.1f}s",
+            f"Scraped {self.scraped} companies ({self.errors} failed): {self.results} with emails, {self.emails} emails",
+            f"Throughput {(self.scraped + self.errors) / elapsed * 60 if elapsed else 0:.1f} companies/min, "
+            f"per-company p50 {p50:.2f}s p95 {p95:.2f}s",
+            "Sources: " + (', '.join(f"{source} {count}" for source, count in sorted(self.sources.items())) or 'none'),
+            "Per process: " + (', '.join(str(count) for count in self.per_process.values()) or 'none'),
+        ]
+        return '\n'.join(lines)
+
+
+def batch(args):
+    terms = read_terms(args.terms)
+    if not terms:
+        raise SystemExit("No search terms given")
+
+    # Every process (the searching one plus each worker) gets an equal share of the per-host rate limit
+    total_rate = args.rate or int(os.environ.get('RATE_LIMIT_MAX_REQUESTS_PER_MINUTE', 30))
+    env = {
+        'RATE_LIMIT_MAX_REQUESTS_PER_MINUTE': str(max(1, total_rate // (args.procs + 1))),
+        'DRIVER_POOL_SIZE': str(args.drivers),
+    }
+    os.environ.update(env)
+    configure_logging(args.verbose)
+    # Settings are read at import time, so only after the environment above is in place
+    import scraping
+    scraper = scraping.TrustpilotScraper(limiter=scraping.create_rate_limiter())
+
+    # spawn, not fork: the parent runs threads and may hold locks a forked child would inherit
+    context = multiprocessing.get_context('spawn')
+    tasks = context.Queue(maxsize=args.procs * args.threads * 2)  # discovery waits for the workers to catch up
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=_worker,
+            args=(tasks, results, env, args.threads, args.all_emails, args.force_refresh, args.verbose),
+            daemon=True
+        )
+        for _ in range(args.procs)
+    ]
+    for worker in workers:
+        worker.start()
+
+    matched_terms = {}
+    companies = {}
+    discovery_done = threading.Event()
+    discovery_error = []
+
+    def discover():
+        try:
+            for term in terms:
+                for company in scraping.discover_companies(scraper, [term], args.max_companies, matched_terms):
+                    index = len(companies)
+                    companies[index] = company
+                    tasks.put((index, company, term))
+        except Exception as e:
+            discovery_error.append(e)
+        finally:
+            for _ in range(args.procs * args.threads):
+                tasks.put(None)
+            discovery_done.set()
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w')
+    stats = BatchStats()
+    handled = 0
+    try:
+        threading.Thread(target=discover, name='discovery', daemon=True).start()
+        while not (discovery_done.is_set() and handled >= len(companies)):
+            try:
+                kind, index, result, source, seconds, pid = results.get(timeout=RESULT_POLL_INTERVAL)
+            except Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise SystemExit("All worker processes exited early")
+                continue
+            handled += 1
+            stats.add(kind, result, source, seconds, pid)
+            if kind == 'error':
+                print(f"Failed: {result}", file=sys.stderr)
+            elif result:
+                # Terms that found the company so far; later terms may add more
+                key = canonical_company_url(result['url'], scraping.TRUSTPILOT_BASE_URL)
+                result['matched_terms'] = list(matched_terms.get(key, []))
+                out.write(json.dumps(result) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        for worker in workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+
+    if discovery_error:
+        print(f"Search stopped early: {discovery_error[0]}", file=sys.stderr)
+    print(stats.summary(len(terms), len(companies)), file=sys.stderr)
+    return 1 if discovery_error else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m trustpilot_scraper', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    batch_parser = commands.add_parser('batch', help="search a list of terms and scrape every company found")
+    batch_parser.add_argument('terms', help="file with one search term per line, or - for stdin")
+    batch_parser.add_argument('--procs', type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+    batch_parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="scraping threads per process")
+    batch_parser.add_argument('--drivers', type=int, default=DEFAULT_DRIVERS, help="Chrome drivers per process")
+    batch_parser.add_argument('--max-companies', type=int, default=DEFAULT_MAX_COMPANIES, help="new companies per term")
+    batch_parser.add_argument('--out', default='-', help="NDJSON output file (default stdout)")
+    batch_parser.add_argument('--rate', type=int, help="upstream requests per minute per host, split across processes "
+                                                       "(default RATE_LIMIT_MAX_REQUESTS_PER_MINUTE)")
+    batch_parser.add_argument('--all-emails', action='store_true', help="keep every email, not just the first 10")
+    batch_parser.add_argument('--force-refresh', action='store_true', help="ignore the company cache")
+    batch_parser.add_argument('--verbose', action='store_true', help="log every page like the web app does")
+    args = parser.parse_args(argv)
+    args.procs = max(1, args.procs)
+    args.threads = max(1, args.threads)
+    return batch(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())